@@ -0,0 +1,414 @@
+# benchmark.py
+"""
+Offline benchmarks of the verification bot: the real handlers of main.py run against the
+in-process fake Discord of fake_discord.py, so no token or network is needed.
+
+    python benchmark.py [--scenarios join_storm,verify_flood,bulk_approval,log_flood,resubmit_spam]
+                        [--size 500] [--latency-ms 50] [--jitter-ms 20]
+                        [--rate-limit 5] [--rate-window 1] [--review-board] [--output bench_output.txt]
+
+Each scenario reports its throughput, p50/p99 latency, the interactions answered after
+Discord's 3 second deadline ("late replies") and the REST calls (and 429s) it caused, per
+route, so regressions and improvements show up as numbers.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+GUILD_ID = 900000000000000001
+VERIFIED_ROLE_ID = 900000000000000002
+ADMIN_LOG_CHANNEL_ID = 900000000000000003
+WELCOME_CHANNEL_ID = 900000000000000004
+BOT_LOG_CHANNEL_ID = 900000000000000005
+MODERATOR_ID = 900000000000000006
+ADMINISTRATOR = 0x8
+INTERACTION_DEADLINE = 3.0 # Seconds Discord waits for the first response to an interaction
+
+# main.py reads its configuration at import time
+os.environ.update({
+    "DISCORD_BOT_TOKEN": "fake-token",
+    "VERIFIED_ROLE_ID": str(VERIFIED_ROLE_ID),
+    "ADMIN_LOG_CHANNEL_ID": str(ADMIN_LOG_CHANNEL_ID),
+    "WELCOME_CHANNEL_ID": str(WELCOME_CHANNEL_ID),
+    "BOT_LOG_CHANNEL_ID": str(BOT_LOG_CHANNEL_ID),
+    "DATABASE_PATH": os.path.join(tempfile.mkdtemp(prefix="verification-bench-"), "bench.sqlite3"),
+    "PORT": "0",
+    "KEEP_ALIVE_INTERVAL": "3600",
+})
+
+import main
+from fake_discord import DEFERRED_RESPONSE, FakeDiscord
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest-rank percentile of a list of values, NaN when empty."""
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+
+class ScenarioResult:
+    def __init__(self, name: str, events: int, errors: int, late: int, elapsed: float, latencies: list, calls: Counter,
+                 throttled: Counter):
+        self.name = name
+        self.events = events
+        self.errors = errors
+        self.late = late # Interactions first answered after INTERACTION_DEADLINE, or never
+        self.elapsed = elapsed
+        self.latencies = latencies
+        self.calls = calls
+        self.throttled = throttled
+
+    def report(self) -> str:
+        lines = [
+            f"== {self.name}",
+            f"events: {self.events}   errors: {self.errors}   late replies: {self.late}   elapsed: {self.elapsed:.2f}s   throughput: {self.events / self.elapsed:.1f}/s",
+            f"latency: p50 {percentile(self.latencies, 0.5) * 1000:.1f} ms   p99 {percentile(self.latencies, 0.99) * 1000:.1f} ms",
+            f"REST calls: {sum(self.calls.values())}   429s: {sum(self.throttled.values())}",
+        ]
+        for route, count in self.calls.most_common():
+            throttled = self.throttled.get(route, 0)
+            lines.append(f"  {count:6d}  {route}" + (f"  ({throttled} throttled)" if throttled else ""))
+        return "\n".join(lines)
+
+
+class Benchmark:
+    def __init__(self, fake: FakeDiscord, size: int):
+        self.fake = fake
+        self.bot = main.bot
+        self.size = size
+        self._user_ids = iter(range(800000000000000000, 900000000000000000))
+
+    async def wait_for(self, condition, timeout: float = 120, interval: float = 0.01):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                raise TimeoutError("Scenario did not complete in time")
+            await asyncio.sleep(interval)
+
+    async def measure(self, name: str, scenario) -> ScenarioResult:
+        """
+        Runs `scenario()`, which returns (events, errors, latencies), and counts the REST calls it
+        made and the interactions it sent that weren't answered within Discord's deadline.
+        """
+        calls_before, throttled_before = Counter(self.fake.calls), Counter(self.fake.throttled)
+        sent_before = set(self.fake.interactions_sent)
+        started = time.perf_counter()
+        events, errors, latencies = await scenario()
+        elapsed = time.perf_counter() - started
+        late = sum(
+            1 for interaction_id, sent in self.fake.interactions_sent.items()
+            if interaction_id not in sent_before and self.late_reply(interaction_id, sent)
+        )
+        return ScenarioResult(name, events, errors, late, elapsed, latencies, self.fake.calls - calls_before,
+                              self.fake.throttled - throttled_before)
+
+    def late_reply(self, interaction_id: int, sent: float) -> bool:
+        """Whether an interaction missed the deadline: on real Discord its token would have expired."""
+        response = self.fake.interaction_responses.get(interaction_id)
+        return response is None or response[0] - sent > INTERACTION_DEADLINE
+
+    def new_members(self, count: int) -> list:
+        user_ids = [next(self._user_ids) for _ in range(count)]
+        for user_id in user_ids:
+            self.fake.member_payload(user_id) # Known to the REST API
+        return user_ids
+
+    async def join_members(self, user_ids: list):
+        """Delivers the joins outside of any measurement, for scenarios that need existing members."""
+        # Waits for on_member_join rather than the member cache, which stays empty in LOW_MEMORY_MODE
+        joined = set()
+        original = self.bot.on_member_join
+
+        async def counted_on_member_join(member):
+            try:
+                await original(member)
+            finally:
+                joined.add(member.id)
+
+        self.bot.on_member_join = counted_on_member_join
+        try:
+            for user_id in user_ids:
+                self.fake.member_join(self.bot, user_id)
+            await self.wait_for(lambda: joined.issuperset(user_ids))
+        finally:
+            self.bot.on_member_join = original
+        await asyncio.sleep(0.5)
+
+    def reply(self, interaction_id: int) -> str:
+        """Content of the answer to an interaction: its callback response, or its first follow-up if it was deferred."""
+        followup = self.fake.interaction_followups.get(interaction_id)
+        if followup is not None:
+            return followup[1].get("content") or ""
+        return (self.fake.interaction_responses[interaction_id][1].get("data") or {}).get("content") or ""
+
+    def answered(self, interaction_id: int) -> bool:
+        """Whether an interaction got its answer, and not just a deferral."""
+        response = self.fake.interaction_responses.get(interaction_id)
+        if response is None:
+            return False
+        return response[1].get("type") != DEFERRED_RESPONSE or interaction_id in self.fake.interaction_followups
+
+    def response_latencies(self, dispatched: dict) -> list:
+        """Time from dispatch to first response for {interaction ID: dispatch time}."""
+        return [self.fake.interaction_responses[interaction_id][0] - sent for interaction_id, sent in dispatched.items()]
+
+    # --- Scenarios ---
+
+    async def join_storm(self):
+        """`size` members join at once; latency is from the gateway event to the end of on_member_join."""
+        user_ids = self.new_members(self.size)
+        dispatched, latencies = {}, []
+        original = self.bot.on_member_join
+
+        async def timed_on_member_join(member):
+            await original(member)
+            latencies.append(time.perf_counter() - dispatched[member.id])
+
+        self.bot.on_member_join = timed_on_member_join
+        try:
+            for user_id in user_ids:
+                dispatched[user_id] = time.perf_counter()
+                self.fake.member_join(self.bot, user_id)
+            await self.wait_for(lambda: len(latencies) == len(user_ids))
+            # Let the coalesced welcome check finish
+            await self.wait_for(lambda: not main.scheduler.is_running(f"welcome_check:{GUILD_ID}"))
+        finally:
+            self.bot.on_member_join = original
+        return len(user_ids), 0, latencies
+
+    async def verify_flood(self):
+        """
+        `size` members click the verify button and submit the form; latency is from each
+        interaction to its first response (modal, then confirmation).
+        """
+        user_ids = self.new_members(self.size)
+        await self.join_members(user_ids)
+        welcome = self.fake.find_message(WELCOME_CHANNEL_ID, "verify_button")
+        clicks = {}
+        for user_id in user_ids:
+            clicks[self.fake.click(self.bot, user_id, welcome, "verify_button")] = time.perf_counter()
+        await self.wait_for(lambda: all(interaction_id in self.fake.interaction_responses for interaction_id in clicks))
+        # discord.py registers a modal once it has read the callback response, only then can it be submitted
+        modal_store = self.bot._connection._view_store._modals
+        await self.wait_for(lambda: all(self.fake.modals.get(user_id) in modal_store for user_id in user_ids))
+
+        submits = {}
+        for user_id in user_ids:
+            values = {"name_input": f"Member {user_id}", "team_input": "1577"}
+            submits[self.fake.submit_modal(self.bot, user_id, WELCOME_CHANNEL_ID, values)] = time.perf_counter()
+        await self.wait_for(lambda: all(self.answered(interaction_id) for interaction_id in submits))
+        errors = sum(1 for interaction_id in submits if "submitted" not in self.reply(interaction_id))
+        return len(clicks) + len(submits), errors, self.response_latencies(clicks) + self.response_latencies(submits)
+
+    async def bulk_approval(self):
+        """
+        A moderator clicks Approve on `size` pending requests at once; latency is from each
+        click to the end of the approval (the edit of the request message). Approvals the bot
+        reports as failed to the moderator count as errors.
+        """
+        if main.store.count_pending() < self.size:
+            await self.verify_flood() # Creates the pending requests
+        requests = main.store.list_pending(limit=self.size, guild_id=GUILD_ID)
+        if main.config.REVIEW_BOARD_MODE:
+            return await self.board_approval(requests)
+        messages = self.fake.messages[ADMIN_LOG_CHANNEL_ID]
+        edited, clicks, failed = {}, {}, []
+
+        def on_request(method, path, body):
+            if method == "PATCH" and path.startswith(f"/channels/{ADMIN_LOG_CHANNEL_ID}/messages/"):
+                edited.setdefault(int(path.rsplit("/", 1)[1]), time.perf_counter())
+            elif method == "POST" and path.startswith("/webhooks/") and "error" in (body.get("content") or "").lower():
+                failed.append(path)
+
+        self.fake.listeners.append(on_request)
+        try:
+            for request in requests:
+                message = messages[request["message_id"]]
+                clicks[request["message_id"]] = time.perf_counter()
+                self.fake.click(self.bot, MODERATOR_ID, message, f"verification:approve:{request['request_id']}", ADMINISTRATOR)
+            await self.wait_for(lambda: len(edited) + len(failed) >= len(clicks))
+        finally:
+            self.fake.listeners.remove(on_request)
+        return len(clicks), len(failed), [edited[message_id] - sent for message_id, sent in clicks.items() if message_id in edited]
+
+    async def board_approval(self, requests):
+        """
+        bulk_approval in review board mode: the moderator picks every request of a board page
+        in its Approve menu at once; latency is from each pick to the moderator's report.
+        """
+        request_ids = {str(request["request_id"]) for request in requests}
+        board = main.review_boards[GUILD_ID]
+        messages = self.fake.messages[ADMIN_LOG_CHANNEL_ID]
+
+        def listed():
+            """{board message ID: IDs of the requests it lists}"""
+            return {
+                message_id: {option["value"] for option in messages[message_id]["components"][0]["components"][0]["options"]}
+                for message_id in board.message_ids if message_id in messages
+            }
+
+        # The board is only updated every REVIEW_BOARD_UPDATE_INTERVAL seconds
+        await self.wait_for(lambda: request_ids <= set().union(*listed().values()))
+        reported, picks = {}, {}
+
+        def on_request(method, path, body):
+            if method == "POST" and path.startswith("/webhooks/"):
+                token = path.rsplit("/", 1)[1]
+                reported.setdefault(int(token[len("token"):].rstrip("x")), time.perf_counter())
+
+        self.fake.listeners.append(on_request)
+        try:
+            for message_id, values in listed().items():
+                picked = sorted(values & request_ids)
+                if picked:
+                    interaction_id = self.fake.select(self.bot, MODERATOR_ID, messages[message_id], "review_board:approve", picked,
+                                                      ADMINISTRATOR)
+                    picks[interaction_id] = (time.perf_counter(), len(picked))
+            await self.wait_for(lambda: all(interaction_id in reported for interaction_id in picks))
+        finally:
+            self.fake.listeners.remove(on_request)
+        errors = sum(1 for request in requests if main.store.get_pending(request["request_id"]) is not None)
+        latencies = [reported[interaction_id] - sent for interaction_id, (sent, count) in picks.items() for _ in range(count)]
+        return len(requests), errors, latencies
+
+    async def log_flood(self):
+        """
+        `size` * 10 distinct records logged back to back; latency is from logging a record to
+        its delivery in the bot log channel. The duplicate filter is detached meanwhile: it
+        would fold the records into a single summary and leave nothing to measure.
+        """
+        count = self.size * 10
+        logged, delivered = {}, {}
+        logger = logging.getLogger("benchmark")
+
+        def on_request(method, path, body):
+            if method == "POST" and path == f"/channels/{BOT_LOG_CHANNEL_ID}/messages":
+                now = time.perf_counter()
+                for line in (body.get("content") or "").splitlines():
+                    marker = line.rpartition("bench-log ")[2]
+                    if marker.isdigit():
+                        delivered.setdefault(int(marker), now)
+
+        dedup_filters = [f for f in main.discord_handler.filters if isinstance(f, main.DuplicateLogFilter)]
+        for log_filter in dedup_filters:
+            main.discord_handler.removeFilter(log_filter)
+        self.fake.listeners.append(on_request)
+        try:
+            dropped_before = main.discord_handler.dropped
+            for i in range(count):
+                logged[i] = time.perf_counter()
+                logger.info(f"bench-log {i}")
+            dropped = lambda: main.discord_handler.dropped - dropped_before
+            await self.wait_for(lambda: len(delivered) + dropped() >= count and not main.discord_handler._queue)
+        finally:
+            self.fake.listeners.remove(on_request)
+            for log_filter in dedup_filters:
+                main.discord_handler.addFilter(log_filter)
+        latencies = [delivered[i] - sent for i, sent in logged.items() if i in delivered]
+        return count, count - len(delivered), latencies
+
+    async def resubmit_spam(self):
+        """
+        `size` / 10 members click the verify button and submit the form again as soon as they
+        get it back, `size` times in a row; latency is from each interaction to its first
+        response. Whatever the member does, the admin channel should only see one message per
+        member and edits at the throttled rate.
+        """
+        user_ids = self.new_members(max(1, self.size // 10))
+        await self.join_members(user_ids)
+        welcome = self.fake.find_message(WELCOME_CHANNEL_ID, "verify_button")
+        modal_store = self.bot._connection._view_store._modals
+        responses = self.fake.interaction_responses
+        dispatched, submits = {}, []
+        for _ in range(self.size):
+            clicks = {self.fake.click(self.bot, user_id, welcome, "verify_button"): time.perf_counter() for user_id in user_ids}
+            await self.wait_for(lambda: all(interaction_id in responses for interaction_id in clicks))
+            shown = [user_id for user_id in user_ids if user_id in self.fake.modals]
+            await self.wait_for(lambda: all(self.fake.modals[user_id] in modal_store for user_id in shown))
+            round_submits = {}
+            for user_id in shown:
+                values = {"name_input": f"Member {user_id}", "team_input": "1577"}
+                round_submits[self.fake.submit_modal(self.bot, user_id, WELCOME_CHANNEL_ID, values)] = time.perf_counter()
+            await self.wait_for(lambda: all(self.answered(interaction_id) for interaction_id in round_submits))
+            dispatched.update(clicks)
+            dispatched.update(round_submits)
+            submits.extend(round_submits)
+        errors = sum(1 for interaction_id in submits if "error" in self.reply(interaction_id).lower())
+        return len(dispatched), errors, self.response_latencies(dispatched)
+
+
+SCENARIOS = ("join_storm", "verify_flood", "bulk_approval", "log_flood", "resubmit_spam")
+
+
+async def run(args) -> str:
+    fake = FakeDiscord(
+        GUILD_ID,
+        channels={WELCOME_CHANNEL_ID: "welcome", ADMIN_LOG_CHANNEL_ID: "admin-log", BOT_LOG_CHANNEL_ID: "bot-log"},
+        roles={VERIFIED_ROLE_ID: "Verified", **{role_id: f"Team {team}" for team, role_id in main.config.TEAM_ROLE_MAP.items()}},
+        latency=args.latency_ms / 1000,
+        jitter=args.jitter_ms / 1000,
+        rate_limit=args.rate_limit,
+        rate_window=args.rate_window,
+    )
+    await fake.start()
+    await fake.connect(main.bot)
+    benchmark = Benchmark(fake, args.size)
+    # Startup work (welcome message, first log batches) is not part of any scenario
+    await benchmark.wait_for(lambda: fake.find_message(WELCOME_CHANNEL_ID, "verify_button") is not None)
+    await asyncio.sleep(1)
+
+    reports = [
+        f"Benchmark: size {args.size}, latency {args.latency_ms} ms (+{args.jitter_ms} ms jitter), "
+        f"{args.rate_limit or 'unlimited'} requests per {args.rate_window}s per route"
+    ]
+    try:
+        for name in args.scenarios:
+            result = await benchmark.measure(name, getattr(benchmark, name))
+            reports.append(result.report())
+            print(reports[-1] + "\n", file=sys.__stdout__, flush=True)
+    finally:
+        await main.bot.close()
+        await fake.stop()
+    return "\n\n".join(reports) + "\n"
+
+
+def main_cli():
+    parser = argparse.ArgumentParser(description="Benchmark the verification bot against a fake Discord.")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenarios to run, in order")
+    parser.add_argument("--size", type=int, default=200, help="Members (or requests) per scenario")
+    parser.add_argument("--latency-ms", type=float, default=50, help="Latency of every REST call")
+    parser.add_argument("--jitter-ms", type=float, default=20, help="Random latency added to every REST call")
+    parser.add_argument("--rate-limit", type=int, default=5, help="Requests per route and window, 0 for no limit")
+    parser.add_argument("--rate-window", type=float, default=1, help="Rate-limit window in seconds")
+    parser.add_argument("--review-board", action="store_true", help="Run the bot in review board mode")
+    parser.add_argument("--output", help="Also write the report to this file")
+    parser.add_argument("--verbose", action="store_true", help="Show the bot's log on the console")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    if not args.verbose:
+        # The console handler installed by main.py; records still reach the Discord log handler
+        for handler in logging.getLogger().handlers:
+            if getattr(handler, "stream", None) is sys.__stderr__:
+                handler.setLevel(logging.ERROR)
+
+    # Read when used, not at import: switching it here is enough
+    main.config.REVIEW_BOARD_MODE = args.review_board
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(report)
+
+
+if __name__ == '__main__':
+    main_cli()
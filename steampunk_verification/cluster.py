@@ -0,0 +1,141 @@
+# cluster.py
+"""
+Runs the bot as several processes ("clusters"), each connecting a contiguous slice of the
+shards with an AutoShardedBot, so a deployment serving many guilds uses more than one core.
+
+    python cluster.py [--clusters N] [--shards N]
+
+The shard count defaults to the one Discord recommends. Clusters are started one after the
+other, spaced so their shards don't exceed the gateway's identify rate limit, and restarted
+when they exit with an error. Cluster N serves its health web server on PORT + N; all
+clusters share the same SQLite database (DATABASE_PATH).
+"""
+import argparse
+import asyncio
+import logging
+import math
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import aiohttp
+
+import config
+
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+IDENTIFY_INTERVAL = 5 # Seconds per identify, per max_concurrency bucket
+RESTART_DELAY = 10 # Seconds before restarting a cluster that crashed
+
+
+async def fetch_gateway_info(token: str) -> dict:
+    """Returns Discord's recommended shard count and identify limits for the bot."""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            return await response.json()
+
+
+def split_shards(shard_count: int, clusters: int) -> list:
+    """Splits the shard IDs into `clusters` contiguous slices of (almost) equal size."""
+    per_cluster = math.ceil(shard_count / clusters)
+    return [list(range(start, min(start + per_cluster, shard_count))) for start in range(0, shard_count, per_cluster)]
+
+
+class Cluster:
+    """One bot process and the shards it runs."""
+    def __init__(self, cluster_id: int, shard_ids: list, shard_count: int, port: int):
+        self.cluster_id = cluster_id
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.port = port
+        self.process = None
+
+    def start(self):
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(self.shard_count),
+            SHARD_IDS=",".join(map(str, self.shard_ids)),
+            CLUSTER_ID=str(self.cluster_id),
+            PORT=str(self.port),
+        )
+        main_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+        self.process = subprocess.Popen([sys.executable, main_path], env=env)
+        logging.info(f"Cluster {self.cluster_id} started (PID {self.process.pid}, shards {self.shard_ids[0]}-{self.shard_ids[-1]}).")
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+
+def run(clusters: list, max_concurrency: int):
+    stopping = False
+
+    def request_stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    # Each shard identifies once; a cluster only starts when the previous one had time to identify all of its shards
+    for cluster in clusters:
+        if stopping:
+            break
+        cluster.start()
+        deadline = time.monotonic() + math.ceil(len(cluster.shard_ids) / max_concurrency) * IDENTIFY_INTERVAL
+        while not stopping and time.monotonic() < deadline:
+            time.sleep(0.5)
+
+    restart_at = {}
+    while not stopping:
+        for cluster in clusters:
+            if cluster.process is None:
+                continue
+            code = cluster.process.poll()
+            if code is None:
+                continue
+            if code == 0:
+                logging.info(f"Cluster {cluster.cluster_id} exited.")
+                cluster.process = None
+            elif cluster.cluster_id not in restart_at:
+                logging.error(f"Cluster {cluster.cluster_id} exited with code {code}, restarting in {RESTART_DELAY}s.")
+                restart_at[cluster.cluster_id] = time.monotonic() + RESTART_DELAY
+            elif time.monotonic() >= restart_at[cluster.cluster_id]:
+                del restart_at[cluster.cluster_id]
+                cluster.start()
+        if all(cluster.process is None for cluster in clusters):
+            return
+        time.sleep(1)
+
+    logging.info("Stopping clusters.")
+    for cluster in clusters:
+        cluster.stop()
+    for cluster in clusters:
+        if cluster.process is not None:
+            cluster.process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the verification bot as several sharded processes.")
+    parser.add_argument("--clusters", type=int, default=os.cpu_count() or 1, help="Number of processes (default: one per core)")
+    parser.add_argument("--shards", type=int, default=config.SHARD_COUNT, help="Total shard count (default: Discord's recommendation)")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s:%(levelname)s:cluster: %(message)s")
+
+    gateway = asyncio.run(fetch_gateway_info(config.BOT_TOKEN))
+    shard_count = args.shards or gateway["shards"]
+    max_concurrency = gateway["session_start_limit"]["max_concurrency"]
+    base_port = int(os.environ.get("PORT", 5000))
+    clusters = [
+        Cluster(cluster_id, shard_ids, shard_count, base_port + cluster_id)
+        for cluster_id, shard_ids in enumerate(split_shards(shard_count, max(1, min(args.clusters, shard_count))))
+    ]
+    logging.info(f"Running {shard_count} shards in {len(clusters)} clusters.")
+    run(clusters, max_concurrency)
+
+
+if __name__ == '__main__':
+    main()
@@ -10,32 +10,134 @@ ADMIN_LOG_CHANNEL_ID = int(os.getenv("ADMIN_LOG_CHANNEL_ID")) if os.getenv("ADMI
 BOT_LOG_CHANNEL_ID = int(os.getenv("BOT_LOG_CHANNEL_ID")) if os.getenv("BOT_LOG_CHANNEL_ID") else None
 WELCOME_CHANNEL_ID = int(os.getenv("WELCOME_CHANNEL_ID")) if os.getenv("WELCOME_CHANNEL_ID") else None
 
+# In a multi-guild deployment each guild is configured with /verification_setup; the three
+# IDs above are then only defaults for guilds without settings and may be left unset.
+# BOT_LOG_CHANNEL_ID stays global: it receives the logs of the whole process.
+MULTI_GUILD = os.getenv("MULTI_GUILD", "false").lower() == "true"
+
 # Add checks for None if these are critical and might not be set
 if BOT_TOKEN is None:
     raise ValueError("DISCORD_BOT_TOKEN environment variable not set.")
-if VERIFIED_ROLE_ID is None:
+if VERIFIED_ROLE_ID is None and not MULTI_GUILD:
     raise ValueError("VERIFIED_ROLE_ID environment variable not set.")
-if ADMIN_LOG_CHANNEL_ID is None:
+if ADMIN_LOG_CHANNEL_ID is None and not MULTI_GUILD:
     raise ValueError("ADMIN_LOG_CHANNEL_ID environment variable not set.")
-if WELCOME_CHANNEL_ID is None:
+if WELCOME_CHANNEL_ID is None and not MULTI_GUILD:
     raise ValueError("WELCOME_CHANNEL_ID environment variable not set.")
 if BOT_LOG_CHANNEL_ID is None:
     raise ValueError("BOT_LOG_CHANNEL_ID environment variable not set.")
 
+# SQLite database holding the bot state that survives restarts
+DATABASE_PATH = os.getenv("DATABASE_PATH", "bot_state.sqlite3")
+# Seconds a guild's settings are cached before being read again (picks up changes made by other cluster processes)
+GUILD_SETTINGS_TTL = float(os.getenv("GUILD_SETTINGS_TTL", "300"))
+
+# Sharding: AUTO_SHARD runs an AutoShardedBot with the shard count Discord recommends.
+# cluster.py sets SHARD_COUNT, SHARD_IDS and CLUSTER_ID to split the shards across processes.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
+AUTO_SHARD = os.getenv("AUTO_SHARD", "false").lower() == "true" or SHARD_COUNT is not None
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0")) # Process 0 also syncs the slash commands
+
+# Delivery of log records to the bot log channel
+DISCORD_LOG_BATCHING = os.getenv("DISCORD_LOG_BATCHING", "true").lower() != "false" # Pack several records per message
+DISCORD_LOG_MAX_QUEUE = int(os.getenv("DISCORD_LOG_MAX_QUEUE", "1000")) # Records kept while Discord throttles us
+DISCORD_LOG_OVERFLOW = os.getenv("DISCORD_LOG_OVERFLOW", "summarize") # "summarize" or "drop_oldest"
+if DISCORD_LOG_OVERFLOW not in ("summarize", "drop_oldest"):
+    raise ValueError(f"DISCORD_LOG_OVERFLOW must be 'summarize' or 'drop_oldest', not {DISCORD_LOG_OVERFLOW!r}.")
+DISCORD_LOG_LEVEL = os.getenv("DISCORD_LOG_LEVEL", "INFO").upper() # Records below this level are never shipped
+LOG_DEDUP_WINDOW = float(os.getenv("LOG_DEDUP_WINDOW", "60")) # Seconds during which repeats are folded (0 disables)
+LOG_DEDUP_MAX_ENTRIES = int(os.getenv("LOG_DEDUP_MAX_ENTRIES", "1024")) # Distinct messages tracked at once
+
+# Event journal (joins, submissions, decisions), stored in the same database: seconds between two batched writes
+JOURNAL_FLUSH_INTERVAL = float(os.getenv("JOURNAL_FLUSH_INTERVAL", "2"))
+
+# Health web server: log one request in N at INFO (0 disables sampling)
+WEB_ACCESS_LOG_SAMPLE = int(os.getenv("WEB_ACCESS_LOG_SAMPLE", "100"))
+
+# Low-memory mode for large guilds: members are neither chunked at startup nor cached by discord.py;
+# the few the bot needs are fetched on demand and kept in a small LRU cache
+LOW_MEMORY_MODE = os.getenv("LOW_MEMORY_MODE", "false").lower() == "true"
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE", "1000"))
+MEMBER_CACHE_TTL = float(os.getenv("MEMBER_CACHE_TTL", "600")) # Seconds
+
+# Outbound REST requests are admitted by priority: interaction responses, then role grants and admin
+# messages, then DMs, then the log channel. Interaction responses are never held back.
+OUTBOUND_MAX_IN_FLIGHT = int(os.getenv("OUTBOUND_MAX_IN_FLIGHT", "8")) # Requests running at once, all classes together
+OUTBOUND_ADMIN_CONCURRENCY = int(os.getenv("OUTBOUND_ADMIN_CONCURRENCY", "6"))
+OUTBOUND_DM_CONCURRENCY = int(os.getenv("OUTBOUND_DM_CONCURRENCY", "2"))
+OUTBOUND_LOG_CONCURRENCY = int(os.getenv("OUTBOUND_LOG_CONCURRENCY", "1"))
+OUTBOUND_LOG_MAX_WAIT = float(os.getenv("OUTBOUND_LOG_MAX_WAIT", "30")) # Seconds before a log message is shed (0 never sheds)
+
+# Per-user throttling of the verify button and the verification form: USER_THROTTLE_BURST uses in a row,
+# then one every USER_THROTTLE_INTERVAL seconds. Buckets of at most USER_THROTTLE_MAX_USERS users are kept.
+USER_THROTTLE_BURST = int(os.getenv("USER_THROTTLE_BURST", "3"))
+USER_THROTTLE_INTERVAL = float(os.getenv("USER_THROTTLE_INTERVAL", "20")) # Seconds
+USER_THROTTLE_MAX_USERS = int(os.getenv("USER_THROTTLE_MAX_USERS", "10000"))
+
+# Review board mode: instead of one message per request, a few board messages in the admin channel list the
+# pending requests (REVIEW_BOARD_PAGE_SIZE per message, at most 25) and are edited in place, at most once
+# every REVIEW_BOARD_UPDATE_INTERVAL seconds. Requests past the last page show up as earlier ones are decided.
+REVIEW_BOARD_MODE = os.getenv("REVIEW_BOARD_MODE", "false").lower() == "true"
+REVIEW_BOARD_PAGE_SIZE = min(25, int(os.getenv("REVIEW_BOARD_PAGE_SIZE", "25")))
+REVIEW_BOARD_MAX_PAGES = int(os.getenv("REVIEW_BOARD_MAX_PAGES", "4"))
+REVIEW_BOARD_UPDATE_INTERVAL = float(os.getenv("REVIEW_BOARD_UPDATE_INTERVAL", "5")) # Seconds
+
+# Reconciliation sweep: every RECONCILE_INTERVAL seconds (0 disables), the members of each guild are checked,
+# RECONCILE_PAGE_SIZE (at most 1000) every RECONCILE_PAGE_INTERVAL seconds, for members who are neither verified
+# nor waiting for a decision. They are reported in the admin channel and, with RECONCILE_DM_REMINDERS, DMed a
+# reminder at most once every RECONCILE_REMINDER_INTERVAL seconds. Members who joined less than RECONCILE_GRACE
+# seconds ago are left alone.
+RECONCILE_INTERVAL = float(os.getenv("RECONCILE_INTERVAL", "86400"))
+RECONCILE_PAGE_SIZE = min(1000, int(os.getenv("RECONCILE_PAGE_SIZE", "1000")))
+RECONCILE_PAGE_INTERVAL = float(os.getenv("RECONCILE_PAGE_INTERVAL", "10"))
+RECONCILE_GRACE = float(os.getenv("RECONCILE_GRACE", "900"))
+RECONCILE_DM_REMINDERS = os.getenv("RECONCILE_DM_REMINDERS", "false").lower() == "true"
+RECONCILE_REMINDER_INTERVAL = float(os.getenv("RECONCILE_REMINDER_INTERVAL", "604800"))
+
+# Event loop monitor (also switchable at runtime with /loop_monitor): samples the loop's lag every
+# LOOP_MONITOR_INTERVAL seconds, captures the stack when the loop is blocked LOOP_SLOW_THRESHOLD seconds
+# longer than that, and attributes time on the loop to each handler. Off by default.
+LOOP_MONITOR = os.getenv("LOOP_MONITOR", "false").lower() == "true"
+LOOP_MONITOR_INTERVAL = float(os.getenv("LOOP_MONITOR_INTERVAL", "0.1"))
+LOOP_SLOW_THRESHOLD = float(os.getenv("LOOP_SLOW_THRESHOLD", "0.1"))
+
+# Bulk review command: requests decided at the same time
+BULK_REVIEW_CONCURRENCY = int(os.getenv("BULK_REVIEW_CONCURRENCY", "5"))
+
+# Join bursts: more than JOIN_BURST_THRESHOLD joins within JOIN_BURST_WINDOW seconds switches to burst mode
+JOIN_BURST_THRESHOLD = int(os.getenv("JOIN_BURST_THRESHOLD", "10"))
+JOIN_BURST_WINDOW = int(os.getenv("JOIN_BURST_WINDOW", "10"))
+JOIN_BURST_WELCOME_DEBOUNCE = float(os.getenv("JOIN_BURST_WELCOME_DEBOUNCE", "5")) # Seconds
+
+# Seconds between two keep-alive messages in the bot log channel
+KEEP_ALIVE_INTERVAL = int(os.getenv("KEEP_ALIVE_INTERVAL", "300"))
+
 # Keep other non-sensitive configurations as they are
 VERIFY_BUTTON_LABEL = "Verify Me!"
 VERIFICATION_ALREADY_VERIFIED = "You are already a verified member!"
 VERIFICATION_NOT_NEW_MEMBER = "You are not a new member eligible for verification."
 VERIFICATION_APPROVED_MESSAGE = "You have been approved! Welcome to the server."
 VERIFICATION_DENIED_MESSAGE = "Your verification request has been denied."
+VERIFICATION_THROTTLED_MESSAGE = "You're doing that too often. Please try again in {seconds} seconds."
+VERIFICATION_UNKNOWN_TEAM_MESSAGE = "Team '{team}' isn't registered for this event. Check the number, or leave it blank if you have no team."
+RECONCILE_REMINDER_MESSAGE = "You haven't been verified in {guild} yet. Head to {channel} and click the verify button, or use /verify there."
+VERIFICATION_UPDATED_MESSAGE = "Your pending verification request has been updated! An admin will review it shortly."
 VERIFY_EMBED_TITLE = "Welcome to the Server!"
 VERIFY_EMBED_DESCRIPTION = "Please click the button below to verify yourself and gain access."
 ADMIN_LOG_EMBED_TITLE = "New Verification Request"
 APPROVED_EMBED_TITLE = "Verification Request Approved"
 DENIED_EMBED_TITLE = "Verification Request Denied"
+REVIEW_BOARD_EMBED_TITLE = "Pending Verification Requests"
 
 # Example for TEAM_ROLE_MAP (can remain hardcoded if not sensitive or too large)
 TEAM_ROLE_MAP = {
     "1577": 123456789012345679, # Team 1577 Role ID
     # Add more teams if needed: "team_number": ROLE_ID
 }
+# For many teams, point this at a CSV (team,role_id) or JSON ({"team": role_id}) file.
+# Its entries are added to TEAM_ROLE_MAP.
+TEAM_ROLE_MAP_FILE = os.getenv("TEAM_ROLE_MAP_FILE")
+# Teams registered for the event, as a CSV (team,name) or JSON ({"team": "name"}) file. When set, /verify
+# autocompletes team numbers and names from it, and submissions with a team not in it are refused.
+TEAM_DIRECTORY_FILE = os.getenv("TEAM_DIRECTORY_FILE")
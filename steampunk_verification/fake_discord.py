@@ -0,0 +1,364 @@
+# fake_discord.py
+"""
+In-process stand-in for Discord, used by benchmark.py to run the bot's real handlers
+without a token or a network connection.
+
+`FakeDiscord` serves the REST routes the bot uses from an aiohttp server on localhost,
+with configurable latency and per-route rate limits (answered with real-looking 429s),
+and counts every call. It also plays the gateway: payloads are fed straight into
+discord.py's event parsers, as if they had been received over the websocket.
+"""
+import asyncio
+import datetime
+import itertools
+import json
+import random
+import re
+import time
+from collections import Counter
+
+import discord
+from aiohttp import web
+
+from ratelimits import route_key, route_template
+
+
+API_PREFIX = "/api/v10"
+MODAL_RESPONSE = 9 # Interaction callback type showing a modal
+DEFERRED_RESPONSE = 5 # Interaction callback type deferring the answer to a follow-up
+
+
+def json_response(data, status: int = 200, headers: dict = None) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly "application/json", without charset
+    return web.Response(body=json.dumps(data).encode(), status=status, headers=dict(headers or {}, **{"Content-Type": "application/json"}))
+
+
+def _now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+class RouteBucket:
+    __slots__ = ("window_start", "count")
+
+    def __init__(self):
+        self.window_start = 0.0
+        self.count = 0
+
+
+class FakeDiscord:
+    """
+    Fake REST API and gateway for one guild.
+    Every route gets `rate_limit` requests per `rate_window` seconds (0 disables limits);
+    interaction callbacks are never limited, like on Discord. Each response is delayed by
+    `latency` seconds plus up to `jitter` random seconds.
+    """
+    def __init__(self, guild_id: int, channels: dict, roles: dict, latency: float = 0.0, jitter: float = 0.0,
+                 rate_limit: int = 5, rate_window: float = 1.0):
+        self.guild_id = guild_id
+        self.channels = channels # channel ID -> name
+        self.roles = roles # role ID -> name
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+
+        self._ids = itertools.count(int(time.time() * 1000 - 1420070400000) << 22)
+        self.bot_user = self.user_payload(self.next_id(), "VerificationBot", bot=True)
+        self.application_id = self.next_id()
+        self.members = {} # user ID -> member payload
+        self.messages = {channel_id: {} for channel_id in channels} # channel ID -> message ID -> payload
+        self.calls = Counter() # route template -> REST calls
+        self.throttled = Counter() # route template -> 429 responses
+        self.interactions_sent = {} # interaction ID -> perf_counter time it was dispatched to the bot
+        self.interaction_responses = {} # interaction ID -> (perf_counter time, callback body)
+        self.interaction_followups = {} # interaction ID -> (perf_counter time, body) of the first follow-up
+        self.modals = {} # user ID -> custom_id of the last modal shown to them
+        self._interaction_users = {} # interaction ID -> user ID, to know whom a modal was shown to
+        self.listeners = [] # callables receiving (method, path, body) after each request
+        self._buckets = {}
+        self._routes = [
+            ("GET", r"/users/@me", self._get_me),
+            ("GET", r"/oauth2/applications/@me", self._get_application),
+            ("PUT", r"/applications/\d+/commands", self._put_commands),
+            ("GET", r"/channels/(?P<channel_id>\d+)/messages", self._get_history),
+            ("POST", r"/channels/(?P<channel_id>\d+)/messages", self._create_message),
+            ("GET", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)", self._get_message),
+            ("PATCH", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)", self._edit_message),
+            ("DELETE", r"/channels/(?P<channel_id>\d+)/messages/(?P<message_id>\d+)", self._delete_message),
+            ("PUT", r"/guilds/\d+/members/(?P<user_id>\d+)/roles/(?P<role_id>\d+)", self._add_role),
+            ("GET", r"/guilds/\d+/members", self._list_members),
+            ("GET", r"/guilds/\d+/members/(?P<user_id>\d+)", self._get_member),
+            ("POST", r"/users/@me/channels", self._create_dm),
+            ("POST", r"/interactions/(?P<interaction_id>\d+)/[^/]+/callback", self._interaction_callback),
+            ("POST", r"/webhooks/\d+/(?P<token>[^/]+)", self._followup),
+            ("PATCH", r"/webhooks/\d+/(?P<token>[^/]+)/messages/@original", self._followup),
+        ]
+        self._runner = None
+        self.base_url = None
+
+    def next_id(self) -> int:
+        return next(self._ids)
+
+    # --- Server ---
+
+    async def start(self) -> str:
+        """Starts the server on a free port and points discord.py at it. Returns the API base URL."""
+        app = web.Application()
+        app.router.add_route("*", API_PREFIX + "/{path:.*}", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host="127.0.0.1", port=0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.base_url = f"http://127.0.0.1:{port}{API_PREFIX}"
+        discord.http.Route.BASE = self.base_url
+        return self.base_url
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request: web.Request) -> web.Response:
+        path = request.path[len(API_PREFIX):]
+        template = route_template(request.method, path)
+        self.calls[template] += 1
+        delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+        if delay > 0:
+            await asyncio.sleep(delay)
+
+        headers = {}
+        if self.rate_limit and "/interactions/" not in path:
+            headers = self._take_token(route_key(request.method, path))
+            if headers.get("Retry-After"):
+                self.throttled[template] += 1
+                body = {"message": "You are being rate limited.", "retry_after": float(headers["Retry-After"]), "global": False}
+                return json_response(body, status=429, headers=headers)
+
+        # GET requests have no body, their handlers get the query parameters instead
+        body = await request.json() if request.can_read_body else dict(request.query)
+        for method, pattern, handler in self._routes:
+            match = re.fullmatch(pattern, path)
+            if method == request.method and match:
+                response = await handler(body, **match.groupdict())
+                break
+        else:
+            response = json_response({"message": "404: Not Found", "code": 0}, status=404)
+        response.headers.update(headers)
+        for listener in self.listeners:
+            listener(request.method, path, body)
+        return response
+
+    def _take_token(self, key: str) -> dict:
+        """Fixed-window limiter per route; returns the rate-limit headers of the response."""
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = RouteBucket()
+        now = time.monotonic()
+        if now - bucket.window_start >= self.rate_window:
+            bucket.window_start = now
+            bucket.count = 0
+        reset_after = bucket.window_start + self.rate_window - now
+        headers = {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Bucket": f"{hash(key) & 0xffffffff:x}",
+        }
+        if bucket.count >= self.rate_limit:
+            # discord.py treats a 429 without a Via header as a Cloudflare ban
+            headers.update({"X-RateLimit-Remaining": "0", "Retry-After": f"{reset_after:.3f}", "Via": "1.1 google"})
+            return headers
+        bucket.count += 1
+        headers["X-RateLimit-Remaining"] = str(self.rate_limit - bucket.count)
+        return headers
+
+    # --- REST routes ---
+
+    async def _get_me(self, body):
+        return json_response(self.bot_user)
+
+    async def _get_application(self, body):
+        return json_response({
+            "id": str(self.application_id), "name": "VerificationBot", "description": "", "icon": None,
+            "bot_public": False, "bot_require_code_grant": False, "owner": self.user_payload(self.next_id(), "owner"),
+            "verify_key": "0" * 64, "flags": 0,
+        })
+
+    async def _put_commands(self, body):
+        return json_response([])
+
+    async def _get_history(self, body, channel_id):
+        messages = list(self.messages.get(int(channel_id), {}).values())
+        return json_response(messages[::-1][:100])
+
+    async def _create_message(self, body, channel_id):
+        message = self.message_payload(int(channel_id), body)
+        self.messages.setdefault(int(channel_id), {})[int(message["id"])] = message
+        return json_response(message)
+
+    async def _get_message(self, body, channel_id, message_id):
+        message = self.messages.get(int(channel_id), {}).get(int(message_id))
+        if message is None:
+            return json_response({"message": "Unknown Message", "code": 10008}, status=404)
+        return json_response(message)
+
+    async def _edit_message(self, body, channel_id, message_id):
+        message = self.messages.get(int(channel_id), {}).get(int(message_id))
+        if message is None:
+            return json_response({"message": "Unknown Message", "code": 10008}, status=404)
+        message.update({key: value for key, value in body.items() if key in ("content", "embeds", "components")})
+        message["edited_timestamp"] = _now_iso()
+        return json_response(message)
+
+    async def _delete_message(self, body, channel_id, message_id):
+        self.messages.get(int(channel_id), {}).pop(int(message_id), None)
+        return web.Response(status=204)
+
+    async def _add_role(self, body, user_id, role_id):
+        member = self.members.get(int(user_id))
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        if role_id not in member["roles"]:
+            member["roles"].append(role_id)
+        return web.Response(status=204)
+
+    async def _list_members(self, body):
+        after, limit = int(body.get("after", 0)), int(body.get("limit", 1))
+        user_ids = sorted(user_id for user_id in self.members if user_id > after)[:limit]
+        return json_response([dict(self.members[user_id], guild_id=str(self.guild_id)) for user_id in user_ids])
+
+    async def _get_member(self, body, user_id):
+        member = self.members.get(int(user_id))
+        if member is None:
+            return json_response({"message": "Unknown Member", "code": 10007}, status=404)
+        return json_response(member)
+
+    async def _create_dm(self, body):
+        user = self.members.get(int(body["recipient_id"]), {}).get("user") or self.user_payload(int(body["recipient_id"]), "user")
+        return json_response({"id": str(self.next_id()), "type": 1, "recipients": [user], "last_message_id": None})
+
+    async def _interaction_callback(self, body, interaction_id):
+        self.interaction_responses[int(interaction_id)] = (time.perf_counter(), body)
+        if body.get("type") == MODAL_RESPONSE:
+            user_id = self._interaction_users.pop(int(interaction_id), None)
+            self.modals[user_id] = body["data"]["custom_id"]
+        return json_response({"interaction": {"id": interaction_id, "type": 3}})
+
+    async def _followup(self, body, token, **kwargs):
+        if token.startswith("token"):
+            # Tokens of the interactions sent by `click` and `submit_modal` carry their ID
+            self.interaction_followups.setdefault(int(token[len("token"):].rstrip("x")), (time.perf_counter(), body or {}))
+        return json_response(self.message_payload(0, body or {}))
+
+    # --- Payloads ---
+
+    def user_payload(self, user_id: int, name: str, bot: bool = False) -> dict:
+        return {"id": str(user_id), "username": name, "discriminator": "0", "global_name": None, "avatar": None, "bot": bot}
+
+    def member_payload(self, user_id: int, permissions: int = 0) -> dict:
+        member = self.members.get(user_id)
+        if member is None:
+            member = self.members[user_id] = {
+                "user": self.user_payload(user_id, f"member{user_id % 100000}"),
+                "roles": [], "joined_at": _now_iso(), "deaf": False, "mute": False, "flags": 0,
+            }
+        return dict(member, guild_id=str(self.guild_id), permissions=str(permissions))
+
+    def message_payload(self, channel_id: int, body: dict) -> dict:
+        return {
+            "id": str(self.next_id()), "channel_id": str(channel_id), "author": self.bot_user,
+            "content": body.get("content") or "", "timestamp": _now_iso(), "edited_timestamp": None,
+            "tts": False, "mention_everyone": False, "mentions": [], "mention_roles": [], "attachments": [],
+            "embeds": body.get("embeds") or [], "components": body.get("components") or [],
+            "pinned": False, "type": 0, "flags": 0,
+        }
+
+    def guild_payload(self) -> dict:
+        everyone = {"id": str(self.guild_id), "name": "@everyone", "permissions": "0", "position": 0}
+        roles = [everyone] + [
+            {"id": str(role_id), "name": name, "permissions": "0", "position": position}
+            for position, (role_id, name) in enumerate(self.roles.items(), start=1)
+        ]
+        for role in roles:
+            role.update(color=0, hoist=False, managed=False, mentionable=False, flags=0)
+        channels = [
+            {"id": str(channel_id), "type": 0, "name": name, "position": position, "permission_overwrites": []}
+            for position, (channel_id, name) in enumerate(self.channels.items())
+        ]
+        bot_member = {"user": self.bot_user, "roles": [], "joined_at": _now_iso(), "deaf": False, "mute": False, "flags": 0}
+        return {
+            "id": str(self.guild_id), "name": "Benchmark Guild", "owner_id": self.bot_user["id"], "unavailable": False,
+            "roles": roles, "channels": channels, "members": [bot_member], "member_count": 1, "large": False,
+            "features": [], "emojis": [], "stickers": [], "threads": [], "voice_states": [], "presences": [],
+            "stage_instances": [], "guild_scheduled_events": [], "premium_tier": 0, "joined_at": _now_iso(),
+        }
+
+    # --- Gateway ---
+
+    async def connect(self, bot) -> None:
+        """Logs the bot in against the fake API and delivers READY and the guild, as the gateway would."""
+        await bot.login("fake-token")
+        state = bot._connection
+        state._chunk_guilds = False # There is no websocket to request members over
+        state.guild_ready_timeout = 0.1
+        self.dispatch(bot, "READY", {
+            "v": 10, "user": self.bot_user, "session_id": "fake", "resume_gateway_url": "", "shard": [0, 1],
+            "application": {"id": str(self.application_id), "flags": 0},
+            "guilds": [{"id": str(self.guild_id), "unavailable": True}],
+        })
+        self.dispatch(bot, "GUILD_CREATE", self.guild_payload())
+        await bot.wait_until_ready()
+
+    def dispatch(self, bot, event: str, data: dict) -> None:
+        bot._connection.parsers[event](data)
+
+    def member_join(self, bot, user_id: int) -> None:
+        self.dispatch(bot, "GUILD_MEMBER_ADD", self.member_payload(user_id))
+
+    def _interaction(self, user_id: int, interaction_type: int, channel_id: int, data: dict, message: dict = None,
+                     permissions: int = 0) -> dict:
+        interaction_id = self.next_id()
+        self._interaction_users[interaction_id] = user_id
+        payload = {
+            "id": str(interaction_id), "application_id": str(self.application_id), "type": interaction_type,
+            "token": f"token{interaction_id}".ljust(64, "x"), "version": 1, "guild_id": str(self.guild_id),
+            "channel": {"id": str(channel_id), "type": 0}, "member": self.member_payload(user_id, permissions),
+            "data": data, "locale": "en-US", "app_permissions": "8",
+        }
+        if message is not None:
+            payload["message"] = message
+        self.interactions_sent[interaction_id] = time.perf_counter()
+        return payload
+
+    def click(self, bot, user_id: int, message: dict, custom_id: str, permissions: int = 0) -> int:
+        """Clicks a button of a message. Returns the interaction ID."""
+        payload = self._interaction(user_id, 3, int(message["channel_id"]), {"custom_id": custom_id, "component_type": 2},
+                                    message, permissions)
+        self.dispatch(bot, "INTERACTION_CREATE", payload)
+        return int(payload["id"])
+
+    def select(self, bot, user_id: int, message: dict, custom_id: str, values: list, permissions: int = 0) -> int:
+        """Picks `values` in a select menu of a message. Returns the interaction ID."""
+        payload = self._interaction(user_id, 3, int(message["channel_id"]),
+                                    {"custom_id": custom_id, "component_type": 3, "values": values}, message, permissions)
+        self.dispatch(bot, "INTERACTION_CREATE", payload)
+        return int(payload["id"])
+
+    def submit_modal(self, bot, user_id: int, channel_id: int, values: dict) -> int:
+        """Submits the last modal shown to a user with {text input custom_id: value}. Returns the interaction ID."""
+        components = [
+            {"type": 1, "components": [{"type": 4, "custom_id": custom_id, "value": value}]}
+            for custom_id, value in values.items()
+        ]
+        payload = self._interaction(user_id, 5, channel_id, {"custom_id": self.modals.pop(user_id), "components": components})
+        self.dispatch(bot, "INTERACTION_CREATE", payload)
+        return int(payload["id"])
+
+    def find_message(self, channel_id: int, custom_id_prefix: str):
+        """Returns the most recent message of a channel with a component whose custom_id starts with the prefix."""
+        for message in reversed(list(self.messages.get(channel_id, {}).values())):
+            for row in message["components"]:
+                for component in row.get("components", []):
+                    if component.get("custom_id", "").startswith(custom_id_prefix):
+                        return message
+        return None
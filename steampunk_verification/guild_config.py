@@ -0,0 +1,49 @@
+# guild_config.py
+import time
+from typing import NamedTuple, Optional
+
+
+class GuildSettings(NamedTuple):
+    """Channel and role IDs the verification flow uses in one guild. Unset IDs are None."""
+    verified_role_id: Optional[int]
+    admin_log_channel_id: Optional[int]
+    welcome_channel_id: Optional[int]
+
+
+class GuildConfigCache:
+    """
+    Per-guild settings, read lazily from the bot store and kept in memory.
+    IDs a guild didn't set fall back to `defaults` (the environment variables), so a
+    single-guild deployment needs no stored settings at all. Entries expire after `ttl`
+    seconds, which lets the processes of a cluster pick up a change made through another
+    one; `set` and `invalidate` drop the local entry right away.
+    """
+    def __init__(self, store, defaults: GuildSettings, ttl: float = 300):
+        self.store = store
+        self.defaults = defaults
+        self.ttl = ttl
+        self._entries = {} # guild ID -> (settings, loaded at)
+
+    def get(self, guild_id: int) -> GuildSettings:
+        entry = self._entries.get(guild_id)
+        if entry is not None and time.monotonic() - entry[1] < self.ttl:
+            return entry[0]
+        settings = self._load(guild_id)
+        self._entries[guild_id] = (settings, time.monotonic())
+        return settings
+
+    def set(self, guild_id: int, settings: GuildSettings) -> None:
+        self.store.set_guild_settings(guild_id, *settings)
+        self.invalidate(guild_id)
+
+    def invalidate(self, guild_id: int) -> None:
+        self._entries.pop(guild_id, None)
+
+    def _load(self, guild_id: int) -> GuildSettings:
+        row = self.store.get_guild_settings(guild_id)
+        if row is None:
+            return self.defaults
+        return GuildSettings(*(
+            row[field] if row[field] is not None else default
+            for field, default in zip(GuildSettings._fields, self.defaults)
+        ))
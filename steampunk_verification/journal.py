@@ -0,0 +1,273 @@
+# journal.py
+import asyncio
+import bisect
+import concurrent.futures
+import csv
+import logging
+import sqlite3
+import time
+
+
+# Kinds of events, in lifecycle order
+JOIN = "join"
+SUBMIT = "submit"
+APPROVE = "approve"
+DENY = "deny"
+KINDS = (JOIN, SUBMIT, APPROVE, DENY)
+
+SCHEMA = (
+    # Append-only: rows are never updated or deleted
+    """
+    CREATE TABLE IF NOT EXISTS events (
+        event_id INTEGER PRIMARY KEY,
+        at REAL NOT NULL,
+        guild_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        member_id INTEGER NOT NULL,
+        request_id INTEGER,
+        team_number TEXT NOT NULL DEFAULT '',
+        moderator_id INTEGER,
+        decision_seconds REAL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS events_by_kind ON events (guild_id, kind, at)",
+    "CREATE INDEX IF NOT EXISTS events_by_time ON events (guild_id, at)",
+    # Counts per UTC day, kept up to date by the same transaction as the events
+    """
+    CREATE TABLE IF NOT EXISTS event_days (
+        guild_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        team_number TEXT NOT NULL DEFAULT '',
+        count INTEGER NOT NULL,
+        decision_seconds_total REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (guild_id, day, kind, team_number)
+    ) WITHOUT ROWID
+    """,
+    # Decisions per UTC day and decision time bucket (see DECISION_BUCKETS), for medians without sorting
+    """
+    CREATE TABLE IF NOT EXISTS decision_days (
+        guild_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        kind TEXT NOT NULL,
+        bucket INTEGER NOT NULL,
+        count INTEGER NOT NULL,
+        PRIMARY KEY (guild_id, kind, day, bucket)
+    ) WITHOUT ROWID
+    """,
+)
+
+# Upper bounds (seconds) of the decision time buckets, from a minute to two weeks; longer decisions share a last bucket
+DECISION_BUCKETS = (60, 120, 300, 600, 900, 1800, 3600, 7200, 10800, 21600, 43200, 86400, 172800, 259200, 604800, 1209600)
+
+EVENT_COLUMNS = ("at", "guild_id", "kind", "member_id", "request_id", "team_number", "moderator_id", "decision_seconds")
+
+INSERT_EVENT = f"INSERT INTO events ({', '.join(EVENT_COLUMNS)}) VALUES ({', '.join('?' * len(EVENT_COLUMNS))})"
+UPSERT_DAY = (
+    "INSERT INTO event_days (guild_id, day, kind, team_number, count, decision_seconds_total) "
+    "VALUES (?, strftime('%Y-%m-%d', ?, 'unixepoch'), ?, ?, 1, ?) "
+    "ON CONFLICT (guild_id, day, kind, team_number) DO UPDATE SET "
+    "count = count + 1, decision_seconds_total = decision_seconds_total + excluded.decision_seconds_total"
+)
+UPSERT_DECISION_DAY = (
+    "INSERT INTO decision_days (guild_id, day, kind, bucket, count) VALUES (?, strftime('%Y-%m-%d', ?, 'unixepoch'), ?, ?, 1) "
+    "ON CONFLICT (guild_id, kind, day, bucket) DO UPDATE SET count = count + 1"
+)
+# Fills decision_days from the events written before it existed
+BACKFILL_DECISION_DAYS = (
+    "INSERT INTO decision_days (guild_id, day, kind, bucket, count) "
+    "SELECT guild_id, strftime('%Y-%m-%d', at, 'unixepoch'), kind, decision_bucket(decision_seconds), COUNT(*) "
+    "FROM events WHERE decision_seconds IS NOT NULL GROUP BY 1, 2, 3, 4"
+)
+
+
+def day_of(timestamp: float) -> str:
+    return time.strftime("%Y-%m-%d", time.gmtime(timestamp))
+
+
+def day_start(timestamp: float) -> float:
+    """Start of the UTC day of `timestamp`: the boundary the per-day counts cover."""
+    return timestamp - timestamp % 86400
+
+
+def decision_bucket(seconds: float) -> int:
+    """Index in DECISION_BUCKETS of the bucket counting a decision time, len(DECISION_BUCKETS) past the last bound."""
+    return bisect.bisect_left(DECISION_BUCKETS, seconds)
+
+
+def median_of_buckets(counts: dict):
+    """
+    Median of a {bucket: count} histogram, interpolated linearly within the bucket holding the
+    middle decision; a median past the last bound is reported as that bound.
+    """
+    total = sum(counts.values())
+    if not total:
+        return None
+    middle, seen = total / 2, 0
+    for bucket in sorted(counts):
+        count = counts[bucket]
+        if seen + count >= middle:
+            if bucket >= len(DECISION_BUCKETS):
+                return float(DECISION_BUCKETS[-1])
+            lower = DECISION_BUCKETS[bucket - 1] if bucket else 0
+            return lower + (DECISION_BUCKETS[bucket] - lower) * (middle - seen) / count
+        seen += count
+
+
+class Journal:
+    """
+    Append-only journal of the verification lifecycle: joins, submissions, approvals and
+    denials, with the time each decision took.
+
+    `record` only appends the event to an in-memory batch, so the interaction path never
+    waits on disk. `run` commits the batch every `flush_interval` seconds, or as soon as it
+    holds `batch_size` events, in a single transaction on a dedicated thread; per-day counts
+    are updated by the same transaction, so stats never scan the whole history.
+    All database access, queries included, goes through that one thread.
+    """
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 2.0):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.recorded = 0 # Events recorded since startup
+        self._batch = []
+        self._full = asyncio.Event()
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="journal")
+        self._conn = None
+        self._executor.submit(self._open).result()
+
+    def _open(self):
+        self._conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        # Shares the file with the bot store, whose writes are short
+        self._conn.execute("PRAGMA busy_timeout=5000")
+        self._conn.create_function("decision_bucket", 1, decision_bucket, deterministic=True)
+        backfill = not self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'decision_days'").fetchone()
+        for statement in SCHEMA:
+            self._conn.execute(statement)
+        if backfill:
+            self._conn.execute(BACKFILL_DECISION_DAYS)
+
+    def record(self, kind: str, guild_id: int, member_id: int, request_id: int = None, team_number: str = None,
+               moderator_id: int = None, decision_seconds: float = None) -> None:
+        """Queues an event; it is written with the next batch."""
+        self._batch.append((time.time(), guild_id, kind, member_id, request_id, team_number or "", moderator_id, decision_seconds))
+        self.recorded += 1
+        if len(self._batch) >= self.batch_size:
+            self._full.set()
+
+    async def run(self):
+        """Writes the queued events in batches, to run as a background task (see `Scheduler.spawn`)."""
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+                await self.flush()
+        finally:
+            # Shutting down: write what is left
+            await asyncio.shield(self.flush())
+
+    async def flush(self):
+        self._full.clear()
+        if not self._batch:
+            return
+        batch, self._batch = self._batch, []
+        try:
+            await self._call(self._write, batch)
+        except Exception as e:
+            logging.error(f"Failed to write {len(batch)} journal events: {e}")
+
+    def _write(self, batch):
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.executemany(INSERT_EVENT, batch)
+            self._conn.executemany(UPSERT_DAY, [
+                (guild_id, at, kind, team_number, decision_seconds or 0)
+                for at, guild_id, kind, member_id, request_id, team_number, moderator_id, decision_seconds in batch
+            ])
+            self._conn.executemany(UPSERT_DECISION_DAY, [
+                (guild_id, at, kind, decision_bucket(decision_seconds))
+                for at, guild_id, kind, member_id, request_id, team_number, moderator_id, decision_seconds in batch
+                if decision_seconds is not None
+            ])
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # --- Queries ---
+    # Coroutines running on the journal thread; events still in the batch are not counted.
+
+    async def totals(self, guild_id: int, since: float) -> dict:
+        """Returns {kind: (count, average decision seconds)} from the day of `since` on."""
+        def query():
+            rows = self._conn.execute(
+                "SELECT kind, SUM(count) AS count, SUM(decision_seconds_total) AS decision_seconds FROM event_days "
+                "WHERE guild_id = ? AND day >= ? GROUP BY kind",
+                (guild_id, day_of(since)),
+            ).fetchall()
+            return {row["kind"]: (row["count"], row["decision_seconds"] / row["count"]) for row in rows}
+        return await self._call(query)
+
+    async def median_decision_seconds(self, guild_id: int, kind: str, since: float):
+        """
+        Median time from submission to `kind` (approve or deny) from the day of `since` on, like
+        the per-day counts, None without decisions. Estimated from the per-day decision time
+        buckets, at most one row per day and bucket: no decision is read or sorted.
+        """
+        def query():
+            rows = self._conn.execute(
+                "SELECT bucket, SUM(count) AS count FROM decision_days WHERE guild_id = ? AND kind = ? AND day >= ? "
+                "GROUP BY bucket",
+                (guild_id, kind, day_of(since)),
+            ).fetchall()
+            return median_of_buckets({row["bucket"]: row["count"] for row in rows})
+        return await self._call(query)
+
+    async def daily_counts(self, guild_id: int, kind: str, since: float) -> list:
+        """Returns (day, team number, count) rows of `kind` events since the day of `since`, newest day first."""
+        def query():
+            return self._conn.execute(
+                "SELECT day, team_number, count FROM event_days WHERE guild_id = ? AND kind = ? AND day >= ? "
+                "ORDER BY day DESC, count DESC",
+                (guild_id, kind, day_of(since)),
+            ).fetchall()
+        return await self._call(query)
+
+    async def export_csv(self, guild_id: int, since: float, file, page_size: int = 1000) -> int:
+        """
+        Writes the events of a guild since `since` to a text file as CSV, one page at a time,
+        so memory use doesn't depend on the size of the history. Returns the number of events.
+        """
+        def export():
+            writer = csv.writer(file)
+            writer.writerow(("event_id",) + EVENT_COLUMNS)
+            written, after = 0, (since, 0)
+            while True:
+                # Keyset pagination on the (guild_id, at) index: each page starts where the previous one ended
+                rows = self._conn.execute(
+                    f"SELECT event_id, {', '.join(EVENT_COLUMNS)} FROM events WHERE guild_id = ? AND (at, event_id) > (?, ?) "
+                    "ORDER BY at, event_id LIMIT ?",
+                    (guild_id, *after, page_size),
+                ).fetchall()
+                if not rows:
+                    return written
+                writer.writerows(tuple(row) for row in rows)
+                written += len(rows)
+                after = (rows[-1]["at"], rows[-1]["event_id"])
+        return await self._call(export)
+
+    async def close(self):
+        """Closes the database once the pending batch was written (see `run`); later calls do nothing."""
+        if self._conn is None:
+            return
+        conn, self._conn = self._conn, None
+        await self._call(conn.close)
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,66 @@
+# logfilters.py
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+
+
+class DuplicateLogFilter(logging.Filter):
+    """
+    Lets the first record of each kind through and folds its repeats within `window` seconds
+    into a single "repeated N times" summary record, returned by `flush` once the window is over.
+    Records are fingerprinted by logger, level and message template: the unformatted `msg`
+    (lazy %-style arguments are ignored) with digits masked, so IDs and counts don't matter.
+    At most `max_entries` fingerprints are tracked; evicting one flushes its summary early.
+    """
+    DIGITS = re.compile(r"\d+")
+
+    def __init__(self, window: float = 60, max_entries: int = 1024):
+        super().__init__()
+        self.window = window
+        self.max_entries = max_entries
+        # fingerprint -> [window start, repeats, first record], oldest window first
+        self._entries = OrderedDict()
+        self._summaries = []
+        self._lock = threading.Lock() # Records are logged from several threads
+
+    def filter(self, record) -> bool:
+        if getattr(record, "dedup_summary", False):
+            return True
+        key = (record.name, record.levelno, self.DIGITS.sub("#", str(record.msg)))
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and now - entry[0] < self.window:
+                entry[1] += 1
+                return False
+            if entry is not None:
+                self._close(self._entries.pop(key))
+            self._entries[key] = [now, 0, record]
+            if len(self._entries) > self.max_entries:
+                self._close(self._entries.popitem(last=False)[1])
+            return True
+
+    def _close(self, entry):
+        window_start, repeats, record = entry
+        if repeats and len(self._summaries) < self.max_entries:
+            summary = logging.makeLogRecord(record.__dict__)
+            summary.msg = f"{record.getMessage()} [repeated {repeats} more times in {time.monotonic() - window_start:.0f}s]"
+            summary.args = None
+            summary.exc_info = summary.exc_text = None
+            summary.dedup_summary = True
+            self._summaries.append(summary)
+
+    def flush(self) -> list:
+        """Closes the windows that are over and returns the summary records to emit."""
+        now = time.monotonic()
+        with self._lock:
+            while self._entries:
+                key, entry = next(iter(self._entries.items()))
+                if now - entry[0] < self.window:
+                    break
+                del self._entries[key]
+                self._close(entry)
+            summaries, self._summaries = self._summaries, []
+        return summaries
@@ -0,0 +1,239 @@
+# loopmonitor.py
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+
+
+class HandlerStats:
+    """Time one handler spent running on the loop ("busy") and in total, over all its calls."""
+    __slots__ = ("calls", "busy", "max_step", "wall")
+
+    def __init__(self):
+        self.calls = 0
+        self.busy = 0.0 # Seconds the handler's own code held the loop
+        self.max_step = 0.0 # Longest stretch between two awaits
+        self.wall = 0.0
+
+    def as_dict(self) -> dict:
+        return {"calls": self.calls, "busy_seconds": round(self.busy, 6), "max_step_seconds": round(self.max_step, 6),
+                "wall_seconds": round(self.wall, 6)}
+
+
+class Stall:
+    """The loop didn't get to run the lag sampler for a while: what it was running meanwhile."""
+    __slots__ = ("at", "duration", "task", "coroutine", "handler", "stack")
+
+    def __init__(self, at: float, task: str, coroutine: str, handler: str, stack: list):
+        self.at = at # Wall clock time at which the stall was detected
+        self.duration = None # Known once the loop is back
+        self.task = task
+        self.coroutine = coroutine
+        self.handler = handler
+        self.stack = stack
+
+    def as_dict(self, stack: bool = True) -> dict:
+        stall = {"at": self.at, "duration_seconds": self.duration, "task": self.task, "coroutine": self.coroutine,
+                 "handler": self.handler}
+        if stack:
+            stall["stack"] = self.stack
+        return stall
+
+
+class _ProfiledCoroutine:
+    """
+    Drives a coroutine step by step and adds the time each step ran to `stats`: only the
+    handler's own synchronous work is counted, not the time it spent awaiting.
+    """
+    __slots__ = ("coro", "stats")
+
+    def __init__(self, coro, stats: HandlerStats):
+        self.coro = coro
+        self.stats = stats
+
+    def __await__(self):
+        coro = self.coro
+        value, error = None, None
+        while True:
+            started = time.perf_counter()
+            try:
+                if error is not None:
+                    future = coro.throw(error)
+                else:
+                    future = coro.send(value)
+            except StopIteration as stop:
+                self._count(time.perf_counter() - started)
+                return stop.value
+            except BaseException:
+                self._count(time.perf_counter() - started)
+                raise
+            self._count(time.perf_counter() - started)
+            try:
+                value, error = (yield future), None
+            except BaseException as e:
+                value, error = None, e
+
+    def _count(self, elapsed: float):
+        self.stats.busy += elapsed
+        if elapsed > self.stats.max_step:
+            self.stats.max_step = elapsed
+
+
+class LoopMonitor:
+    """
+    Event loop instrumentation, off by default and switchable at runtime.
+
+    While enabled:
+    - a sampler task sleeps `interval` seconds in a loop; how late it wakes up is the loop
+      lag, kept in `lag_histogram` and in a window of recent samples;
+    - a watchdog thread notices when the sampler is more than `stall_threshold` seconds late
+      and captures the stack of the loop thread and the task running on it, in `stalls`;
+    - handlers run through `profile` get their time on the loop attributed to them.
+    When disabled nothing runs: `profile` callers only check `enabled`.
+    """
+    def __init__(self, interval: float = 0.1, stall_threshold: float = 0.1, lag_histogram=None, stall_counter=None,
+                 max_stalls: int = 50, max_samples: int = 600, stack_depth: int = 15):
+        self.interval = interval
+        self.stall_threshold = stall_threshold
+        self.lag_histogram = lag_histogram
+        self.stall_counter = stall_counter
+        self.stack_depth = stack_depth
+        self.enabled = False
+        self.enabled_at = None
+        self.handlers = {} # handler name -> HandlerStats
+        self.stalls = deque(maxlen=max_stalls)
+        self.lags = deque(maxlen=max_samples)
+        self._running_handlers = {} # id(task) -> handler name, read by the watchdog thread
+        self._heartbeat = 0.0
+        self._loop = None
+        self._loop_thread_id = None
+        self._sampler = None
+        self._watchdog = None
+        self._stop = None # Set to stop the current watchdog thread
+        self._stall = None # Stall in progress, completed by the sampler
+
+    # --- Switching ---
+
+    def enable(self):
+        """Starts the sampler and the watchdog; call from the loop to monitor."""
+        if self.enabled:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop = threading.Event()
+        self._sampler = self._loop.create_task(self._sample(), name="loop_monitor_sampler")
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stop,), name="loop_monitor_watchdog", daemon=True)
+        self._watchdog.start()
+        self.enabled = True
+        self.enabled_at = time.time()
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self._stop.set()
+        self._sampler.cancel()
+        self._sampler = None
+        self._running_handlers.clear()
+
+    def reset(self):
+        self.handlers.clear()
+        self.stalls.clear()
+        self.lags.clear()
+
+    # --- Handler attribution ---
+
+    async def profile(self, name: str, coro):
+        """Awaits `coro`, attributing its time on the loop to the handler `name`."""
+        stats = self.handlers.get(name)
+        if stats is None:
+            stats = self.handlers[name] = HandlerStats()
+        task_id = id(asyncio.current_task())
+        self._running_handlers[task_id] = name
+        started = time.perf_counter()
+        try:
+            return await _ProfiledCoroutine(coro, stats)
+        finally:
+            stats.calls += 1
+            stats.wall += time.perf_counter() - started
+            self._running_handlers.pop(task_id, None)
+
+    # --- Sampling ---
+
+    async def _sample(self):
+        while True:
+            self._heartbeat = before = time.monotonic()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.monotonic() - before - self.interval)
+            self.lags.append(lag)
+            if self.lag_histogram is not None:
+                self.lag_histogram.observe(lag)
+            stall = self._stall
+            if stall is not None:
+                stall.duration = round(lag, 6)
+                self._stall = None
+
+    def _watch(self, stop: threading.Event):
+        """Watchdog thread: captures what the loop is running when the sampler is late."""
+        reported = None
+        while not stop.wait(self.stall_threshold / 2):
+            heartbeat = self._heartbeat
+            if heartbeat == reported or time.monotonic() - heartbeat < self.interval + self.stall_threshold:
+                continue
+            reported = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = traceback.format_stack(frame, limit=self.stack_depth) if frame is not None else []
+            task = asyncio.current_task(self._loop)
+            coro = task.get_coro() if task is not None else None
+            self._stall = stall = Stall(
+                time.time(),
+                task.get_name() if task is not None else None,
+                getattr(coro, "__qualname__", None),
+                self._running_handlers.get(id(task)) if task is not None else None,
+                [line.rstrip() for line in stack],
+            )
+            self.stalls.append(stall)
+            if self.stall_counter is not None:
+                self.stall_counter.inc(stall.handler or stall.coroutine or "unknown")
+
+    # --- Reporting ---
+
+    def lag_percentiles(self) -> dict:
+        samples = sorted(self.lags)
+        if not samples:
+            return {}
+        pick = lambda fraction: samples[min(len(samples) - 1, int(fraction * len(samples)))]
+        return {"p50": round(pick(0.5), 6), "p99": round(pick(0.99), 6), "max": round(samples[-1], 6)}
+
+    def snapshot(self, stacks: bool = False) -> dict:
+        """What the monitor knows, JSON-serializable; stall stacks (source paths and lines) only with `stacks`."""
+        return {
+            "enabled": self.enabled,
+            "enabled_at": self.enabled_at,
+            "lag_seconds": self.lag_percentiles(),
+            "handlers": {name: stats.as_dict() for name, stats in self.handlers.items()},
+            "stalls": [stall.as_dict(stacks) for stall in self.stalls],
+        }
+
+    def summary(self, stalls: int = 3) -> str:
+        """A short text report: lag, the busiest handlers and the last stalls with their stacks."""
+        lines = [f"Loop monitor: {'on' if self.enabled else 'off'}"]
+        lag = self.lag_percentiles()
+        if lag:
+            lines.append(f"Lag over the last {len(self.lags)} samples: p50 {lag['p50'] * 1000:.1f} ms, "
+                         f"p99 {lag['p99'] * 1000:.1f} ms, max {lag['max'] * 1000:.1f} ms")
+        busiest = sorted(self.handlers.items(), key=lambda item: item[1].busy, reverse=True)
+        if busiest:
+            lines.append("Time on the loop per handler (calls, busy, longest step, total):")
+            for name, stats in busiest[:10]:
+                lines.append(f"  {name}: {stats.calls}, {stats.busy * 1000:.1f} ms, {stats.max_step * 1000:.1f} ms, "
+                             f"{stats.wall * 1000:.0f} ms")
+        for stall in list(self.stalls)[-stalls:]:
+            duration = f"{stall.duration * 1000:.0f} ms" if stall.duration is not None else "ongoing"
+            lines.append(f"Stall at {time.strftime('%H:%M:%S', time.localtime(stall.at))} ({duration}) in "
+                         f"{stall.handler or stall.coroutine or stall.task or 'no task'}:")
+            lines.extend(stall.stack[-4:])
+        return "\n".join(lines)
@@ -1,31 +1,39 @@
 # main.py
 import discord
+from discord import app_commands
 from discord.ext import commands
-from discord.ui import Button, View, Modal, TextInput
-from discord.utils import get
+from discord.ui import Button, DynamicItem, View, Modal, TextInput
 import config
 import asyncio
+import functools
+import hashlib
+import io
+import itertools
+import json
 import logging
+import math
 import os
-from flask import Flask, request # Import request to access incoming request data
-import threading
+from aiohttp import web
 import sys
+import tempfile
+import threading
 import time
+from collections import Counter, OrderedDict, deque
+from typing import Literal, Optional
+from guild_config import GuildConfigCache, GuildSettings
+import journal as events
+from logfilters import DuplicateLogFilter
+from loopmonitor import LoopMonitor
+from metrics import InteractionTimer, Registry
+from outbound import OutboundScheduler, Priority, RequestShed
+from ratelimits import KeyedTokenBuckets, RateLimitTracker, SlidingWindowCounter
+from scheduler import Scheduler
+from stdio import StreamToLogger
+from storage import BotStore
+from teams import TeamIndex, load_team_directory, load_team_role_map, normalize_team
 
 
 # --- Redirect stdout/stderr into logging ---
-class StreamToLogger:
-    def __init__(self, logger, log_level):
-        self.logger = logger
-        self.log_level = log_level
-
-    def write(self, buf):
-        for line in buf.rstrip().splitlines():
-            self.logger.log(self.log_level, line.rstrip())
-
-    def flush(self):
-        pass
-
 stdout_logger = logging.getLogger("STDOUT")
 stderr_logger = logging.getLogger("STDERR")
 
@@ -33,36 +41,163 @@ sys.stdout = StreamToLogger(stdout_logger, logging.INFO)
 sys.stderr = StreamToLogger(stderr_logger, logging.ERROR)
 
 # --- Discord logging handler ---
+# Discord rejects messages longer than 2000 characters
+DISCORD_MESSAGE_LIMIT = 2000
+CODE_BLOCK_OVERHEAD = len("```\n\n```")
+
+# Failures of the handler itself are logged here and never shipped to Discord,
+# otherwise a failing channel would keep feeding itself new records.
+handler_logger = logging.getLogger("discord_log_handler")
+
 class DiscordHandler(logging.Handler):
-    def __init__(self, bot, channel_id: int, min_interval_ms: int = 30):
+    """
+    Ships log records to a Discord channel.
+    Records are kept in a bounded queue and, when `batching` is on, as many of them as fit
+    are packed into a single code block message. Pacing follows the rate-limit headers
+    Discord sends back for the channel (see `ratelimits.RateLimitTracker`), with
+    `min_interval_ms` as a floor between two messages.
+    When the queue is full the oldest record is dropped; with `overflow="summarize"`
+    the next message starts with a line saying how many records were dropped.
+    With an `outbound` scheduler, messages are sent at log priority and may be shed when
+    more urgent requests keep it busy; shed messages are counted in `shed`.
+
+    Records may come from any thread (Flask, keep-alive, redirected stdout/stderr).
+    `emit` only appends the raw record to the deque, under a small lock shared with the
+    drop counters, and wakes the worker on the bot loop through `call_soon_threadsafe`
+    when it is idle.
+    Formatting happens on the worker side, so records below the handler level or dropped
+    on overflow are never formatted.
+    """
+    def __init__(self, bot, channel_id: int, min_interval_ms: int = 30, batching: bool = True,
+                 max_queue: int = 1000, overflow: str = "summarize", rate_limits=None, outbound=None):
         super().__init__()
         self.bot = bot
         self.channel_id = channel_id
         self.min_interval = min_interval_ms / 1000  # convert ms -> seconds
+        self.batching = batching
+        self.overflow = overflow
+        self.rate_limits = rate_limits
+        self.outbound = outbound
+        self.dropped = 0
+        self.shed = 0
+        self._dropped_levels = Counter()
+        self._dropped_lock = threading.Lock() # Guards the drop counters, updated by emitting threads
         self._last_sent = 0
-        self._queue = asyncio.Queue()
-        # Start the background worker
-        # self._task = asyncio.create_task(self._worker())
+        self._queue = deque(maxlen=max_queue)
+        self._wakeup = asyncio.Event()
+        self._waiting = False
+        self._loop = None
+        self._route = f"/channels/{channel_id}/messages"
+
+    def handle(self, record):
+        """Same as `logging.Handler.handle`, without the handler lock: `emit` doesn't need it."""
+        rv = self.filter(record)
+        if rv:
+            self.emit(record)
+        return rv
 
     def emit(self, record):
         """Queue the log record instead of sending immediately."""
-        # if record.levelno >= logging.WARNING:
-        log_entry = self.format(record)
-            # schedule coroutine safely
-            # asyncio.run_coroutine_threadsafe(self._send_log(log_entry, record.levelname), self.bot.loop)
-        self._queue.put_nowait((log_entry, record.levelname))
-    
+        if record.name == handler_logger.name:
+            return
+        with self._dropped_lock:
+            if len(self._queue) == self._queue.maxlen:
+                # deque(maxlen=...) discards the oldest entry on append
+                try:
+                    oldest = self._queue[0]
+                except IndexError: # The worker emptied the queue meanwhile: nothing is discarded
+                    oldest = None
+                if oldest is not None:
+                    self.dropped += 1
+                    self._dropped_levels[oldest.levelname] += 1
+            self._queue.append(record)
+        if self._waiting:
+            # Only the first record after the worker went idle pays for a cross-thread wakeup
+            self._waiting = False
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
     async def _worker(self):
-        """Continuously process the log queue, rate-limiting to `min_interval`."""
+        """Continuously drain the log queue, pacing sends by `min_interval` and the channel's rate limit."""
+        await self.bot.wait_until_ready()
         while True:
-            message, levelname = await self._queue.get()
-            now = time.time()
-            elapsed = now - self._last_sent
-            if elapsed < self.min_interval:
-                await asyncio.sleep(self.min_interval - elapsed)
-            await self._send_log(message, levelname)
-            self._last_sent = time.time()
-            
+            if not self._queue:
+                self._wakeup.clear()
+                self._waiting = True
+                # Re-check after announcing we are idle, a record may have slipped in between
+                if self._queue:
+                    self._waiting = False
+                    continue
+                await self._wakeup.wait()
+                continue
+            # Waiting before building the message lets more records pile up into the same batch
+            delay = self.min_interval - (time.monotonic() - self._last_sent)
+            if self.rate_limits is not None:
+                delay = max(delay, self.rate_limits.delay_for("POST", self._route))
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.batching:
+                await self._send_batch(self._next_batch())
+            else:
+                record = self._queue.popleft()
+                await self._send_log(self._format_safely(record), record.levelname)
+            self._last_sent = time.monotonic()
+
+    def _dropped_summary(self) -> str:
+        """Returns a line describing the records dropped since the last message, and resets the counters."""
+        with self._dropped_lock:
+            dropped_levels, self._dropped_levels = self._dropped_levels, Counter()
+        if self.overflow != "summarize" or not dropped_levels:
+            return ""
+        total = sum(dropped_levels.values())
+        levels = ", ".join(f"{count} {levelname}" for levelname, count in dropped_levels.most_common())
+        return f"… {total} log records dropped while throttled ({levels})"
+
+    def _format_safely(self, record) -> str:
+        try:
+            return self.format(record)
+        except Exception:
+            self.handleError(record)
+            return record.getMessage() if isinstance(record.msg, str) else repr(record.msg)
+
+    def _next_batch(self) -> str:
+        """Pops as many queued records as fit into one code block message."""
+        budget = DISCORD_MESSAGE_LIMIT - CODE_BLOCK_OVERHEAD
+        lines = []
+        summary = self._dropped_summary()
+        if summary:
+            lines.append(summary)
+            budget -= len(summary) + 1
+        while self._queue:
+            record = self._queue.popleft()
+            # Backticks would close the code block early
+            line = self._format_safely(record).replace("```", "`\u200b``")
+            if len(line) + 1 > budget:
+                if lines:
+                    # Doesn't fit anymore, keep it for the next message
+                    self._queue.appendleft(record)
+                    break
+                line = line[:budget - len("… (truncated)")] + "… (truncated)"
+            lines.append(line)
+            budget -= len(line) + 1
+        return "```\n" + "\n".join(lines) + "\n```"
+
+    async def _send(self, channel, content: str):
+        if self.outbound is None:
+            await channel.send(content)
+            return
+        try:
+            await self.outbound.run(Priority.LOG, channel.send(content))
+        except RequestShed:
+            self.shed += 1
+
+    async def _send_batch(self, content: str):
+        channel = self.bot.get_channel(self.channel_id)
+        if channel:
+            try:
+                await self._send(channel, content)
+            except Exception as e:
+                handler_logger.error(f"Failed to send log batch to Discord: {e}")
+
     async def _send_log(self, message: str, levelname: str):
         await self.bot.wait_until_ready()
         channel = self.bot.get_channel(self.channel_id)
@@ -71,82 +206,423 @@ class DiscordHandler(logging.Handler):
                 # prevent flooding: Discord message max 2000 chars
                 if len(message) > 1900:
                     message = message[:1900] + "… (truncated)"
-                await channel.send(f"📜 `{levelname}`: {message}")
+                await self._send(channel, f"📜 `{levelname}`: {message}")
             except Exception as e:
-                logging.error(f"Failed to send log to Discord: {e}")
+                handler_logger.error(f"Failed to send log to Discord: {e}")
 
-    async def start_worker(self):
-        self._task = asyncio.create_task(self._worker())
+    async def run_worker(self):
+        """The sending loop, to run as a background task on the bot loop (see `Scheduler.spawn`)."""
+        self._loop = asyncio.get_running_loop()
+        await self._worker()
 
-def setup_discord_logging(bot, log_channel_id: int):
-    discord_handler = DiscordHandler(bot, log_channel_id, min_interval_ms=30)
+def setup_discord_logging(bot, log_channel_id: int) -> DiscordHandler:
+    discord_handler = DiscordHandler(
+        bot,
+        log_channel_id,
+        min_interval_ms=30,
+        batching=config.DISCORD_LOG_BATCHING,
+        max_queue=config.DISCORD_LOG_MAX_QUEUE,
+        overflow=config.DISCORD_LOG_OVERFLOW,
+        rate_limits=rate_limits,
+        outbound=outbound,
+    )
+    discord_handler.setLevel(config.DISCORD_LOG_LEVEL)
     discord_handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
+    if config.LOG_DEDUP_WINDOW:
+        discord_handler.addFilter(DuplicateLogFilter(config.LOG_DEDUP_WINDOW, config.LOG_DEDUP_MAX_ENTRIES))
     logging.getLogger().addHandler(discord_handler)
-    
+    return discord_handler
+
+async def flush_stdio():
+    """Emits partial lines and tracebacks left in the redirected stdout/stderr (scheduled job)."""
+    for stream in (sys.stdout, sys.stderr):
+        if isinstance(stream, StreamToLogger):
+            stream.flush_stale()
+
+async def flush_log_summaries():
+    """Ships the "repeated N times" summaries of the duplicate filter (scheduled job)."""
+    for log_filter in discord_handler.filters:
+        if isinstance(log_filter, DuplicateLogFilter):
+            for record in log_filter.flush():
+                discord_handler.handle(record)
+
 # Configure logging for discord.py
 # handler = logging.StreamHandler()
 # handler.setFormatter(logging.Formatter('%(asctime)s:%(levelname)s:%(name)s: %(message)s'))
 #logging.basicConfig(level=logging.INFO, handlers=[handler])
-logging.basicConfig(level=logging.INFO)
+# Console output goes to the real stderr: sys.stderr is redirected into logging above,
+# writing log lines back into it would recurse forever.
+logging.basicConfig(level=logging.INFO, stream=sys.__stderr__)
 # Optionally, set discord.py's logging to DEBUG for more verbose output
 # logging.getLogger('discord').setLevel(logging.DEBUG)
 
 # Define intents
 intents = discord.Intents.default()
 intents.members = True  # Required to track new members and manage roles
-intents.message_content = True  # Required to read message content (for commands if any, though not strictly needed for this workflow)
+# No message_content: the bot only uses buttons, modals and slash commands
 intents.guilds = True  # Required for guild events
 
+if config.LOW_MEMORY_MODE:
+    # Only the bot's own member is cached and members aren't requested at startup,
+    # so memory and startup time no longer grow with the guild size. No message cache either:
+    # message events are handled through their raw variants.
+    cache_options = {"chunk_guilds_at_startup": False, "member_cache_flags": discord.MemberCacheFlags.none(), "max_messages": None}
+else:
+    cache_options = {}
+
+# Periodic jobs and background tasks, all on the bot loop
+scheduler = Scheduler()
+
+# Bot state that survives restarts
+store = BotStore(config.DATABASE_PATH)
+
+# Verification lifecycle events, written in batches off the event loop
+journal = events.Journal(config.DATABASE_PATH, flush_interval=config.JOURNAL_FLUSH_INTERVAL)
+
+# Channel and role IDs per guild; the environment variables are the defaults
+guild_configs = GuildConfigCache(
+    store,
+    GuildSettings(config.VERIFIED_ROLE_ID, config.ADMIN_LOG_CHANNEL_ID, config.WELCOME_CHANNEL_ID),
+    ttl=config.GUILD_SETTINGS_TTL,
+)
+
+# --- Metrics ---
+# Exposed on /metrics by the web server. Everything the hot path touches is pre-allocated;
+# queue depth, latency and pending counts are only read when scraped.
+metrics_registry = Registry()
+interaction_latency = metrics_registry.histogram(
+    "verification_interaction_seconds",
+    "Time spent in verification interaction handlers, until the first response and in total.",
+    labels=("handler", "phase"),
+)
+rest_throttled = metrics_registry.counter(
+    "discord_rest_ratelimited_total", "REST responses with status 429, per route.", label="route"
+)
+metrics_registry.gauge("discord_log_queue_depth", "Log records waiting to be sent to Discord.", lambda: len(discord_handler._queue))
+metrics_registry.gauge(
+    "discord_log_dropped_total", "Log records dropped because the queue was full.", lambda: discord_handler.dropped, metric_type="counter"
+)
+metrics_registry.gauge(
+    "discord_log_shed_total", "Log messages shed to make room for more urgent requests.", lambda: discord_handler.shed, metric_type="counter"
+)
+metrics_registry.gauge("discord_gateway_latency_seconds", "Latency of the gateway heartbeat.", lambda: bot.latency)
+metrics_registry.gauge("verification_pending_requests", "Verification requests waiting for a decision.", lambda: store.count_pending())
+metrics_registry.gauge(
+    "verification_journal_events_total", "Events recorded in the verification journal.", lambda: journal.recorded, metric_type="counter"
+)
+
+# Off unless LOOP_MONITOR is set or an owner turns it on with /loop_monitor; handlers only check `enabled` then
+loop_monitor = LoopMonitor(
+    interval=config.LOOP_MONITOR_INTERVAL,
+    stall_threshold=config.LOOP_SLOW_THRESHOLD,
+    lag_histogram=metrics_registry.histogram(
+        "event_loop_lag_seconds",
+        "How late the loop monitor's sampler woke up, while the monitor is on.",
+        buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+    ),
+    stall_counter=metrics_registry.counter(
+        "event_loop_stalls_total", "Times the event loop was blocked past the slow threshold, per handler or coroutine.", label="handler"
+    ),
+)
+
+def timed_interaction(handler_name: str):
+    """
+    Decorator recording the handling time of an interaction callback in `interaction_latency`,
+    and its time on the event loop while the loop monitor is on.
+    The callback calls `interaction_acknowledged` right after its first response.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            with InteractionTimer(interaction_latency, handler_name) as timer:
+                interaction.extras["timer"] = timer
+                if loop_monitor.enabled:
+                    return await loop_monitor.profile(handler_name, func(self, interaction, *args, **kwargs))
+                return await func(self, interaction, *args, **kwargs)
+        return wrapper
+    return decorator
+
+def interaction_acknowledged(interaction: discord.Interaction):
+    """Records the time to first response of an interaction timed with `timed_interaction`."""
+    timer = interaction.extras.get("timer")
+    if timer is not None:
+        timer.acknowledged()
+
+# Shared view of Discord's per-route rate limits, fed from every REST response
+rate_limits = RateLimitTracker(throttled_counter=rest_throttled)
+
+# Every REST call the handlers make goes through here, so logs and DMs queue behind what users and admins wait for.
+# Waiting for a route's rate limit happens before taking a slot: a throttled route doesn't hold one.
+outbound = OutboundScheduler(
+    max_in_flight=config.OUTBOUND_MAX_IN_FLIGHT,
+    limits={
+        Priority.ADMIN: config.OUTBOUND_ADMIN_CONCURRENCY,
+        Priority.DM: config.OUTBOUND_DM_CONCURRENCY,
+        Priority.LOG: config.OUTBOUND_LOG_CONCURRENCY,
+    },
+    shed_after={Priority.LOG: config.OUTBOUND_LOG_MAX_WAIT} if config.OUTBOUND_LOG_MAX_WAIT else {},
+    counters=(
+        metrics_registry.counter("discord_outbound_requests_total", "Outbound REST requests, per priority class.", label="priority"),
+        metrics_registry.counter("discord_outbound_shed_total", "Outbound REST requests shed under pressure, per priority class.", label="priority"),
+    ),
+)
+metrics_registry.gauge("discord_outbound_waiting", "Outbound REST requests waiting for a slot.", lambda: outbound.waiting())
+
+# One process can run several shards; cluster.py runs several such processes
+BotBase = commands.AutoShardedBot if config.AUTO_SHARD else commands.Bot
+
+class VerificationBot(BotBase):
+    async def setup_hook(self):
+        """
+        Runs once, before the bot connects to the gateway (unlike on_ready, which fires
+        again on every reconnect). Starts the background workers on the scheduler.
+        """
+        # The verify button has a fixed custom_id, registering the view once keeps it working across restarts
+        self.add_view(WelcomeView())
+        self.add_dynamic_items(AdminDecisionButton, ReviewBoardSelect)
+        scheduler.spawn("discord_log_worker", discord_handler.run_worker)
+        scheduler.spawn("journal_writer", journal.run)
+        scheduler.every("keep_alive", config.KEEP_ALIVE_INTERVAL, keep_alive, jitter=5)
+        scheduler.every("log_summaries", 10, flush_log_summaries)
+        scheduler.every("stdio_flush", 1, flush_stdio)
+        if config.LOOP_MONITOR:
+            loop_monitor.enable()
+        if config.RECONCILE_INTERVAL:
+            scheduler.every("reconcile_members", config.RECONCILE_PAGE_INTERVAL, reconcile_members, jitter=1)
+        self.web_runner = await start_web_server()
+        # The command tree is global, one process of a cluster syncing it is enough
+        if config.CLUSTER_ID == 0:
+            await sync_app_commands(self)
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # discord.py runs every gateway event handler (on_member_join, on_message...) through this private
+        # method; wrapping it is the only way to time them all without touching each handler
+        if loop_monitor.enabled:
+            handler = coro
+            async def coro(*args, **kwargs):
+                return await loop_monitor.profile(event_name, handler(*args, **kwargs))
+        await super()._run_event(coro, event_name, *args, **kwargs)
+
+    async def close(self):
+        loop_monitor.disable()
+        await scheduler.shutdown() # The journal writer flushes its last batch on the way out
+        await journal.close()
+        if getattr(self, "web_runner", None) is not None:
+            web_runner, self.web_runner = self.web_runner, None
+            await web_runner.cleanup()
+        await super().close()
+        store.close() # Last: handlers may use it until the gateway is closed
+
+async def sync_app_commands(bot):
+    """
+    Syncs the slash commands with Discord, but only when they changed since the last sync:
+    syncing is heavily rate limited and a no-op most of the time.
+    """
+    payload = json.dumps([command.to_dict(bot.tree) for command in bot.tree.get_commands()], sort_keys=True)
+    digest = hashlib.sha256(payload.encode()).hexdigest()
+    if store.get_value("app_commands_hash") == digest:
+        return
+    await bot.tree.sync()
+    store.set_value("app_commands_hash", digest)
+    logging.info("Slash commands synced with Discord.")
+
 # Initialize the bot
-bot = commands.Bot(command_prefix="!", intents=intents)
-
-# Create a Flask app instance
-app = Flask(__name__)
-
-# Configure Flask logging
-flask_logger = logging.getLogger('flask_app')
-flask_logger.setLevel(logging.WARNING)
-flask_logger.propagate = True
-# flask_logger.addHandler(handler) # Use the same handler as discord.py for consistency
-
-@app.before_request
-def log_request_info():
-    """Logs information about incoming requests."""
-    flask_logger.warning(f"Incoming Request: {request.method} {request.url}")
-    if request.data:
-        flask_logger.warning(f"Request Data: {request.data.decode('utf-8')}")
-
-@app.after_request
-def log_response_info(response):
-    """Logs information about outgoing responses."""
-    flask_logger.warning(f"Outgoing Response: Status {response.status_code}")
-    # You might want to log response data only for certain content types or if it's not too large
-    # if response.is_json:
-    #     flask_logger.info(f"Response Data: {response.get_data(as_text=True)}")
+shard_options = {"shard_count": config.SHARD_COUNT, "shard_ids": config.SHARD_IDS} if config.AUTO_SHARD else {}
+bot = VerificationBot(command_prefix="!", intents=intents, http_trace=rate_limits.trace_config(), **shard_options, **cache_options)
+
+# Install the Discord log handler right away so nothing logged during startup is lost;
+# records are buffered until the worker starts sending them once the bot is ready.
+discord_handler = setup_discord_logging(bot, config.BOT_LOG_CHANNEL_ID)
+
+# --- Health web server ---
+# Runs on the bot's own event loop, so it needs no thread and sees the real gateway state.
+web_logger = logging.getLogger('web_server')
+web_requests_served = itertools.count(1)
+
+@web.middleware
+async def access_log_middleware(request, handler):
+    """
+    Logs requests without flooding the log channel: unhandled errors always, one request in
+    `WEB_ACCESS_LOG_SAMPLE` at INFO, and everything else only when web_server is at DEBUG.
+    Request bodies are never read.
+    """
+    try:
+        response = await handler(request)
+    except web.HTTPException:
+        # 404s from crawlers and the like are not worth a log line
+        raise
+    except Exception:
+        web_logger.error(f"Unhandled error serving {request.method} {request.path}", exc_info=True)
+        raise
+    served = next(web_requests_served)
+    if config.WEB_ACCESS_LOG_SAMPLE and served % config.WEB_ACCESS_LOG_SAMPLE == 0:
+        web_logger.info(f"{request.method} {request.path} -> {response.status} ({served} requests served)")
+    elif web_logger.isEnabledFor(logging.DEBUG):
+        web_logger.debug(f"{request.method} {request.path} -> {response.status}")
     return response
 
-@app.route('/')
-def home():
-    """Home route for the Flask app, indicates the bot is running."""
-    flask_logger.warning("Serving / route.")
-    return "Bot is running!"
+def gateway_status() -> dict:
+    latency = bot.latency
+    return {
+        "ready": bot.is_ready(),
+        "closed": bot.is_closed(),
+        # latency is nan/inf until the first heartbeat is acknowledged
+        "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        "guilds": len(bot.guilds),
+        "cluster": config.CLUSTER_ID,
+        "shards": sorted(bot.shards) if config.AUTO_SHARD else None,
+    }
+
+async def home(request):
+    """Home route, hit by the uptime pinger: always 200 while the process is alive."""
+    status = gateway_status()
+    status["status"] = "ok" if status["ready"] else "starting"
+    return web.json_response(status)
+
+async def health(request):
+    """Health check: 503 unless the bot is connected to the gateway."""
+    status = gateway_status()
+    healthy = status["ready"] and not status["closed"] and status["latency_ms"] is not None
+    status["status"] = "ok" if healthy else "unavailable"
+    return web.json_response(status, status=200 if healthy else 503)
+
+async def metrics_endpoint(request):
+    """Prometheus scrape endpoint."""
+    return web.Response(text=metrics_registry.render(), content_type="text/plain", charset="utf-8")
+
+async def loop_monitor_endpoint(request):
+    """
+    Loop monitor results as JSON: lag percentiles, time per handler and recent stalls.
+    The server is public (the uptime pinger reaches it), so stall stacks are left out:
+    they are only shown to the bot's owners by /loop_monitor.
+    """
+    return web.json_response(loop_monitor.snapshot())
 
-def run_flask():
-    """Starts the Flask server."""
+def create_web_app() -> web.Application:
+    app = web.Application(middlewares=[access_log_middleware])
+    app.router.add_get('/', home)
+    app.router.add_get('/health', health)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/debug/loop', loop_monitor_endpoint)
+    return app
+
+async def start_web_server() -> web.AppRunner:
+    """Starts the health web server on the running loop and returns its runner."""
     port = int(os.environ.get("PORT", 5000)) # Render provides PORT env var
-    flask_logger.warning(f"Flask app starting on host 0.0.0.0, port {port}")
-    app.run(host='0.0.0.0', port=port)
-
-def keep_alive(handler, bot):
-    """Sends keep alive messages to dicord channel"""
-    start_time = time.time()
-    while True:
-        delta_time = time.time() - start_time
-        if delta_time > 300:
-            print("Scheduling keep-alive message...")
-            asyncio.run_coroutine_threadsafe(handler._send_log("Keep alive message", "INFO"), bot.loop)
-            start_time = time.time()
-        time.sleep(5)
+    # aiohttp's own access log would log every request, the middleware above replaces it
+    runner = web.AppRunner(create_web_app(), access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host='0.0.0.0', port=port).start()
+    web_logger.info(f"Web server started on host 0.0.0.0, port {port}")
+    return runner
+
+async def keep_alive():
+    """Sends keep alive messages to dicord channel (scheduled every `KEEP_ALIVE_INTERVAL` seconds)"""
+    await discord_handler._send_log("Keep alive message", "INFO")
+
+# --- Team roles ---
+
+def load_team_role_ids() -> dict:
+    """`config.TEAM_ROLE_MAP`, extended by `config.TEAM_ROLE_MAP_FILE` when set."""
+    team_role_ids = {normalize_team(team): role_id for team, role_id in config.TEAM_ROLE_MAP.items()}
+    if config.TEAM_ROLE_MAP_FILE:
+        team_role_ids.update(load_team_role_map(config.TEAM_ROLE_MAP_FILE))
+        logging.info(f"Loaded {len(team_role_ids)} team roles from {config.TEAM_ROLE_MAP_FILE}.")
+    return team_role_ids
+
+# Normalized team number -> role ID; the roles themselves are looked up with `guild.get_role`
+team_role_ids = load_team_role_ids()
+
+def load_team_index() -> TeamIndex:
+    """The teams of `config.TEAM_DIRECTORY_FILE`, plus those of the team role map."""
+    teams = {team_number: "" for team_number in team_role_ids}
+    if config.TEAM_DIRECTORY_FILE:
+        teams.update(load_team_directory(config.TEAM_DIRECTORY_FILE))
+        logging.info(f"Loaded {len(teams)} teams from {config.TEAM_DIRECTORY_FILE}.")
+    return TeamIndex(teams)
+
+# Serves the team autocomplete of /verify and validates submitted teams
+team_index = load_team_index()
+
+# --- Member resolution ---
+
+class MemberCache:
+    """
+    Members looked up by the bot, keyed by (guild ID, member ID), for when discord.py's
+    member cache is off (LOW_MEMORY_MODE). Bounded to `max_size` entries, least recently
+    used first out, and entries older than `ttl` seconds are fetched again.
+    """
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._members = OrderedDict() # (guild ID, member ID) -> (member, cached at)
+
+    def get(self, guild_id: int, member_id: int):
+        key = (guild_id, member_id)
+        entry = self._members.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[1] >= self.ttl:
+            del self._members[key]
+            return None
+        self._members.move_to_end(key)
+        return entry[0]
+
+    def add(self, member: discord.Member) -> None:
+        key = (member.guild.id, member.id)
+        self._members[key] = (member, time.monotonic())
+        self._members.move_to_end(key)
+        if len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+
+    def discard(self, guild_id: int, member_id: int) -> None:
+        self._members.pop((guild_id, member_id), None)
+
+member_cache = MemberCache(config.MEMBER_CACHE_SIZE, config.MEMBER_CACHE_TTL)
+
+async def resolve_member(guild: discord.Guild, member_id: int):
+    """
+    Returns a member of the guild from discord.py's cache, the member cache or, failing
+    both, the API. Returns None if the user isn't a member (anymore).
+    """
+    member = guild.get_member(member_id) or member_cache.get(guild.id, member_id)
+    if member is not None:
+        return member
+    await rate_limits.wait("GET", f"/guilds/{guild.id}/members/{member_id}")
+    try:
+        member = await outbound.run(Priority.ADMIN, guild.fetch_member(member_id))
+    except discord.NotFound:
+        return None
+    member_cache.add(member)
+    return member
+
+# --- Per-user throttling ---
+
+# Token buckets per (action, user): clicking or submitting in a loop costs one ephemeral reply per
+# attempt, and never reaches the admin channel
+user_throttle = KeyedTokenBuckets(
+    config.USER_THROTTLE_BURST, 1 / config.USER_THROTTLE_INTERVAL, max_keys=config.USER_THROTTLE_MAX_USERS
+)
+user_throttled = metrics_registry.counter(
+    "verification_user_throttled_total", "Verify clicks and form submissions refused by the per-user throttle.", label="action"
+)
+
+async def throttle_user(interaction: discord.Interaction, action: str) -> bool:
+    """
+    Spends a token of the user's bucket for `action`. When it is empty, tells the user to wait
+    and returns True: the caller must stop there.
+    """
+    key = (action, interaction.user.id)
+    if user_throttle.take(key):
+        return False
+    user_throttled.inc(action)
+    seconds = math.ceil(user_throttle.retry_after(key))
+    logging.info(f"{interaction.user.name} (ID: {interaction.user.id}) throttled on {action}, next try in {seconds}s.")
+    await outbound.run(Priority.INTERACTION, interaction.response.send_message(
+        config.VERIFICATION_THROTTLED_MESSAGE.format(seconds=seconds), ephemeral=True
+    ))
+    interaction_acknowledged(interaction)
+    return True
 
 # --- Views for Welcome and Admin Approval ---
 
@@ -159,6 +635,7 @@ class WelcomeView(View):
         super().__init__(timeout=None) # Keep the view active indefinitely
 
     @discord.ui.button(label=config.VERIFY_BUTTON_LABEL, style=discord.ButtonStyle.success, custom_id="verify_button")
+    @timed_interaction("verify_button_callback")
     async def verify_button_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
         """
         Callback for the 'Verify' button.
@@ -166,156 +643,319 @@ class WelcomeView(View):
         """
         member = interaction.user
         logging.info(f"Verify button clicked by {member.name} (ID: {member.id}).")
+        if await throttle_user(interaction, "verify_button"):
+            return
 
         # Check if user already has the Verified role
-        verified_role = get(member.guild.roles, id=config.VERIFIED_ROLE_ID)
-        if verified_role and verified_role in member.roles:
+        verified_role = member.guild.get_role(guild_configs.get(member.guild.id).verified_role_id)
+        if verified_role and member.get_role(verified_role.id):
             logging.info(f"{member.name} already has the Verified role. Sending ephemeral message.")
-            await interaction.response.send_message(
+            await outbound.run(Priority.INTERACTION, interaction.response.send_message(
                 config.VERIFICATION_ALREADY_VERIFIED, ephemeral=True
-            )
+            ))
+            interaction_acknowledged(interaction)
             return
 
         # Show the verification modal
         logging.info(f"Presenting VerificationModal to {member.name}.")
-        await interaction.response.send_modal(VerificationModal(title="Verification Form"))
+        await outbound.run(Priority.INTERACTION, interaction.response.send_modal(VerificationModal(title="Verification Form")))
+        interaction_acknowledged(interaction)
 
-class AdminApprovalView(View):
+# --- Verification decisions ---
+# Shared by the admin buttons and the bulk review command.
+
+# Requests whose decision is being applied, so concurrent clicks or a bulk run don't process them twice
+decisions_in_progress = set()
+
+# (guild ID, member ID) of form submissions being posted to the admin channel
+submissions_in_progress = set()
+
+def build_request_embed(request_id: int, member_id: int, name: str, team_number: str) -> discord.Embed:
+    """The embed posted in the admin log channel for a new verification request."""
+    embed = discord.Embed(
+        title=config.ADMIN_LOG_EMBED_TITLE,
+        color=discord.Color.blue(),
+        description=f"User: <@{member_id}> (`{member_id}`)"
+    )
+    embed.add_field(name="Submitted Name", value=name, inline=True)
+    embed.add_field(name="Submitted Team #", value=team_number if team_number else "N/A", inline=True)
+    embed.set_footer(text=f"Request #{request_id} · Review and approve/deny below.")
+    return embed
+
+def build_decision_embed(request, approved: bool, moderator_mention: str) -> discord.Embed:
+    embed = build_request_embed(request["request_id"], request["member_id"], request["name"], request["team_number"])
+    if approved:
+        embed.title = config.APPROVED_EMBED_TITLE
+        embed.color = discord.Color.green()
+        embed.add_field(name="Status", value=f"Approved by {moderator_mention}", inline=False)
+    else:
+        embed.title = config.DENIED_EMBED_TITLE
+        embed.color = discord.Color.red()
+        embed.add_field(name="Status", value=f"Denied by {moderator_mention}", inline=False)
+    return embed
+
+async def update_request_embed(request, embed: discord.Embed) -> bool:
     """
-    A view presented to administrators in the log channel, allowing them to
-    approve or deny a user's verification request.
+    Replaces the embed of a request's admin message, keeping its buttons.
+    Returns False when the request has no admin message (anymore).
     """
-    def __init__(self, member_id: int, name: str, team_number: str):
-        super().__init__(timeout=None)
-        self.member_id = member_id
-        self.name = name
-        self.team_number = team_number
-        logging.info(f"AdminApprovalView init: member_id={member_id}, name={name}, team_number={team_number}")
+    message = request_message(request)
+    if message is None:
+        return False
+    await rate_limits.wait("PATCH", f"/channels/{message.channel.id}/messages/{message.id}")
+    try:
+        await outbound.run(Priority.ADMIN, message.edit(embed=embed))
+    except discord.NotFound:
+        return False
+    return True
 
-    @discord.ui.button(label="Approve", style=discord.ButtonStyle.success, custom_id="approve_button")
-    async def approve_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
-        """
-        Callback for the 'Approve' button.
-        Assigns the Verified role (and optionally a team role) to the user and updates the log message.
-        """
-        logging.info(f"Approve button clicked by {interaction.user.name} for member ID: {self.member_id}.")
-        await interaction.response.defer() # Acknowledge the interaction immediately
+def record_decision(kind: str, guild: discord.Guild, request, moderator_id: int = None):
+    journal.record(
+        kind, guild.id, request["member_id"], request["request_id"], request["team_number"], moderator_id,
+        decision_seconds=time.time() - request["created_at"],
+    )
+
+def request_message(request, message=None):
+    """Returns the admin log message of a request: `message` when given, else a partial message from the store."""
+    if message is not None or request["message_id"] is None:
+        return message
+    channel = bot.get_channel(request["channel_id"])
+    return channel.get_partial_message(request["message_id"]) if channel else None
+
+async def approve_request(guild: discord.Guild, request, moderator_mention: str, message=None, notes=None, moderator_id: int = None) -> str:
+    """
+    Assigns the Verified role (and the team role, if the team is mapped) to the member behind
+    a pending request, updates its admin log message and DMs the member.
+    Returns "approved", "member_left" or "already_handled". Role errors (e.g. discord.Forbidden)
+    are raised and leave the request pending. Warnings for the admin are appended to `notes`.
+    """
+    if notes is None:
+        notes = []
+    request_id = request["request_id"]
+    if request_id in decisions_in_progress or store.get_pending(request_id) is None:
+        return "already_handled"
+    decisions_in_progress.add(request_id)
+    try:
+        member_id = request["member_id"]
+        member = await resolve_member(guild, member_id)
+        message = request_message(request, message)
 
-        guild = interaction.guild
-        member = guild.get_member(self.member_id)
-        
         if member is None:
-            logging.warning(f"User with ID {self.member_id} not found during approval (might have left).")
-            await interaction.followup.send(f"Error: Could not find user with ID {self.member_id}. They might have left the server.", ephemeral=True)
-            self.stop() # Stop the view if member is gone
-            await interaction.message.delete() # Delete the original log message to clean up
-            return
+            logging.warning(f"User with ID {member_id} not found during approval (might have left).")
+            store.remove_pending(request_id)
+            if message is not None:
+                await outbound.run(Priority.ADMIN, message.delete()) # Delete the original log message to clean up
+            return "member_left"
+
+        verified_role = guild.get_role(guild_configs.get(guild.id).verified_role_id)
 
-        verified_role = get(guild.roles, id=config.VERIFIED_ROLE_ID)
-        
         roles_to_add = []
         if verified_role:
             roles_to_add.append(verified_role)
             logging.info(f"Adding role: {verified_role.name} ({verified_role.id}) to {member.name}.")
 
-        # Handle team role (uncomment if you re-enable team role assignment)
-        # if self.team_number:
-        #     team_role_id = config.TEAM_ROLE_MAP.get(self.team_number.lower())
-        #     if team_role_id:
-        #         team_role_obj = get(guild.roles, id=team_role_id)
-        #         if team_role_obj:
-        #             roles_to_add.append(team_role_obj)
-        #             logging.info(f"Adding team role: {team_role_obj.name} ({team_role_obj.id}) to {member.name}.")
-        #         else:
-        #             logging.warning(f"Team role for '{self.team_number}' (ID: {team_role_id}) not found in server.")
-        #             await interaction.followup.send(
-        #                 f"Warning: Team role for '{self.team_number}' (ID: {team_role_id}) not found in server.",
-        #                 ephemeral=True
-        #             )
-        #     else:
-        #         logging.info(f"No team role mapping found for team number '{self.team_number}'.")
-        #         await interaction.followup.send(
-        #             f"Warning: No team role mapping found for team number '{self.team_number}'.",
-        #             ephemeral=True
-        #         )
+        # Handle team role
+        team_number = request["team_number"]
+        if team_number:
+            team_role_id = team_role_ids.get(team_number)
+            if team_role_id:
+                team_role_obj = guild.get_role(team_role_id)
+                if team_role_obj:
+                    roles_to_add.append(team_role_obj)
+                    logging.info(f"Adding team role: {team_role_obj.name} ({team_role_obj.id}) to {member.name}.")
+                else:
+                    logging.warning(f"Team role for '{team_number}' (ID: {team_role_id}) not found in server.")
+                    notes.append(f"Warning: Team role for '{team_number}' (ID: {team_role_id}) not found in server.")
+            else:
+                logging.info(f"No team role mapping found for team number '{team_number}'.")
+                notes.append(f"Warning: No team role mapping found for team number '{team_number}'.")
 
-        try:
-            if roles_to_add:
-                await member.add_roles(*roles_to_add)
-                logging.info(f"Successfully added roles to {member.name}.")
-            
-            # Update the admin log message
-            for child in self.children:
-                child.disabled = True
-            embed = interaction.message.embeds[0]
-            embed.title = config.APPROVED_EMBED_TITLE
-            embed.color = discord.Color.green()
-            embed.add_field(name="Status", value=f"Approved by {interaction.user.mention}", inline=False)
-            await interaction.message.edit(embed=embed, view=self)
+        if roles_to_add:
+            # add_roles sends one PUT per role: each one waits for its turn on the route
+            for role in roles_to_add:
+                await rate_limits.wait("PUT", f"/guilds/{guild.id}/members/{member.id}/roles/{role.id}")
+                await outbound.run(Priority.ADMIN, member.add_roles(role))
+            logging.info(f"Successfully added roles to {member.name}.")
+        store.remove_pending(request_id)
+        record_decision(events.APPROVE, guild, request, moderator_id)
+
+        # Update the admin log message
+        if message is not None:
+            await rate_limits.wait("PATCH", f"/channels/{message.channel.id}/messages/{message.id}")
+            await outbound.run(Priority.ADMIN, message.edit(embed=build_decision_embed(request, True, moderator_mention), view=AdminApprovalView(request_id, disabled=True)))
             logging.info(f"Admin log message updated to 'Approved' for {member.name}.")
 
-            # DM the user
-            try:
-                await member.send(config.VERIFICATION_APPROVED_MESSAGE)
-                logging.info(f"Sent approval DM to {member.name}.")
-            except discord.Forbidden:
-                logging.warning(f"Could not DM {member.name}. User has DMs disabled.")
-            except Exception as e:
-                logging.error(f"Error DMing user {member.name} on approval: {e}")
+        # DM the user
+        try:
+            await outbound.run(Priority.DM, member.send(config.VERIFICATION_APPROVED_MESSAGE))
+            logging.info(f"Sent approval DM to {member.name}.")
+        except discord.Forbidden:
+            logging.warning("Could not DM %s. User has DMs disabled.", member.name)
+        except Exception as e:
+            logging.error(f"Error DMing user {member.name} on approval: {e}")
+        return "approved"
+    finally:
+        decisions_in_progress.discard(request_id)
+        review_board_changed(guild.id)
+
+async def deny_request(guild: discord.Guild, request, moderator_mention: str, message=None, moderator_id: int = None) -> str:
+    """
+    Closes a pending request as denied, updates its admin log message and DMs the member.
+    Returns "denied", "member_left" or "already_handled". Errors looking up the member are
+    raised and leave the request pending.
+    """
+    request_id = request["request_id"]
+    if request_id in decisions_in_progress or store.get_pending(request_id) is None:
+        return "already_handled"
+    decisions_in_progress.add(request_id)
+    try:
+        member_id = request["member_id"]
+        member = await resolve_member(guild, member_id)
+        if not store.remove_pending(request_id):
+            return "already_handled"
+        record_decision(events.DENY, guild, request, moderator_id)
+        message = request_message(request, message)
+
+        if member is None:
+            logging.warning(f"User with ID {member_id} not found during denial (might have left).")
+            if message is not None:
+                await outbound.run(Priority.ADMIN, message.delete()) # Delete the original log message to clean up
+            return "member_left"
+
+        # Update the admin log message
+        if message is not None:
+            await rate_limits.wait("PATCH", f"/channels/{message.channel.id}/messages/{message.id}")
+            await outbound.run(Priority.ADMIN, message.edit(embed=build_decision_embed(request, False, moderator_mention), view=AdminApprovalView(request_id, disabled=True)))
+            logging.info(f"Admin log message updated to 'Denied' for {member.name}.")
 
+        # DM the user
+        try:
+            await outbound.run(Priority.DM, member.send(config.VERIFICATION_DENIED_MESSAGE))
+            logging.info(f"Sent denial DM to {member.name}.")
         except discord.Forbidden:
-            logging.error(f"Bot lacks permissions to manage roles for {member.name}. Check role hierarchy.")
-            await interaction.followup.send(
+            logging.warning("Could not DM %s. User has DMs disabled.", member.name)
+        except Exception as e:
+            logging.error(f"Error DMing user {member.name} on denial: {e}")
+        return "denied"
+    finally:
+        decisions_in_progress.discard(request_id)
+        review_board_changed(guild.id)
+
+class AdminDecisionButton(DynamicItem[Button], template=r"verification:(?P<action>approve|deny):(?P<request_id>[0-9]+)"):
+    """
+    Approve/Deny button of a verification request in the admin log channel.
+    The request ID is encoded in the custom_id ("verification:approve:42"), and the request
+    itself lives in the bot store, so a single registered handler serves every request,
+    including those created before a restart, without keeping any per-request object.
+    """
+    def __init__(self, action: str, request_id: int, disabled: bool = False):
+        if action == "approve":
+            label, style = "Approve", discord.ButtonStyle.success
+        else:
+            label, style = "Deny", discord.ButtonStyle.danger
+        super().__init__(
+            Button(label=label, style=style, custom_id=f"verification:{action}:{request_id}", disabled=disabled)
+        )
+        self.action = action
+        self.request_id = request_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: Button, match):
+        return cls(match["action"], int(match["request_id"]))
+
+    async def callback(self, interaction: discord.Interaction):
+        if self.action == "approve":
+            await self.approve_callback(interaction)
+        else:
+            await self.deny_callback(interaction)
+
+    async def _report_outcome(self, interaction: discord.Interaction, outcome: str, member_id: int = None):
+        """Tells the admin when a click didn't go through."""
+        if outcome == "already_handled":
+            logging.info(f"Verification request #{self.request_id} was already handled.")
+            await outbound.run(Priority.ADMIN, interaction.followup.send(f"Request #{self.request_id} was already handled.", ephemeral=True))
+        elif outcome == "member_left":
+            await outbound.run(Priority.ADMIN, interaction.followup.send(f"Error: Could not find user with ID {member_id}. They might have left the server.", ephemeral=True))
+
+    def _pending_request(self, interaction: discord.Interaction):
+        """The pending request this button decides, or None if it was handled or belongs to another guild."""
+        request = store.get_pending(self.request_id)
+        if request is not None and request["guild_id"] != interaction.guild.id:
+            # Decided with the guild's own roles and settings only
+            logging.warning(f"{interaction.user.name} clicked a button of request #{self.request_id} from another guild in {interaction.guild.name}.")
+            return None
+        return request
+
+    @timed_interaction("approve_callback")
+    async def approve_callback(self, interaction: discord.Interaction):
+        """
+        Callback for the 'Approve' button.
+        Assigns the Verified role (and optionally a team role) to the user and updates the log message.
+        """
+        logging.info(f"Approve button clicked by {interaction.user.name} for request #{self.request_id}.")
+        await outbound.run(Priority.INTERACTION, interaction.response.defer()) # Acknowledge the interaction immediately
+        interaction_acknowledged(interaction)
+
+        request = self._pending_request(interaction)
+        if request is None:
+            await self._report_outcome(interaction, "already_handled")
+            return
+        notes = []
+        try:
+            outcome = await approve_request(interaction.guild, request, interaction.user.mention, interaction.message, notes,
+                                            moderator_id=interaction.user.id)
+            await self._report_outcome(interaction, outcome, request["member_id"])
+            for note in notes:
+                await outbound.run(Priority.ADMIN, interaction.followup.send(note, ephemeral=True))
+        except discord.Forbidden:
+            logging.error(f"Bot lacks permissions to manage roles for member ID {request['member_id']}. Check role hierarchy.")
+            await outbound.run(Priority.ADMIN, interaction.followup.send(
                 "I don't have permission to manage roles. Please check my role hierarchy.",
                 ephemeral=True
-            )
+            ))
         except Exception as e:
-            logging.error(f"An error occurred during approval for {member.name}: {e}", exc_info=True)
-            await interaction.followup.send(
+            logging.error(f"An error occurred during approval for member ID {request['member_id']}: {e}", exc_info=True)
+            await outbound.run(Priority.ADMIN, interaction.followup.send(
                 f"An error occurred during approval: {e}", ephemeral=True
-            )
-        finally:
-            self.stop() # Stop the view after processing
+            ))
 
-    @discord.ui.button(label="Deny", style=discord.ButtonStyle.danger, custom_id="deny_button")
-    async def deny_callback(self, interaction: discord.Interaction, button: discord.ui.Button):
+    @timed_interaction("deny_callback")
+    async def deny_callback(self, interaction: discord.Interaction):
         """
         Callback for the 'Deny' button.
         Updates the log message and DMs the user about the denial.
         """
-        logging.info(f"Deny button clicked by {interaction.user.name} for member ID: {self.member_id}.")
-        await interaction.response.defer() # Acknowledge the interaction immediately
+        logging.info(f"Deny button clicked by {interaction.user.name} for request #{self.request_id}.")
+        await outbound.run(Priority.INTERACTION, interaction.response.defer()) # Acknowledge the interaction immediately
+        interaction_acknowledged(interaction)
 
-        guild = interaction.guild
-        member = guild.get_member(self.member_id)
-        
-        if member is None:
-            logging.warning(f"User with ID {self.member_id} not found during denial (might have left).")
-            await interaction.followup.send(f"Error: Could not find user with ID {self.member_id}. They might have left the server.", ephemeral=True)
-            self.stop()
-            await interaction.message.delete() # Delete the original log message to clean up
+        request = self._pending_request(interaction)
+        if request is None:
+            await self._report_outcome(interaction, "already_handled")
             return
-        
-        # Update the admin log message
-        for child in self.children:
-            child.disabled = True
-        embed = interaction.message.embeds[0]
-        embed.title = config.DENIED_EMBED_TITLE
-        embed.color = discord.Color.red()
-        embed.add_field(name="Status", value=f"Denied by {interaction.user.mention}", inline=False)
-        await interaction.message.edit(embed=embed, view=self)
-        logging.info(f"Admin log message updated to 'Denied' for {member.name}.")
-
-        # DM the user
         try:
-            await member.send(config.VERIFICATION_DENIED_MESSAGE)
-            logging.info(f"Sent denial DM to {member.name}.")
-        except discord.Forbidden:
-            logging.warning(f"Could not DM {member.name}. User has DMs disabled.")
+            outcome = await deny_request(interaction.guild, request, interaction.user.mention, interaction.message,
+                                         moderator_id=interaction.user.id)
+            await self._report_outcome(interaction, outcome, request["member_id"])
         except Exception as e:
-            logging.error(f"Error DMing user {member.name} on denial: {e}")
-        finally:
-            self.stop() # Stop the view after processing
+            logging.error(f"An error occurred during denial for member ID {request['member_id']}: {e}", exc_info=True)
+            await outbound.run(Priority.ADMIN, interaction.followup.send(
+                f"An error occurred during denial: {e}", ephemeral=True
+            ))
+
+class AdminApprovalView(View):
+    """
+    A view presented to administrators in the log channel, allowing them to
+    approve or deny a user's verification request.
+    It only lays out the buttons: clicks are dispatched to `AdminDecisionButton`,
+    registered once with `bot.add_dynamic_items`.
+    """
+    def __init__(self, request_id: int, disabled: bool = False):
+        super().__init__(timeout=None)
+        self.add_item(AdminDecisionButton("approve", request_id, disabled=disabled))
+        self.add_item(AdminDecisionButton("deny", request_id, disabled=disabled))
+        # A stopped view isn't tracked by discord.py once sent, so open requests cost no View object
+        self.stop()
 
 # --- Modal for User Input ---
 class VerificationModal(Modal):
@@ -344,62 +984,942 @@ class VerificationModal(Modal):
             )
         )
 
+    @timed_interaction("on_submit")
     async def on_submit(self, interaction: discord.Interaction):
         """
         Callback when the verification modal is submitted.
         Collects user input and sends it to the admin log channel for review.
         """
         logging.info(f"VerificationModal submitted by {interaction.user.name} (ID: {interaction.user.id}).")
+        if await throttle_user(interaction, "submit"):
+            return
         member = interaction.user
         name = self.children[0].value
-        team_number = self.children[1].value.strip()
+        team_number = normalize_team(self.children[1].value)
 
         logging.info(f"Modal data received: User={member.id}, Name='{name}', Team='{team_number}'.")
 
-        admin_channel = bot.get_channel(config.ADMIN_LOG_CHANNEL_ID)
-        if not admin_channel:
-            logging.error(f"Admin log channel not found for ID: {config.ADMIN_LOG_CHANNEL_ID}. Cannot send verification request.")
-            await interaction.response.send_message(
-                "Error: Admin log channel not found. Please contact an admin.",
-                ephemeral=True
+        if await reject_unknown_team(interaction, team_number):
+            return
+        await submit_verification(interaction, name, team_number)
+
+# --- Verification submission ---
+# Shared by the verification modal and the /verify command.
+
+async def submit_verification(interaction: discord.Interaction, name: str, team_number: str):
+    """
+    Submits a verification request from the modal or the /verify command: checks the admin
+    channel and posts the request there, one submission per member at a time.
+    The team number is normalized and validated by the caller.
+    The interaction is deferred first, so posting to the admin channel (which queues behind
+    other admin work and rate limits) can't run past Discord's 3 second deadline; every
+    outcome is sent as a follow-up.
+    """
+    member = interaction.user
+    await outbound.run(Priority.INTERACTION, interaction.response.defer(ephemeral=True, thinking=True))
+    interaction_acknowledged(interaction)
+    admin_channel_id = guild_configs.get(interaction.guild.id).admin_log_channel_id
+    admin_channel = interaction.guild.get_channel(admin_channel_id) if admin_channel_id else None
+    if not admin_channel:
+        logging.error(f"Admin log channel not found for ID: {admin_channel_id} in {interaction.guild.name}. Cannot send verification request.")
+        await outbound.run(Priority.ADMIN, interaction.followup.send(
+            "Error: Admin log channel not found. Please contact an admin.",
+            ephemeral=True
+        ))
+        return
+    logging.info(f"Admin channel found: {admin_channel.name} ({admin_channel.id}).")
+
+    submission = (interaction.guild.id, member.id)
+    if submission in submissions_in_progress:
+        # The previous submission hasn't reached the admin channel yet, it would post a second message
+        await outbound.run(Priority.ADMIN, interaction.followup.send(
+            config.VERIFICATION_THROTTLED_MESSAGE.format(seconds=1), ephemeral=True
+        ))
+        return
+    submissions_in_progress.add(submission)
+    try:
+        await post_verification_request(interaction, admin_channel, name, team_number)
+    finally:
+        submissions_in_progress.discard(submission)
+
+async def post_verification_request(interaction: discord.Interaction, admin_channel, name: str, team_number: str):
+    """
+    Stores the request and shows it in the admin channel. A member submitting again while
+    their request is pending gets it updated, and its admin message edited in place.
+    The interaction was deferred by `submit_verification`: replies are follow-ups.
+    """
+    member = interaction.user
+    # A member has one pending request per guild: resubmitting returns the same ID
+    request_id = store.add_pending(interaction.guild.id, member.id, name, team_number)
+    journal.record(events.SUBMIT, interaction.guild.id, member.id, request_id, team_number)
+    member_cache.add(member) # Likely reviewed soon, saves the fetch on approval
+    if config.REVIEW_BOARD_MODE:
+        # No message of its own: the request shows up on the board's next update
+        review_board_changed(interaction.guild.id)
+        logging.info(f"Verification request #{request_id} stored for {member.name}, listed on the review board.")
+        await outbound.run(Priority.ADMIN, interaction.followup.send(
+            "Your verification request has been submitted! An admin will review it shortly.",
+            ephemeral=True
+        ))
+        return
+    embed = build_request_embed(request_id, member.id, name, team_number)
+    logging.info("Verification request embed created.")
+
+    if await update_request_embed(store.get_pending(request_id), embed):
+        logging.info(f"Verification request #{request_id} of {member.name} updated in place.")
+        await outbound.run(Priority.ADMIN, interaction.followup.send(config.VERIFICATION_UPDATED_MESSAGE, ephemeral=True))
+        return
+
+    admin_view = AdminApprovalView(request_id)
+    logging.info(f"Verification request #{request_id} stored for {member.name}.")
+    
+    try:
+        message = await outbound.run(Priority.ADMIN, admin_channel.send(embed=embed, view=admin_view))
+        store.set_request_message(request_id, message.channel.id, message.id)
+        logging.info(f"Successfully sent verification request to admin channel ({admin_channel.name}) for {member.name}.")
+        await outbound.run(Priority.ADMIN, interaction.followup.send(
+            "Your verification request has been submitted! An admin will review it shortly.",
+            ephemeral=True
+        ))
+        logging.info("Ephemeral message sent to user confirming submission.")
+    except discord.Forbidden:
+        logging.error(f"Forbidden permission when sending to admin log channel ({admin_channel.name}). Check bot's role hierarchy and channel permissions.", exc_info=True)
+        store.discard_unsent(request_id)
+        await outbound.run(Priority.ADMIN, interaction.followup.send(
+            "Error: I don't have permission to send to the admin log channel. Please contact an admin.",
+            ephemeral=True
+        ))
+    except Exception as e:
+        logging.error(f"An unexpected error occurred during modal submission callback for {member.name}: {e}", exc_info=True)
+        store.discard_unsent(request_id)
+        await outbound.run(Priority.ADMIN, interaction.followup.send(
+            f"An unexpected error occurred during submission. Error: {e}. Please try again later or contact an admin.",
+            ephemeral=True
+        ))
+
+async def reject_unknown_team(interaction: discord.Interaction, team_number: str) -> bool:
+    """
+    Refuses a team that isn't registered, when a team directory is configured: tells the
+    member and returns True, the caller must stop there. No team at all is always fine.
+    """
+    if not team_number or not config.TEAM_DIRECTORY_FILE or team_number in team_index:
+        return False
+    logging.info(f"{interaction.user.name} (ID: {interaction.user.id}) submitted unknown team '{team_number}'.")
+    await outbound.run(Priority.INTERACTION, interaction.response.send_message(
+        config.VERIFICATION_UNKNOWN_TEAM_MESSAGE.format(team=team_number), ephemeral=True
+    ))
+    interaction_acknowledged(interaction)
+    return True
+
+@bot.tree.command(name="verify", description="Request verification, with your name and team.")
+@app_commands.describe(name="Your name", team="Your team number or name, pick it from the list (leave out if you have no team)")
+@app_commands.guild_only()
+async def verify(interaction: discord.Interaction, name: app_commands.Range[str, 1, 100],
+                 team: Optional[app_commands.Range[str, 1, 100]] = None):
+    """Slash command alternative to the verify button and modal, with team autocomplete."""
+    member = interaction.user
+    logging.info(f"/verify used by {member.name} (ID: {member.id}).")
+    if await throttle_user(interaction, "submit"):
+        return
+    verified_role = member.guild.get_role(guild_configs.get(member.guild.id).verified_role_id)
+    if verified_role and member.get_role(verified_role.id):
+        await outbound.run(Priority.INTERACTION, interaction.response.send_message(config.VERIFICATION_ALREADY_VERIFIED, ephemeral=True))
+        return
+    team_number = normalize_team(team) if team else ""
+    logging.info(f"Command data received: User={member.id}, Name='{name}', Team='{team_number}'.")
+    if await reject_unknown_team(interaction, team_number):
+        return
+    await submit_verification(interaction, name, team_number)
+
+@verify.autocomplete("team")
+async def verify_team_autocomplete(interaction: discord.Interaction, current: str):
+    """Answered from the in-memory prefix index, well within Discord's 3 second deadline."""
+    choices = []
+    for team_number in team_index.search(current):
+        name = team_index.name(team_number)
+        label = f"{team_number} · {name}" if name else team_number
+        choices.append(app_commands.Choice(name=label[:100], value=team_number))
+    return choices
+
+# --- Guild setup ---
+
+def describe_settings(settings: GuildSettings) -> str:
+    def mention(object_id, prefix):
+        return f"<{prefix}{object_id}>" if object_id else "not set"
+    return (
+        f"Verified role: {mention(settings.verified_role_id, '@&')}\n"
+        f"Admin log channel: {mention(settings.admin_log_channel_id, '#')}\n"
+        f"Welcome channel: {mention(settings.welcome_channel_id, '#')}"
+    )
+
+@bot.tree.command(name="verification_setup", description="Show or change the verification settings of this server.")
+@app_commands.describe(
+    verified_role="Role given to approved members",
+    admin_channel="Channel where verification requests are reviewed",
+    welcome_channel="Channel holding the welcome message with the verify button",
+)
+@app_commands.default_permissions(manage_guild=True)
+@app_commands.guild_only()
+async def verification_setup(interaction: discord.Interaction, verified_role: Optional[discord.Role] = None,
+                             admin_channel: Optional[discord.TextChannel] = None,
+                             welcome_channel: Optional[discord.TextChannel] = None):
+    """Slash command storing this guild's settings; options left out keep their current value."""
+    guild = interaction.guild
+    current = guild_configs.get(guild.id)
+    if verified_role is None and admin_channel is None and welcome_channel is None:
+        await outbound.run(Priority.INTERACTION, interaction.response.send_message(describe_settings(current), ephemeral=True))
+        return
+
+    settings = GuildSettings(
+        verified_role.id if verified_role else current.verified_role_id,
+        admin_channel.id if admin_channel else current.admin_log_channel_id,
+        welcome_channel.id if welcome_channel else current.welcome_channel_id,
+    )
+    guild_configs.set(guild.id, settings)
+    logging.info(f"Verification settings of {guild.name} (ID: {guild.id}) updated by {interaction.user.name}: {settings}.")
+    await outbound.run(Priority.INTERACTION, interaction.response.send_message(f"Settings saved.\n{describe_settings(settings)}", ephemeral=True))
+    if settings.welcome_channel_id != current.welcome_channel_id:
+        schedule_welcome_check(guild)
+    if settings.admin_log_channel_id != current.admin_log_channel_id:
+        review_board_changed(guild.id) # Moves the board to the new channel
+
+# --- Verification stats ---
+
+def format_duration(seconds: float) -> str:
+    if seconds is None:
+        return "n/a"
+    minutes, seconds = divmod(int(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    days, hours = divmod(hours, 24)
+    parts = [f"{value}{unit}" for value, unit in ((days, "d"), (hours, "h"), (minutes, "m")) if value]
+    return " ".join(parts[:2]) if parts else f"{seconds}s"
+
+async def describe_stats(guild_id: int, days: int) -> str:
+    """Summary of the journal over the last `days` days, read from the daily counts and the index."""
+    since = events.day_start(time.time() - days * 86400) # Whole UTC days, as the daily counts
+    totals = await journal.totals(guild_id, since)
+    count = lambda kind: totals.get(kind, (0, 0))[0]
+    lines = [
+        f"**Last {days} days**",
+        f"Joins: {count(events.JOIN)} · Submissions: {count(events.SUBMIT)} · "
+        f"Approved: {count(events.APPROVE)} · Denied: {count(events.DENY)}",
+        f"Median time to approve: {format_duration(await journal.median_decision_seconds(guild_id, events.APPROVE, since))} · "
+        f"to deny: {format_duration(await journal.median_decision_seconds(guild_id, events.DENY, since))}",
+    ]
+    per_day = {}
+    for row in await journal.daily_counts(guild_id, events.APPROVE, since):
+        per_day.setdefault(row["day"], []).append(f"{row['team_number'] or 'no team'} ×{row['count']}")
+    if per_day:
+        lines.append("Approvals per team and day:")
+        lines.extend(f"`{day}` {', '.join(teams)}" for day, teams in per_day.items())
+    text = "\n".join(lines)
+    if len(text) > DISCORD_MESSAGE_LIMIT:
+        text = text[:DISCORD_MESSAGE_LIMIT - len("\n…")] + "\n…"
+    return text
+
+EXPORT_SIZE_LIMIT = 8 * 1024 * 1024 # Attachment size any guild accepts
+
+@bot.tree.command(name="verification_stats", description="Show verification statistics, or export the event journal.")
+@app_commands.describe(days="Period to cover, in days", export="Attach the events of the period as a CSV file")
+@app_commands.default_permissions(manage_guild=True)
+@app_commands.guild_only()
+async def verification_stats(interaction: discord.Interaction, days: app_commands.Range[int, 1, 3650] = 7, export: bool = False):
+    """Slash command reporting the journal's counts and decision times; the journal is never scanned as a whole."""
+    await outbound.run(Priority.INTERACTION, interaction.response.defer(ephemeral=True, thinking=True))
+    await journal.flush() # Include the events of the last seconds
+    summary = await describe_stats(interaction.guild.id, days)
+    if not export:
+        await outbound.run(Priority.ADMIN, interaction.followup.send(summary, ephemeral=True))
+        return
+    # The export is streamed to a temporary file page by page, never held in memory
+    with tempfile.TemporaryFile() as raw:
+        text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+        exported = await journal.export_csv(interaction.guild.id, events.day_start(time.time() - days * 86400), text)
+        text.flush()
+        size = raw.tell()
+        text.detach()
+        if size > EXPORT_SIZE_LIMIT:
+            await outbound.run(Priority.ADMIN, interaction.followup.send(
+                f"{summary}\n\nThe export ({exported} events) is too large to attach, try fewer days.", ephemeral=True
+            ))
+            return
+        raw.seek(0)
+        export_file = discord.File(raw, filename=f"verification-events-{interaction.guild.id}-{days}d.csv")
+        await outbound.run(Priority.ADMIN, interaction.followup.send(summary, file=export_file, ephemeral=True))
+    logging.info(f"{interaction.user.name} exported {exported} journal events of {interaction.guild.name}.")
+
+# --- Loop monitor ---
+
+@bot.tree.command(name="loop_monitor", description="Show the event loop monitor's results, or switch it on or off.")
+@app_commands.describe(action="status: show the results, on/off: switch the monitor, reset: clear the results")
+@app_commands.default_permissions(administrator=True)
+async def loop_monitor_command(interaction: discord.Interaction, action: Literal["status", "on", "off", "reset"] = "status"):
+    """Slash command controlling the loop monitor; it covers the whole process, so it is kept to the bot's owners."""
+    if not await bot.is_owner(interaction.user):
+        await outbound.run(Priority.INTERACTION, interaction.response.send_message(
+            "Only the bot's owners can use this command.", ephemeral=True
+        ))
+        return
+    if action == "on":
+        loop_monitor.enable()
+    elif action == "off":
+        loop_monitor.disable()
+    elif action == "reset":
+        loop_monitor.reset()
+    if action != "status":
+        logging.info(f"{interaction.user.name} used /loop_monitor {action}.")
+    report = loop_monitor.summary()
+    if len(report) > DISCORD_MESSAGE_LIMIT - len("```\n\n```"):
+        report = report[:DISCORD_MESSAGE_LIMIT - len("```\n…\n```")] + "…"
+    await outbound.run(Priority.INTERACTION, interaction.response.send_message(f"```\n{report}\n```", ephemeral=True))
+
+# --- Bulk review ---
+
+class BulkReviewJob:
+    """
+    Approves or denies every pending request matching a filter (team number, age).
+    Requests are read from the store one page at a time and decided by up to
+    `BULK_REVIEW_CONCURRENCY` concurrent workers; role grants and embed edits pace
+    themselves on the rate-limit tracker. The job and its cursor are saved after every
+    page, so a run interrupted by a restart is resumed from on_ready. Decided requests
+    are no longer pending, which makes replaying a page harmless. Each guild has its own job.
+    """
+    STORE_KEY = "bulk_review_job:{guild_id}"
+    PAGE_SIZE = 50
+
+    def __init__(self, guild_id: int, action: str, moderator_id: int, team_number: str = None,
+                 created_before: float = None, cursor: int = 0, counts: dict = None):
+        self.guild_id = guild_id
+        self.action = action
+        self.moderator_id = moderator_id
+        self.team_number = team_number
+        self.created_before = created_before
+        self.cursor = cursor
+        self.counts = counts or {}
+
+    @classmethod
+    def load(cls, guild_id: int):
+        """Returns the job a previous run left unfinished in the guild, if any."""
+        saved = store.get_value(cls.STORE_KEY.format(guild_id=guild_id))
+        return cls(**saved) if saved else None
+
+    @property
+    def store_key(self) -> str:
+        return self.STORE_KEY.format(guild_id=self.guild_id)
+
+    def save(self):
+        store.set_value(self.store_key, vars(self))
+
+    def summary(self) -> str:
+        handled = sum(self.counts.values())
+        details = ", ".join(f"{count} {outcome.replace('_', ' ')}" for outcome, count in sorted(self.counts.items()))
+        return f"Bulk {self.action}: {handled} requests handled" + (f" ({details})" if details else "") + "."
+
+    async def run(self, progress=None):
+        """Runs the job to completion, awaiting `progress(job)` after every page."""
+        guild = bot.get_guild(self.guild_id)
+        if guild is None:
+            logging.error(f"Bulk {self.action} job for guild {self.guild_id} dropped: guild not available.")
+            store.delete_value(self.store_key)
+            return
+        decide = approve_request if self.action == "approve" else deny_request
+        moderator_mention = f"<@{self.moderator_id}> (bulk)"
+        semaphore = asyncio.Semaphore(config.BULK_REVIEW_CONCURRENCY)
+
+        async def decide_one(request):
+            async with semaphore:
+                try:
+                    outcome = await decide(guild, request, moderator_mention, moderator_id=self.moderator_id)
+                except Exception as e:
+                    # The request stays pending and is picked up again by the next run
+                    logging.error(f"Bulk {self.action} failed for request #{request['request_id']}: {e}")
+                    outcome = "failed"
+                self.counts[outcome] = self.counts.get(outcome, 0) + 1
+
+        self.save()
+        while True:
+            page = store.list_pending(self.cursor, self.team_number, self.created_before, self.PAGE_SIZE, guild_id=self.guild_id)
+            if not page:
+                break
+            await asyncio.gather(*(decide_one(request) for request in page))
+            self.cursor = page[-1]["request_id"]
+            self.save()
+            if progress is not None:
+                await progress(self)
+        store.delete_value(self.store_key)
+        logging.info(self.summary())
+
+def start_bulk_review(job: BulkReviewJob, progress=None) -> asyncio.Task:
+    return scheduler.spawn(f"bulk_review:{job.guild_id}", lambda: job.run(progress))
+
+def bulk_review_running(guild_id: int) -> bool:
+    return scheduler.is_running(f"bulk_review:{guild_id}")
+
+@bot.tree.command(name="bulk_review", description="Approve or deny all pending verification requests matching the filters.")
+@app_commands.describe(
+    action="What to do with the matching requests",
+    team="Only requests submitted with this team number",
+    older_than_minutes="Only requests submitted at least this many minutes ago",
+)
+@app_commands.default_permissions(manage_roles=True)
+@app_commands.guild_only()
+async def bulk_review(interaction: discord.Interaction, action: Literal["approve", "deny"],
+                      team: Optional[str] = None, older_than_minutes: Optional[app_commands.Range[int, 0]] = None):
+    """Slash command running a `BulkReviewJob`, reporting progress in its ephemeral response."""
+    if bulk_review_running(interaction.guild.id):
+        await outbound.run(Priority.INTERACTION, interaction.response.send_message("A bulk review is already running, wait for it to finish.", ephemeral=True))
+        return
+    await outbound.run(Priority.INTERACTION, interaction.response.defer(ephemeral=True, thinking=True))
+    logging.info(f"Bulk {action} started by {interaction.user.name} (team={team}, older_than_minutes={older_than_minutes}).")
+
+    created_before = time.time() - older_than_minutes * 60 if older_than_minutes is not None else None
+    job = BulkReviewJob(interaction.guild.id, action, interaction.user.id, normalize_team(team) if team else None, created_before)
+    last_report = 0
+
+    async def report_progress(job):
+        nonlocal last_report
+        # Edits are cheap but not free: at most one every couple of seconds
+        if time.monotonic() - last_report < 2:
+            return
+        last_report = time.monotonic()
+        try:
+            await outbound.run(Priority.ADMIN, interaction.edit_original_response(content=f"{job.summary()} Still running…"))
+        except discord.HTTPException:
+            # The interaction token expires after 15 minutes, the job goes on regardless
+            pass
+
+    await start_bulk_review(job, report_progress)
+    try:
+        await outbound.run(Priority.ADMIN, interaction.edit_original_response(content=job.summary()))
+    except discord.HTTPException:
+        pass
+
+# --- Review board ---
+# With REVIEW_BOARD_MODE, requests get no message of their own. A few board messages in the admin
+# channel list them and are edited in place, so admin channel writes follow the update interval
+# rather than the number of requests.
+
+EMBED_DESCRIPTION_LIMIT = 4096
+SELECT_OPTION_TEXT_LIMIT = 100 # Label and description of a select option
+
+def shorten(text: str, width: int) -> str:
+    return text if len(text) <= width else text[:width - 1] + "…"
+
+def build_review_board_embed(requests, page: int, pages: int, hidden: int) -> discord.Embed:
+    """
+    One page of the review board, `hidden` being the pending requests past the last page.
+    Names and teams are shortened so a full page stays within Discord's limits: a rejected
+    edit would be retried with the same content forever.
+    """
+    lines = [
+        f"`#{request['request_id']}` <@{request['member_id']}> · {shorten(request['name'], 40)} · "
+        f"Team {shorten(request['team_number'], 20) if request['team_number'] else 'N/A'}"
+        for request in requests
+    ]
+    description = "\n".join(lines) if lines else "No pending requests."
+    if len(description) > EMBED_DESCRIPTION_LIMIT:
+        description = description[:description.rfind("\n", 0, EMBED_DESCRIPTION_LIMIT - len("\n…"))] + "\n…"
+    embed = discord.Embed(
+        title=config.REVIEW_BOARD_EMBED_TITLE,
+        color=discord.Color.blue(),
+        description=description,
+    )
+    footer = f"Page {page + 1}/{pages} · Pick requests in the menus below to approve or deny them."
+    if hidden:
+        footer += f" {hidden} more requests will show up as these are decided."
+    embed.set_footer(text=footer)
+    return embed
+
+class ReviewBoardSelect(DynamicItem[discord.ui.Select], template=r"review_board:(?P<action>approve|deny)"):
+    """
+    Approve/Deny menu of a review board page. The options carry the request IDs, so like
+    `AdminDecisionButton` a single registered handler serves every board message, including
+    those sent before a restart. Several requests can be picked at once.
+    """
+    def __init__(self, action: str, requests=()):
+        options = [
+            discord.SelectOption(
+                label=shorten(f"#{request['request_id']} {request['name']}", SELECT_OPTION_TEXT_LIMIT),
+                value=str(request["request_id"]),
+                description=shorten(f"Team {request['team_number']}", SELECT_OPTION_TEXT_LIMIT) if request["team_number"] else None,
             )
+            for request in requests
+        ]
+        super().__init__(discord.ui.Select(
+            custom_id=f"review_board:{action}",
+            placeholder="Approve…" if action == "approve" else "Deny…",
+            max_values=max(1, len(options)),
+            # A menu needs at least one option, even on an empty board
+            options=options or [discord.SelectOption(label="No pending requests", value="0")],
+            disabled=not options,
+        ))
+        self.action = action
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Select, match):
+        return cls(match["action"])
+
+    @timed_interaction("review_board_callback")
+    async def callback(self, interaction: discord.Interaction):
+        request_ids = [int(value) for value in self.item.values]
+        logging.info(f"{interaction.user.name} picked requests {request_ids} to {self.action} on the review board.")
+        await outbound.run(Priority.INTERACTION, interaction.response.defer(ephemeral=True, thinking=True))
+        interaction_acknowledged(interaction)
+
+        outcomes, notes = Counter(), []
+        for request_id in request_ids:
+            request = store.get_pending(request_id)
+            if request is None or request["guild_id"] != interaction.guild.id:
+                outcomes["already_handled"] += 1
+                continue
+            try:
+                if self.action == "approve":
+                    outcome = await approve_request(interaction.guild, request, interaction.user.mention, notes=notes,
+                                                    moderator_id=interaction.user.id)
+                else:
+                    outcome = await deny_request(interaction.guild, request, interaction.user.mention, moderator_id=interaction.user.id)
+            except discord.Forbidden:
+                logging.error(f"Bot lacks permissions to manage roles for member ID {request['member_id']}. Check role hierarchy.")
+                notes.append(f"#{request_id}: I don't have permission to manage roles. Please check my role hierarchy.")
+                outcome = "failed"
+            except Exception as e:
+                logging.error(f"An error occurred during the {self.action} of request #{request_id}: {e}", exc_info=True)
+                notes.append(f"#{request_id}: An error occurred: {e}")
+                outcome = "failed"
+            outcomes[outcome] += 1
+
+        summary = ", ".join(f"{count} {outcome.replace('_', ' ')}" for outcome, count in outcomes.items())
+        await outbound.run(Priority.ADMIN, interaction.followup.send("\n".join([summary, *notes])[:DISCORD_MESSAGE_LIMIT], ephemeral=True))
+
+class ReviewBoardView(View):
+    """Lays out the menus of one board page; like `AdminApprovalView`, it is never tracked."""
+    def __init__(self, requests):
+        super().__init__(timeout=None)
+        self.add_item(ReviewBoardSelect("approve", requests))
+        self.add_item(ReviewBoardSelect("deny", requests))
+        self.stop()
+
+class ReviewBoard:
+    """
+    The review board of one guild: up to `max_pages` messages in the admin channel, each
+    listing `page_size` pending requests with an Approve and a Deny menu.
+    Changes only mark the board stale; it is re-rendered at most once every `interval`
+    seconds, and pages whose content didn't change are not edited. The board message IDs
+    are persisted in the bot store, so a restart keeps editing the same messages.
+    """
+    STORE_KEY = "review_board:{guild_id}"
+
+    def __init__(self, store, guild_id: int, page_size: int, max_pages: int, interval: float):
+        self.store = store
+        self.guild_id = guild_id
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self.interval = interval
+        self.store_key = self.STORE_KEY.format(guild_id=guild_id)
+        saved = store.get_value(self.store_key, {})
+        self.channel_id = saved.get("channel_id")
+        self.message_ids = saved.get("message_ids", [])
+        self._rendered = {} # Message ID -> digest of the content it was last sent with
+        self._stale = False
+
+    def mark_stale(self):
+        """Schedules an update; changes arriving until it runs are folded into it."""
+        self._stale = True
+        scheduler.spawn(f"review_board:{self.guild_id}", self._update_loop)
+
+    def forget(self, message_id: int) -> bool:
+        """Drops a deleted board message. Returns True if it was one."""
+        if message_id not in self.message_ids:
+            return False
+        self.message_ids.remove(message_id)
+        self._save()
+        return True
+
+    async def _update_loop(self):
+        while self._stale:
+            await asyncio.sleep(self.interval)
+            self._stale = False
+            guild = bot.get_guild(self.guild_id)
+            if guild is None:
+                return
+            try:
+                await self.render(guild)
+            except Exception as e:
+                logging.error(f"Failed to update the review board of {guild.name}: {e}", exc_info=True)
+
+    def _save(self):
+        self.store.set_value(self.store_key, {"channel_id": self.channel_id, "message_ids": self.message_ids})
+
+    async def render(self, guild: discord.Guild):
+        """Brings the board messages in line with the pending requests of the guild."""
+        channel_id = guild_configs.get(guild.id).admin_log_channel_id
+        channel = guild.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            logging.warning(f"Admin log channel not found for ID: {channel_id} in {guild.name}, review board not updated.")
             return
-        logging.info(f"Admin channel found: {admin_channel.name} ({admin_channel.id}).")
+        if channel.id != self.channel_id:
+            await self._delete_messages(self.message_ids)
+            self.channel_id, self.message_ids = channel.id, []
+
+        capacity = self.page_size * self.max_pages
+        requests = store.list_pending(limit=capacity, guild_id=guild.id)
+        hidden = store.count_pending(guild.id) - len(requests) if len(requests) == capacity else 0
+        pages = [requests[start:start + self.page_size] for start in range(0, len(requests), self.page_size)] or [[]]
 
-        embed = discord.Embed(
-            title=config.ADMIN_LOG_EMBED_TITLE,
-            color=discord.Color.blue(),
-            description=f"User: {member.mention} (`{member.id}`)"
+        for number, page in enumerate(pages):
+            embed = build_review_board_embed(page, number, len(pages), hidden)
+            view = ReviewBoardView(page)
+            digest = hashlib.sha256(json.dumps([embed.to_dict(), view.to_components()], sort_keys=True).encode()).hexdigest()
+            message_id = self.message_ids[number] if number < len(self.message_ids) else None
+            if message_id is not None:
+                if self._rendered.get(message_id) == digest:
+                    continue
+                await rate_limits.wait("PATCH", f"/channels/{channel.id}/messages/{message_id}")
+                try:
+                    await outbound.run(Priority.ADMIN, channel.get_partial_message(message_id).edit(embed=embed, view=view))
+                except discord.NotFound:
+                    message_id = None
+            if message_id is None:
+                await rate_limits.wait("POST", f"/channels/{channel.id}/messages")
+                message = await outbound.run(Priority.ADMIN, channel.send(embed=embed, view=view))
+                message_id = message.id
+                if number < len(self.message_ids):
+                    self.message_ids[number] = message_id
+                else:
+                    self.message_ids.append(message_id)
+            self._rendered[message_id] = digest
+
+        surplus = self.message_ids[len(pages):]
+        del self.message_ids[len(pages):]
+        self._save()
+        await self._delete_messages(surplus)
+
+    async def _delete_messages(self, message_ids):
+        channel = bot.get_channel(self.channel_id) if self.channel_id else None
+        for message_id in message_ids:
+            self._rendered.pop(message_id, None)
+            if channel is None:
+                continue
+            try:
+                await outbound.run(Priority.ADMIN, channel.get_partial_message(message_id).delete())
+            except discord.NotFound:
+                pass
+
+review_boards = {} # guild ID -> ReviewBoard
+
+def review_board_changed(guild_id: int):
+    """Marks the guild's review board stale, when review board mode is on."""
+    if not config.REVIEW_BOARD_MODE:
+        return
+    board = review_boards.get(guild_id)
+    if board is None:
+        board = review_boards[guild_id] = ReviewBoard(
+            store, guild_id, config.REVIEW_BOARD_PAGE_SIZE, config.REVIEW_BOARD_MAX_PAGES, config.REVIEW_BOARD_UPDATE_INTERVAL
+        )
+    board.mark_stale()
+
+# --- Reconciliation sweep ---
+
+class ReconciliationSweep:
+    """
+    Finds the members of a guild who are neither verified nor waiting for a decision: they
+    joined while the bot was down, or their request got lost. Members are read with
+    `fetch_members` one page at a time, in ID order, at log priority so the sweep gives way to
+    everything else. The cursor and the counts are saved after every page, so the sweep of a
+    large guild spreads over many scheduler ticks and goes on where it stopped after a restart.
+    At the end of a sweep, the members found are reported in the admin channel.
+    """
+    STORE_KEY = "reconcile:{guild_id}"
+    SAMPLE_SIZE = 20 # Members mentioned in the report
+
+    def __init__(self, guild_id: int):
+        self.guild_id = guild_id
+        self.store_key = self.STORE_KEY.format(guild_id=guild_id)
+        state = store.get_value(self.store_key, {})
+        self.cursor = state.get("cursor", 0) # ID of the last member checked, 0 between sweeps
+        self.checked = state.get("checked", 0)
+        self.found = state.get("found", 0)
+        self.sample = state.get("sample", [])
+        self.finished_at = state.get("finished_at", 0)
+
+    def due(self) -> bool:
+        return self.cursor > 0 or time.time() - self.finished_at >= config.RECONCILE_INTERVAL
+
+    def save(self):
+        store.set_value(self.store_key, {
+            "cursor": self.cursor, "checked": self.checked, "found": self.found,
+            "sample": self.sample, "finished_at": self.finished_at,
+        })
+
+    async def step(self, guild: discord.Guild):
+        """Checks the next page of members, and ends the sweep after the last one."""
+        async def fetch_page():
+            after = discord.Object(self.cursor) if self.cursor else None
+            return [member async for member in guild.fetch_members(limit=config.RECONCILE_PAGE_SIZE, after=after)]
+
+        await rate_limits.wait("GET", f"/guilds/{guild.id}/members")
+        members = await outbound.run(Priority.LOG, fetch_page())
+        verified_role_id = guild_configs.get(guild.id).verified_role_id
+        joined_before = time.time() - config.RECONCILE_GRACE
+        candidates = [
+            member for member in members
+            if not member.bot
+            and not (verified_role_id and member.get_role(verified_role_id))
+            and (member.joined_at is None or member.joined_at.timestamp() < joined_before)
+        ]
+        pending = store.pending_member_ids(guild.id, [member.id for member in candidates])
+        unverified = [member for member in candidates if member.id not in pending]
+
+        self.checked += len(members)
+        self.found += len(unverified)
+        self.sample.extend(member.id for member in unverified[:self.SAMPLE_SIZE - len(self.sample)])
+        if unverified and config.RECONCILE_DM_REMINDERS:
+            await self.remind(guild, unverified)
+        if len(members) < config.RECONCILE_PAGE_SIZE:
+            await self.finish(guild)
+        else:
+            self.cursor = max(member.id for member in members)
+            self.save()
+
+    async def remind(self, guild: discord.Guild, members: list):
+        """DMs the members a reminder, unless they already got one recently."""
+        since = time.time() - config.RECONCILE_REMINDER_INTERVAL
+        already_reminded = store.prompted_member_ids(guild.id, [member.id for member in members], since)
+        welcome_channel_id = guild_configs.get(guild.id).welcome_channel_id
+        message = config.RECONCILE_REMINDER_MESSAGE.format(
+            guild=guild.name, channel=f"<#{welcome_channel_id}>" if welcome_channel_id else "the welcome channel"
         )
-        embed.add_field(name="Submitted Name", value=name, inline=True)
-        embed.add_field(name="Submitted Team #", value=team_number if team_number else "N/A", inline=True)
-        embed.set_footer(text="Review and approve/deny below.")
-        logging.info("Verification request embed created.")
-
-        admin_view = AdminApprovalView(member.id, name, team_number)
-        logging.info("AdminApprovalView instance created for the request.")
-        
+        reminded = []
+        for member in members:
+            if member.id in already_reminded:
+                continue
+            try:
+                await outbound.run(Priority.DM, member.send(message))
+            except discord.Forbidden:
+                pass # DMs disabled, they are still listed in the report
+            except discord.HTTPException as e:
+                logging.warning(f"Could not send a verification reminder to {member.name}: {e}")
+                continue
+            reminded.append(member.id)
+        store.mark_prompted(guild.id, reminded)
+        if reminded:
+            logging.info(f"Sent verification reminders to {len(reminded)} members of {guild.name}.")
+
+    async def finish(self, guild: discord.Guild):
+        logging.info(f"Reconciliation of {guild.name}: {self.checked} members checked, {self.found} neither verified nor pending.")
+        if self.found:
+            await self.report(guild)
+        self.cursor, self.checked, self.found, self.sample = 0, 0, 0, []
+        self.finished_at = time.time()
+        self.save()
+
+    async def report(self, guild: discord.Guild):
+        channel_id = guild_configs.get(guild.id).admin_log_channel_id
+        channel = guild.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            return
+        mentions = ", ".join(f"<@{member_id}>" for member_id in self.sample)
+        more = f" and {self.found - len(self.sample)} more" if self.found > len(self.sample) else ""
+        reminders = " They were sent a reminder by DM." if config.RECONCILE_DM_REMINDERS else ""
+        await rate_limits.wait("POST", f"/channels/{channel.id}/messages")
+        await outbound.run(Priority.ADMIN, channel.send(
+            f"Reconciliation: {self.found} of {self.checked} members are neither verified nor waiting for a decision: "
+            f"{mentions}{more}.{reminders}",
+            allowed_mentions=discord.AllowedMentions.none(),
+        ))
+
+reconciliation_sweeps = {} # guild ID -> ReconciliationSweep
+reconcile_skipped = set() # Guilds without a verified role, logged once until they configure one
+
+async def reconcile_members():
+    """Advances the reconciliation sweep of every guild by one page (scheduled every `RECONCILE_PAGE_INTERVAL` seconds)."""
+    for guild in bot.guilds:
+        if not guild_configs.get(guild.id).verified_role_id:
+            # Without a verified role every member would look unverified
+            if guild.id not in reconcile_skipped:
+                reconcile_skipped.add(guild.id)
+                logging.warning(f"Not reconciling {guild.name}: no verified role is configured, see /verification_setup.")
+            continue
+        reconcile_skipped.discard(guild.id)
+        sweep = reconciliation_sweeps.get(guild.id)
+        if sweep is None:
+            sweep = reconciliation_sweeps[guild.id] = ReconciliationSweep(guild.id)
+        if not sweep.due():
+            continue
         try:
-            await admin_channel.send(embed=embed, view=admin_view)
-            logging.info(f"Successfully sent verification request to admin channel ({admin_channel.name}) for {member.name}.")
-            await interaction.response.send_message(
-                "Your verification request has been submitted! An admin will review it shortly.",
-                ephemeral=True
-            )
-            logging.info("Ephemeral message sent to user confirming submission.")
+            await sweep.step(guild)
+        except RequestShed:
+            pass # Busy with more urgent requests, the page is read again on the next tick
+        except discord.HTTPException as e:
+            logging.warning(f"Reconciliation of {guild.name} failed, retrying on the next tick: {e}")
+
+# --- Welcome message ---
+
+def build_welcome_embed() -> discord.Embed:
+    return discord.Embed(
+        title=config.VERIFY_EMBED_TITLE,
+        description=config.VERIFY_EMBED_DESCRIPTION,
+        color=discord.Color.blue()
+    )
+
+class WelcomeMessageLocator:
+    """
+    Keeps track of the welcome message carrying the verify button in one guild.
+    Its ID is persisted in the bot store and checked once per process with a single fetch;
+    after that it is trusted until a message-delete event says otherwise. The channel
+    history is only scanned when the remembered message is actually gone.
+    """
+    STORE_KEY = "welcome_message:{guild_id}"
+    LEGACY_STORE_KEY = "welcome_message" # Written before the bot served several guilds
+
+    def __init__(self, store, guild_id: int):
+        self.store = store
+        self.store_key = self.STORE_KEY.format(guild_id=guild_id)
+        # A legacy entry is only trusted if its channel is this guild's welcome channel, see `ensure`
+        saved = store.get_value(self.store_key) or store.get_value(self.LEGACY_STORE_KEY, {})
+        self.channel_id = saved.get("channel_id")
+        self.message_id = saved.get("message_id")
+        self.confirmed = False # Whether the message was seen since startup
+        self._lock = asyncio.Lock()
+
+    def is_present(self, channel_id: int) -> bool:
+        """Whether the welcome message is known to exist in the channel, without any REST call."""
+        return self.confirmed and self.message_id is not None and self.channel_id == channel_id
+
+    async def ensure(self, channel) -> bool:
+        """
+        Makes sure the channel has a welcome message, sending one if needed.
+        Returns True when a new message was sent.
+        """
+        if self.is_present(channel.id):
+            return False
+        # Concurrent callers wait for the first one instead of each sending a message
+        async with self._lock:
+            if self.is_present(channel.id):
+                return False
+            message_id = await self._resolve(channel)
+            if message_id is not None:
+                self._remember(channel.id, message_id)
+                return False
+            message = await outbound.run(Priority.ADMIN, channel.send(embed=build_welcome_embed(), view=WelcomeView()))
+            self._remember(channel.id, message.id)
+            return True
+
+    def forget(self, message_id: int) -> bool:
+        """Drops the remembered message if it is `message_id`. Returns True if it was."""
+        if message_id != self.message_id:
+            return False
+        self.message_id = None
+        self.confirmed = False
+        self.store.delete_value(self.store_key)
+        return True
+
+    def _remember(self, channel_id: int, message_id: int):
+        self.channel_id = channel_id
+        self.message_id = message_id
+        self.confirmed = True
+        self.store.set_value(self.store_key, {"channel_id": channel_id, "message_id": message_id})
+
+    async def _resolve(self, channel):
+        """Returns the ID of the existing welcome message in the channel, or None."""
+        if self.message_id is not None and self.channel_id == channel.id:
+            try:
+                await channel.fetch_message(self.message_id)
+                return self.message_id
+            except discord.NotFound:
+                logging.info(f"Remembered welcome message {self.message_id} is gone, scanning {channel.name}.")
+            except discord.HTTPException as e:
+                logging.warning(f"Could not fetch welcome message {self.message_id}: {e}. Scanning {channel.name}.")
+        return await self._scan_history(channel)
+
+    async def _scan_history(self, channel):
+        # Look for the bot's own message with the verify button among the recent messages
+        try:
+            async for msg in channel.history(limit=50):
+                if msg.author == bot.user and msg.embeds and msg.components:
+                    for component_row in msg.components:
+                        for component in component_row.children:
+                            if isinstance(component, discord.Button) and component.custom_id == "verify_button":
+                                return msg.id
         except discord.Forbidden:
-            logging.error(f"Forbidden permission when sending to admin log channel ({admin_channel.name}). Check bot's role hierarchy and channel permissions.", exc_info=True)
-            await interaction.response.send_message(
-                "Error: I don't have permission to send to the admin log channel. Please contact an admin.",
-                ephemeral=True
-            )
-        except Exception as e:
-            logging.error(f"An unexpected error occurred during modal submission callback for {member.name}: {e}", exc_info=True)
-            await interaction.response.send_message(
-                f"An unexpected error occurred during submission. Error: {e}. Please try again later or contact an admin.",
-                ephemeral=True
-            )
+            logging.error(f"Bot does not have permission to read message history in {channel.name}.")
+        return None
+
+welcome_locators = {}
+
+def welcome_locator_for(guild_id: int) -> WelcomeMessageLocator:
+    locator = welcome_locators.get(guild_id)
+    if locator is None:
+        locator = welcome_locators[guild_id] = WelcomeMessageLocator(store, guild_id)
+    return locator
+
+def welcome_channel_for(guild: discord.Guild):
+    """The guild's welcome channel, or None when it isn't configured or can't be found."""
+    channel_id = guild_configs.get(guild.id).welcome_channel_id
+    return guild.get_channel(channel_id) if channel_id else None
+
+def schedule_welcome_check(guild: discord.Guild, delay: float = 0):
+    """
+    Makes sure the guild's welcome message exists, coalescing calls: while a check is
+    scheduled or running for the guild, further calls are no-ops, so a join burst costs
+    one check at most.
+    """
+    async def check():
+        await asyncio.sleep(delay)
+        await send_welcome_message(guild)
+
+    scheduler.spawn(f"welcome_check:{guild.id}", check)
+
+# --- Join bursts ---
+
+class JoinBurstMonitor:
+    """
+    Detects join spikes in one guild with a sliding-window rate. While more than `threshold`
+    members joined the guild in the last `window` seconds it is in burst mode: its per-join
+    log lines are dropped to DEBUG and replaced by one summary per window, and its
+    welcome-message checks are debounced.
+    """
+    def __init__(self, scheduler: Scheduler, guild: discord.Guild, threshold: int, window: int):
+        self.scheduler = scheduler
+        self.guild_id = guild.id
+        self.guild_name = guild.name
+        self.threshold = threshold
+        self.window = window
+        self.rate = SlidingWindowCounter(window)
+        self.in_burst = False
+        self.joins_since_summary = 0
+        self.job_name = f"join_burst_summary:{guild.id}"
+
+    def record_join(self) -> bool:
+        """Counts a join and returns whether the guild is in burst mode."""
+        joins = self.rate.add()
+        self.joins_since_summary += 1
+        if not self.in_burst and joins > self.threshold:
+            self.in_burst = True
+            logging.warning(f"Join burst detected in {self.guild_name}: {joins} members joined in the last {self.window}s. "
+                            "Summarizing joins until it calms down.")
+            self.joins_since_summary = 0
+            self.scheduler.every(self.job_name, self.window, self._summarize)
+        return self.in_burst
+
+    async def _summarize(self):
+        logging.info(f"Join burst in {self.guild_name}: {self.joins_since_summary} members joined in the last {self.window}s.")
+        self.joins_since_summary = 0
+        if self.rate.count() <= self.threshold:
+            self.in_burst = False
+            logging.warning(f"Join burst in {self.guild_name} over, logging joins individually again.")
+            self.stop()
+
+    def stop(self):
+        self.scheduler.cancel(self.job_name)
+
+join_monitors = {}
 
+def join_monitor_for(guild: discord.Guild) -> JoinBurstMonitor:
+    monitor = join_monitors.get(guild.id)
+    if monitor is None:
+        monitor = join_monitors[guild.id] = JoinBurstMonitor(scheduler, guild, config.JOIN_BURST_THRESHOLD, config.JOIN_BURST_WINDOW)
+    return monitor
 
 # --- Bot Events ---
 
@@ -409,107 +1929,100 @@ async def on_ready():
     Event handler that runs when the bot successfully connects to Discord.
     Ensures the welcome message is sent to the designated channel.
     """
-    logging.info(f"Logged in as {bot.user} (ID: {bot.user.id})")
-    setup_discord_logging(bot, config.BOT_LOG_CHANNEL_ID)
-    # start the handler worker
-    for handler in logging.getLogger().handlers:
-        if isinstance(handler, DiscordHandler):
-            asyncio.run_coroutine_threadsafe(handler._send_log("Test message", "INFO"), bot.loop)
-            await handler.start_worker()
-            # Start the Flask server in a separate thread
-            keep_alive_thread = threading.Thread(target=keep_alive, args=(handler, bot), daemon=True)
-            keep_alive_thread.start()
-    # Ensure the welcome message is sent if it's not already there
-    await send_welcome_message()
+    logging.info(f"Logged in as {bot.user} (ID: {bot.user.id}), serving {len(bot.guilds)} guilds.")
+    if len(bot.guilds) == 1:
+        adopted = store.adopt_legacy_requests(bot.guilds[0].id)
+        if adopted:
+            logging.info(f"Assigned {adopted} pending requests from before the multi-guild upgrade to {bot.guilds[0].name}.")
+    for guild in bot.guilds:
+        # Resume a bulk review interrupted by a restart (on_ready also fires on reconnects)
+        job = BulkReviewJob.load(guild.id)
+        if job is not None and not bulk_review_running(guild.id):
+            logging.info(f"Resuming interrupted bulk {job.action} in {guild.name} after request #{job.cursor}.")
+            start_bulk_review(job)
+        # Ensure the welcome message is sent if it's not already there
+        schedule_welcome_check(guild)
+        review_board_changed(guild.id)
+
+@bot.event
+async def on_guild_join(guild):
+    logging.info(f"Joined guild {guild.name} (ID: {guild.id}).")
+    schedule_welcome_check(guild)
+    review_board_changed(guild.id)
+
+@bot.event
+async def on_guild_remove(guild):
+    logging.info(f"Removed from guild {guild.name} (ID: {guild.id}).")
+    guild_configs.invalidate(guild.id)
+    reconciliation_sweeps.pop(guild.id, None)
+    reconcile_skipped.discard(guild.id)
+    welcome_locators.pop(guild.id, None)
+    monitor = join_monitors.pop(guild.id, None)
+    if monitor is not None:
+        monitor.stop()
 
 @bot.event
 async def on_member_join(member):
     """
     Event handler that runs when a new member joins the guild.
     Sends a welcome message to the designated channel if one isn't already present.
+    Once the welcome message is known this costs no REST call; otherwise checks are
+    coalesced, so a raid costs a constant number of REST calls.
     """
-    logging.info(f"Member joined: {member.name} (ID: {member.id}).")
-    welcome_channel = bot.get_channel(config.WELCOME_CHANNEL_ID)
-    if welcome_channel:
-        embed = discord.Embed(
-            title=config.VERIFY_EMBED_TITLE,
-            description=config.VERIFY_EMBED_DESCRIPTION,
-            color=discord.Color.blue()
-        )
-        
-        # Check if the channel history already contains a message with the custom_id
-        # to avoid sending multiple welcome messages. We look for bot's own message with the button.
-        messages = []
-        try:
-            messages = [msg async for msg in welcome_channel.history(limit=50)]
-        except discord.Forbidden:
-            logging.error(f"Bot does not have permission to read message history in {welcome_channel.name}.")
-            
-        found_welcome_message = False
-        for msg in messages:
-            if msg.author == bot.user and msg.embeds and msg.components:
-                # Check for a component with the specific custom_id
-                for component_row in msg.components:
-                    for component in component_row.children:
-                        if isinstance(component, discord.ui.Button) and component.custom_id == "verify_button":
-                            found_welcome_message = True
-                            break
-                    if found_welcome_message:
-                        break
-            if found_welcome_message:
-                break
-        
-        if not found_welcome_message:
-            await welcome_channel.send(embed=embed, view=WelcomeView())
-            logging.info(f"Sent welcome message to {welcome_channel.name} for new member {member.name}.")
-        else:
-            logging.info(f"Welcome message already found in {welcome_channel.name}. Not sending again on member join.")
+    in_burst = join_monitor_for(member.guild).record_join()
+    journal.record(events.JOIN, member.guild.id, member.id)
+    log_level = logging.DEBUG if in_burst else logging.INFO
+    logging.log(log_level, f"Member joined: {member.name} (ID: {member.id}).")
+    welcome_channel_id = guild_configs.get(member.guild.id).welcome_channel_id
+    if welcome_channel_id is None or welcome_locator_for(member.guild.id).is_present(welcome_channel_id):
+        logging.log(log_level, "Welcome message already present. Not sending again on member join.")
+        return
+    # During a burst, wait a little so one check covers the whole wave
+    schedule_welcome_check(member.guild, delay=config.JOIN_BURST_WELCOME_DEBOUNCE if in_burst else 0)
 
+@bot.event
+async def on_raw_member_remove(payload):
+    member_cache.discard(payload.guild_id, payload.user.id)
 
-async def send_welcome_message():
+@bot.event
+async def on_raw_message_delete(payload):
+    """Re-sends the welcome message as soon as it gets deleted, and review board pages on the next update."""
+    board = review_boards.get(payload.guild_id)
+    if board is not None and board.forget(payload.message_id):
+        board.mark_stale()
+    locator = welcome_locators.get(payload.guild_id)
+    if locator is not None and locator.forget(payload.message_id):
+        logging.warning(f"Welcome message {payload.message_id} was deleted, sending a new one.")
+        guild = bot.get_guild(payload.guild_id)
+        if guild is not None:
+            schedule_welcome_check(guild)
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    board = review_boards.get(payload.guild_id)
+    if board is not None and any([board.forget(message_id) for message_id in payload.message_ids]):
+        board.mark_stale()
+    locator = welcome_locators.get(payload.guild_id)
+    if locator is not None and locator.message_id in payload.message_ids and locator.forget(locator.message_id):
+        logging.warning("Welcome message was bulk deleted, sending a new one.")
+        guild = bot.get_guild(payload.guild_id)
+        if guild is not None:
+            schedule_welcome_check(guild)
+
+
+async def send_welcome_message(guild: discord.Guild):
     """
-    Sends the initial welcome message to the designated channel.
-    This function is called on bot startup to ensure the message is present.
+    Sends the welcome message to the guild's welcome channel unless it is already there.
+    Called for every guild on startup to ensure the message is present.
     """
-    welcome_channel = bot.get_channel(config.WELCOME_CHANNEL_ID)
+    welcome_channel = welcome_channel_for(guild)
     if welcome_channel:
-        # Check if the channel history already contains a message with the custom_id
-        # to avoid sending multiple welcome messages on bot restart
-        messages = []
-        try:
-            messages = [msg async for msg in welcome_channel.history(limit=50)]
-        except discord.Forbidden:
-            logging.error(f"Bot does not have permission to read message history in {welcome_channel.name}.")
-            
-        found_welcome_message = False
-        for msg in messages:
-            if msg.author == bot.user and msg.embeds and msg.components:
-                for component_row in msg.components:
-                    for component in component_row.children:
-                        if isinstance(component, discord.ui.Button) and component.custom_id == "verify_button":
-                            found_welcome_message = True
-                            break
-                    if found_welcome_message:
-                        break
-            if found_welcome_message:
-                break
-        
-        if not found_welcome_message:
-            embed = discord.Embed(
-                title=config.VERIFY_EMBED_TITLE,
-                description=config.VERIFY_EMBED_DESCRIPTION,
-                color=discord.Color.blue()
-            )
-            await welcome_channel.send(embed=embed, view=WelcomeView())
+        if await welcome_locator_for(guild.id).ensure(welcome_channel):
             logging.info(f"Initial welcome message sent to {welcome_channel.name}.")
         else:
             logging.info(f"Welcome message already found in {welcome_channel.name}. Not sending again on startup.")
 
 if __name__ == '__main__':
-    # Start the Flask server in a separate thread
-    flask_thread = threading.Thread(target=run_flask, daemon=True)
-    flask_thread.start()
-
-    # Start the Discord bot
+    # Start the Discord bot (the web server is started from setup_hook)
     bot.run(config.BOT_TOKEN)
 
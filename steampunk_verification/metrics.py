@@ -0,0 +1,153 @@
+# metrics.py
+import math
+import time
+from bisect import bisect_left
+
+
+# Upper bounds (seconds) of the default histogram buckets, tuned around Discord's 3 s interaction deadline
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A monotonically increasing value, optionally split by a single label."""
+    def __init__(self, name: str, documentation: str, label: str = None):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self._values = {}
+
+    def inc(self, label_value: str = None, amount: float = 1) -> None:
+        self._values[label_value] = self._values.get(label_value, 0) + amount
+
+    def value(self, label_value: str = None) -> float:
+        return self._values.get(label_value, 0)
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} counter"
+        if not self._values:
+            yield f"{self.name} 0"
+        for label_value, value in sorted(self._values.items(), key=lambda item: str(item[0])):
+            labels = {self.label: label_value} if self.label else {}
+            yield f"{self.name}{_format_labels(labels)} {_format_value(value)}"
+
+
+class Gauge:
+    """
+    A value read from a callback at scrape time, so the hot path never updates it.
+    Values that only grow (like a drop count kept elsewhere) can be exposed with `metric_type="counter"`.
+    """
+    def __init__(self, name: str, documentation: str, callback, metric_type: str = "gauge"):
+        self.name = name
+        self.documentation = documentation
+        self.callback = callback
+        self.metric_type = metric_type
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} {self.metric_type}"
+        yield f"{self.name} {_format_value(self.callback())}"
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. Bucket counts are pre-allocated per label value, so an
+    observation is one bisect and two additions.
+    """
+    def __init__(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.label_names = tuple(labels)
+        # label values -> [counts per bucket (+Inf last), sum]
+        self._series = {}
+
+    def _get_series(self, label_values: tuple):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        return series
+
+    def observe(self, value: float, *label_values) -> None:
+        series = self._get_series(label_values)
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, (counts, total) in sorted(self._series.items()):
+            labels = dict(zip(self.label_names, label_values))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                bucket_labels = dict(labels, le=_format_value(bound) if bound != math.inf else "+Inf")
+                yield f"{self.name}_bucket{_format_labels(bucket_labels)} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+class Registry:
+    """Holds the metrics and renders them in the Prometheus text exposition format."""
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str, label: str = None) -> Counter:
+        return self.register(Counter(name, documentation, label))
+
+    def gauge(self, name: str, documentation: str, callback, metric_type: str = "gauge") -> Gauge:
+        return self.register(Gauge(name, documentation, callback, metric_type))
+
+    def histogram(self, name: str, documentation: str, labels=(), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class InteractionTimer:
+    """
+    Times one interaction handler. Call `acknowledged()` right after the first response
+    (defer, modal, message); the total time is recorded when the `with` block exits.
+    """
+    __slots__ = ("histogram", "handler", "started", "acked")
+
+    def __init__(self, histogram: Histogram, handler: str):
+        self.histogram = histogram
+        self.handler = handler
+        self.started = 0.0
+        self.acked = False
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def acknowledged(self) -> None:
+        if not self.acked:
+            self.acked = True
+            self.histogram.observe(time.perf_counter() - self.started, self.handler, "first_response")
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.started, self.handler, "total")
+        return False
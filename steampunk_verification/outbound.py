@@ -0,0 +1,121 @@
+# outbound.py
+import asyncio
+from collections import deque
+from enum import IntEnum
+
+
+class Priority(IntEnum):
+    """Classes of outbound REST work, most urgent first."""
+    INTERACTION = 0 # Interaction acknowledgements: Discord drops them after 3 seconds
+    ADMIN = 1 # Role grants, admin channel messages and edits, follow-ups
+    DM = 2 # Direct messages to members
+    LOG = 3 # Bot log channel and keep-alive messages
+
+
+class RequestShed(Exception):
+    """Raised instead of running a request the scheduler dropped under pressure."""
+
+
+class OutboundScheduler:
+    """
+    Admits outbound Discord requests by priority class, so a log flood or a bulk run can't
+    delay what users are waiting for.
+
+    At most `max_in_flight` requests run at once, and each class has its own cap in `limits`
+    (None for no cap). When a slot frees up it goes to the most urgent waiting request, but
+    a class held back by its own cap doesn't block the classes after it. Interaction
+    acknowledgements never wait: they have no cap and don't count against `max_in_flight`.
+
+    Classes listed in `shed_after` are shed under pressure: a request that waited longer
+    than its class's delay for a slot raises `RequestShed` instead of running.
+    """
+    def __init__(self, max_in_flight: int = 8, limits: dict = None, shed_after: dict = None, counters=None):
+        self.max_in_flight = max_in_flight
+        self.limits = limits or {}
+        self.shed_after = shed_after or {}
+        self.counters = counters # Optional (requests, shed) metrics.Counter pair, labelled by class
+        self.in_flight = {priority: 0 for priority in Priority}
+        self._waiters = {priority: deque() for priority in Priority}
+
+    def waiting(self, priority: Priority = None) -> int:
+        if priority is None:
+            return sum(len(waiters) for waiters in self._waiters.values())
+        return len(self._waiters[priority])
+
+    async def run(self, priority: Priority, coro):
+        """
+        Awaits `coro` once a slot of its class is free and returns its result.
+        Raises `RequestShed` (after closing `coro`) if the request was shed.
+        """
+        try:
+            await self._acquire(priority)
+        except BaseException:
+            coro.close()
+            raise
+        try:
+            return await coro
+        finally:
+            self._release(priority)
+
+    def _total_in_flight(self) -> int:
+        return sum(count for priority, count in self.in_flight.items() if priority != Priority.INTERACTION)
+
+    def _has_room(self, priority: Priority) -> bool:
+        limit = self.limits.get(priority)
+        if limit is not None and self.in_flight[priority] >= limit:
+            return False
+        return priority == Priority.INTERACTION or self._total_in_flight() < self.max_in_flight
+
+    async def _acquire(self, priority: Priority):
+        name = priority.name.lower()
+        if self.counters is not None:
+            self.counters[0].inc(name)
+        # Queue behind waiting requests of the same or a more urgent class, unless their class is held back by its own cap
+        if self._has_room(priority) and not any(self._waiters[p] and self._has_room(p) for p in Priority if p <= priority):
+            self.in_flight[priority] += 1
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters[priority].append(waiter)
+        timeout = self.shed_after.get(priority)
+        try:
+            if timeout is None:
+                await waiter
+            else:
+                await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            self._abandon(priority, waiter)
+            if self.counters is not None:
+                self.counters[1].inc(name)
+            raise RequestShed(f"{name} request shed after waiting {timeout}s")
+        except BaseException:
+            self._abandon(priority, waiter)
+            raise
+
+    def _abandon(self, priority: Priority, waiter):
+        if waiter.done() and not waiter.cancelled():
+            # The slot was granted just as we gave up, hand it on
+            self._release(priority)
+        else:
+            waiter.cancel()
+            try:
+                self._waiters[priority].remove(waiter)
+            except ValueError:
+                pass
+
+    def _release(self, priority: Priority):
+        self.in_flight[priority] -= 1
+        self._dispatch()
+
+    def _dispatch(self):
+        """Hands free slots to waiting requests, most urgent class first."""
+        for priority in Priority:
+            waiters = self._waiters[priority]
+            while waiters and self._has_room(priority):
+                waiter = waiters.popleft()
+                if waiter.done():
+                    continue
+                self.in_flight[priority] += 1
+                waiter.set_result(None)
+            if waiters and priority != Priority.INTERACTION and self._total_in_flight() >= self.max_in_flight:
+                # Out of shared slots: less urgent classes wait for the next release
+                return
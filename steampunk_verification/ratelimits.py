@@ -0,0 +1,277 @@
+# ratelimits.py
+import asyncio
+import time
+from collections import OrderedDict
+
+import aiohttp
+
+
+API_PREFIX = "/api/v"
+
+# Path segments whose following ID is a "major parameter": Discord keeps separate
+# rate-limit buckets per channel, guild and webhook, but not per message or member.
+MAJOR_PARAMETERS = ("channels", "guilds", "webhooks")
+
+
+def _strip_api_prefix(path: str) -> str:
+    if path.startswith(API_PREFIX):
+        path = path[path.find("/", len(API_PREFIX)):]
+    return path
+
+
+def route_key(method: str, path: str) -> str:
+    """
+    Builds the key used to track a REST route, e.g. "PUT /guilds/123/members/{id}/roles/{id}".
+    Major parameters are kept and other IDs replaced, so the key matches how Discord buckets
+    requests. The "/api/v10" prefix is stripped so callers can build keys without knowing the API version.
+    """
+    segments = _strip_api_prefix(path).split("/")
+    for i in range(1, len(segments)):
+        if segments[i].isdigit() and segments[i - 1] not in MAJOR_PARAMETERS:
+            segments[i] = "{id}"
+        elif i >= 2 and segments[i - 2] == "interactions":
+            # Interaction tokens are single use
+            segments[i] = "{token}"
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+def route_template(method: str, path: str) -> str:
+    """
+    Same as `route_key` with every ID and token replaced by a placeholder, e.g.
+    "POST /channels/{id}/messages", so it can be used as a metric label.
+    """
+    segments = _strip_api_prefix(path).split("/")
+    for i, segment in enumerate(segments):
+        if segment.isdigit():
+            segments[i] = "{id}"
+        elif len(segment) >= 32:
+            # Interaction and webhook tokens
+            segments[i] = "{token}"
+    return f"{method.upper()} {'/'.join(segments)}"
+
+
+class RouteState:
+    """
+    Last rate-limit headers Discord sent back for a single route, minus the requests
+    claimed with `RateLimitTracker.wait` since.
+    """
+    __slots__ = ("limit", "remaining", "reset_at", "window", "bucket", "lock", "probe")
+
+    def __init__(self):
+        self.limit = 1
+        self.remaining = 1
+        self.reset_at = 0.0
+        self.window = 0.0 # Longest Reset-After seen: how long the bucket takes to refill
+        self.bucket = None
+        self.lock = None # Serializes `wait` on the route, created on first use
+        self.probe = None # Set by the first response of a route nothing was known about
+
+
+class RateLimitTracker:
+    """
+    Records the per-route rate-limit headers (X-RateLimit-*) from every REST response
+    discord.py receives, so senders can pace themselves instead of running into 429s.
+    The table is bounded: the least recently used routes are evicted past `max_routes`.
+    429 responses are counted per route template in `throttled_counter` when one is given.
+    """
+    def __init__(self, max_routes: int = 512, throttled_counter=None, probe_timeout: float = 5.0):
+        self.max_routes = max_routes
+        self.probe_timeout = probe_timeout
+        self.throttled_counter = throttled_counter
+        self._routes = OrderedDict()
+
+    def observe(self, method: str, path: str, status: int, headers) -> None:
+        """Updates the state of a route from the headers of a response."""
+        remaining = headers.get("X-RateLimit-Remaining")
+        if status != 429 and remaining is None:
+            return
+        state = self._state(route_key(method, path))
+        if state.probe is not None:
+            state.probe.set()
+            state.probe = None
+        now = time.monotonic()
+        if status == 429:
+            if self.throttled_counter is not None:
+                self.throttled_counter.inc(route_template(method, path))
+            # Retry-After is authoritative for 429s, whatever the other headers say
+            state.remaining = 0
+            state.reset_at = now + float(headers.get("Retry-After", 1))
+            return
+        reset_after = float(headers.get("X-RateLimit-Reset-After", 0))
+        remaining = int(remaining)
+        if now < state.reset_at and now + reset_after < state.reset_at + state.window / 2:
+            # Same window as the state: the response to an earlier request doesn't give back requests claimed since
+            remaining = min(remaining, state.remaining)
+        state.limit = int(headers.get("X-RateLimit-Limit", state.limit))
+        state.remaining = remaining
+        state.reset_at = now + reset_after
+        state.window = max(state.window, reset_after)
+        state.bucket = headers.get("X-RateLimit-Bucket", state.bucket)
+
+    def _state(self, key: str) -> RouteState:
+        state = self._routes.get(key)
+        if state is None:
+            state = self._routes[key] = RouteState()
+            if len(self._routes) > self.max_routes:
+                self._routes.popitem(last=False)
+        else:
+            self._routes.move_to_end(key)
+        return state
+
+    def delay_for(self, method: str, path: str) -> float:
+        """
+        Returns how long to wait before the next request on a route.
+        Once the bucket is exhausted this is the time until it resets; otherwise the
+        remaining requests are spread evenly over what is left of the window.
+        """
+        state = self._routes.get(route_key(method, path))
+        if state is None:
+            return 0.0
+        window = state.reset_at - time.monotonic()
+        if window <= 0:
+            return 0.0
+        if state.remaining <= 0:
+            return window
+        return window / (state.remaining + 1)
+
+    async def wait(self, method: str, path: str) -> None:
+        """
+        Waits for a turn on the route and claims one of its remaining requests, so concurrent
+        callers are spread over the window instead of all reading the same `remaining`.
+        Call it right before each request on the route. On a route nothing is known about,
+        the first caller goes ahead and the others wait for its response's headers.
+        """
+        key = route_key(method, path)
+        if key not in self._routes:
+            self._state(key).probe = asyncio.Event()
+            return
+        state = self._state(key)
+        if state.lock is None:
+            state.lock = asyncio.Lock()
+        async with state.lock:
+            if state.probe is not None:
+                try:
+                    await asyncio.wait_for(state.probe.wait(), self.probe_timeout)
+                except asyncio.TimeoutError:
+                    state.probe = None # The probe failed without headers, go ahead
+            while True:
+                now = time.monotonic()
+                if now >= state.reset_at:
+                    if not state.window:
+                        return # Nothing known about the next window, a response will tell
+                    # The bucket has refilled since the last response
+                    state.remaining = state.limit
+                    state.reset_at = now + state.window
+                if state.remaining > 0:
+                    delay = (state.reset_at - now) / (state.remaining + 1)
+                    state.remaining -= 1
+                    if delay > 0:
+                        await asyncio.sleep(delay)
+                    return
+                await asyncio.sleep(state.reset_at - now)
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """Returns an aiohttp TraceConfig that feeds this tracker (pass it as `http_trace` to the bot)."""
+        trace_config = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context, params):
+            self.observe(params.method, params.url.path, params.response.status, params.response.headers)
+
+        trace_config.on_request_end.append(on_request_end)
+        return trace_config
+
+
+class SlidingWindowCounter:
+    """
+    Counts events over the last `window` seconds, in one slot per second, so memory stays
+    constant whatever the event rate.
+    """
+    def __init__(self, window: int = 10):
+        self.window = window
+        self._counts = [0] * window
+        self._seconds = [0] * window # The second each slot currently counts
+
+    def add(self, now: float = None) -> int:
+        """Records one event and returns the number of events in the window."""
+        second = int(time.monotonic() if now is None else now)
+        slot = second % self.window
+        if self._seconds[slot] != second:
+            self._seconds[slot] = second
+            self._counts[slot] = 0
+        self._counts[slot] += 1
+        return self.count(now)
+
+    def count(self, now: float = None) -> int:
+        second = int(time.monotonic() if now is None else now)
+        return sum(count for count, slot_second in zip(self._counts, self._seconds) if second - slot_second < self.window)
+
+
+class TokenBucket:
+    """Allows bursts of up to `capacity` actions, refilled at `rate` tokens per second."""
+    __slots__ = ("capacity", "rate", "tokens", "updated_at")
+
+    def __init__(self, capacity: float, rate: float, now: float):
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.updated_at = now
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def take(self, now: float) -> bool:
+        """Spends a token if one is available. Returns False when the action should be refused."""
+        self._refill(now)
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def retry_after(self, now: float) -> float:
+        """Seconds until the next token is available."""
+        self._refill(now)
+        return max(0.0, (1 - self.tokens) / self.rate)
+
+
+class KeyedTokenBuckets:
+    """
+    One `TokenBucket` per key (e.g. per user), in a bounded LRU table.
+    A bucket left alone long enough to refill completely is the same as a new one, so idle
+    buckets are dropped after that time; past `max_keys` the least recently used go first.
+    Memory stays bounded however many users show up.
+    """
+    def __init__(self, capacity: float, rate: float, max_keys: int = 10000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self.ttl = capacity / rate # Time for an empty bucket to refill
+        self._buckets = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def _bucket(self, key, now: float) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None or now - bucket.updated_at >= self.ttl:
+            bucket = self._buckets[key] = TokenBucket(self.capacity, self.rate, now)
+        self._buckets.move_to_end(key)
+        self._evict(now)
+        return bucket
+
+    def _evict(self, now: float) -> None:
+        while self._buckets:
+            key, oldest = next(iter(self._buckets.items()))
+            if len(self._buckets) <= self.max_keys and now - oldest.updated_at < self.ttl:
+                return
+            del self._buckets[key]
+
+    def take(self, key, now: float = None) -> bool:
+        """Spends a token of `key`'s bucket. Returns False when the action should be refused."""
+        now = time.monotonic() if now is None else now
+        return self._bucket(key, now).take(now)
+
+    def retry_after(self, key, now: float = None) -> float:
+        now = time.monotonic() if now is None else now
+        bucket = self._buckets.get(key)
+        return bucket.retry_after(now) if bucket is not None else 0.0
@@ -0,0 +1,82 @@
+# scheduler.py
+import asyncio
+import logging
+import random
+import time
+
+
+class Scheduler:
+    """
+    Runs periodic jobs and long-lived background tasks on the bot's event loop.
+    Everything is keyed by name: starting a name that is still running is a no-op, so
+    setup code can safely run again (on_ready fires on every reconnect) without piling
+    up duplicate tasks. `shutdown` cancels everything.
+    """
+    def __init__(self):
+        self._tasks = {}
+        self.missed_ticks = {}
+
+    def is_running(self, name: str) -> bool:
+        task = self._tasks.get(name)
+        return task is not None and not task.done()
+
+    def spawn(self, name: str, coro_factory) -> asyncio.Task:
+        """
+        Runs `coro_factory()` as a background task unless a task with this name is still running.
+        Returns the running task either way. An exception ending the task is logged.
+        """
+        if self.is_running(name):
+            return self._tasks[name]
+        task = self._tasks[name] = asyncio.create_task(coro_factory(), name=name)
+        task.add_done_callback(self._log_failure)
+        return task
+
+    @staticmethod
+    def _log_failure(task: asyncio.Task) -> None:
+        if task.cancelled():
+            return
+        error = task.exception() # Retrieving it also keeps asyncio from warning when the task is collected
+        if error is not None:
+            logging.error(f"Background task '{task.get_name()}' failed.", exc_info=error)
+
+    def every(self, name: str, interval: float, callback, jitter: float = 0.0) -> asyncio.Task:
+        """
+        Awaits `callback()` every `interval` seconds, plus up to `jitter` random seconds.
+        Ticks are aligned on a fixed grid; if a run overruns (or the loop stalls) past
+        several ticks, the missed ones are coalesced into a single run and counted in
+        `missed_ticks`. Exceptions are logged and don't stop the job.
+        """
+        self.missed_ticks.setdefault(name, 0)
+        return self.spawn(name, lambda: self._run_periodic(name, interval, callback, jitter))
+
+    def cancel(self, name: str) -> None:
+        task = self._tasks.pop(name, None)
+        if task is not None:
+            task.cancel()
+
+    async def shutdown(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run_periodic(self, name: str, interval: float, callback, jitter: float):
+        next_run = time.monotonic() + interval
+        while True:
+            delay = next_run - time.monotonic() + (random.uniform(0, jitter) if jitter else 0)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            try:
+                await callback()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logging.error(f"Scheduled job '{name}' failed.", exc_info=True)
+            next_run += interval
+            behind = time.monotonic() - next_run
+            if behind >= interval:
+                # Run once for all the ticks we are late on instead of once per tick
+                skipped = int(behind // interval)
+                next_run += skipped * interval
+                self.missed_ticks[name] += skipped
@@ -0,0 +1,115 @@
+# stdio.py
+import sys
+import threading
+import time
+
+
+class StreamToLogger:
+    """
+    File-like object redirecting a standard stream into a logger.
+    Writes are buffered until a line is complete, so `print` output arriving in pieces
+    becomes one record, and a traceback (including chained ones) is assembled into a
+    single record. Pending text is emitted on newline, once it exceeds `max_buffer`
+    characters, on `flush()`, or by `flush_stale()` after `max_delay` seconds without
+    writes. Safe to write to from any thread.
+    """
+    TRACEBACK_START = "Traceback (most recent call last):"
+    # Lines joining two tracebacks of a chained exception
+    TRACEBACK_CHAIN = ("During handling of the above exception", "The above exception was the direct cause")
+
+    def __init__(self, logger, log_level, max_buffer: int = 8192, max_delay: float = 1.0):
+        self.logger = logger
+        self.log_level = log_level
+        self.max_buffer = max_buffer
+        self.max_delay = max_delay
+        self._partial = "" # Text after the last newline
+        self._traceback = [] # Lines of the traceback being assembled
+        self._traceback_done = False # Whether the exception line was seen (a chained traceback may follow)
+        self._last_write = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def write(self, buf):
+        if not buf:
+            return 0
+        if getattr(self._local, "logging", False):
+            # A handler wrote to this stream while we were logging: don't loop back into logging
+            sys.__stderr__.write(buf)
+            return len(buf)
+        with self._lock:
+            self._last_write = time.monotonic()
+            records = self._take_records(self._partial + buf)
+        # Logged outside the lock, handlers may take their own locks
+        self._log(records)
+        return len(buf)
+
+    def _take_records(self, text: str) -> list:
+        """Consumes the complete lines of `text` and returns the records they make. Call with the lock held."""
+        *lines, self._partial = text.split("\n")
+        records = []
+        for line in lines:
+            line = line.rstrip()
+            if self._traceback:
+                continues = line.startswith((" ", "\t", self.TRACEBACK_START) + self.TRACEBACK_CHAIN) or not line
+                if not self._traceback_done or continues:
+                    self._traceback.append(line)
+                    if not continues:
+                        # The first unindented line is the exception itself
+                        self._traceback_done = True
+                    elif line.startswith(self.TRACEBACK_START):
+                        self._traceback_done = False
+                    continue
+                records.append(self._end_traceback())
+            if line.startswith(self.TRACEBACK_START):
+                self._traceback = [line]
+                self._traceback_done = False
+            elif line:
+                records.append(line)
+        if len(self._partial) > self.max_buffer:
+            records.append(self._partial)
+            self._partial = ""
+        if self._traceback and sum(len(line) for line in self._traceback) > self.max_buffer:
+            records.append(self._end_traceback())
+        return records
+
+    def _end_traceback(self) -> str:
+        text = "\n".join(self._traceback).rstrip()
+        self._traceback = []
+        self._traceback_done = False
+        return text
+
+    def _take_pending(self) -> list:
+        """Returns whatever is buffered as records. Call with the lock held."""
+        records = []
+        if self._traceback:
+            records.append(self._end_traceback())
+        if self._partial.strip():
+            records.append(self._partial.rstrip())
+        self._partial = ""
+        return records
+
+    def _log(self, records: list):
+        if not records:
+            return
+        self._local.logging = True
+        try:
+            for record in records:
+                self.logger.log(self.log_level, record)
+        finally:
+            self._local.logging = False
+
+    def flush(self):
+        with self._lock:
+            records = self._take_pending()
+        self._log(records)
+
+    def flush_stale(self):
+        """Emits buffered text nobody completed within `max_delay` seconds (scheduled job)."""
+        with self._lock:
+            if time.monotonic() - self._last_write < self.max_delay:
+                return
+            records = self._take_pending()
+        self._log(records)
+
+    def isatty(self):
+        return False
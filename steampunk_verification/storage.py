@@ -0,0 +1,236 @@
+# storage.py
+import json
+import sqlite3
+import time
+
+
+# One row per open verification request. The UNIQUE constraints double as the
+# indexes for the lookups by member and by admin message. guild_id is 0 for requests
+# recorded before the bot served several guilds (see `adopt_legacy_requests`).
+PENDING_REQUESTS_TABLE = """
+CREATE TABLE IF NOT EXISTS pending_requests (
+    request_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    guild_id INTEGER NOT NULL DEFAULT 0,
+    member_id INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    team_number TEXT NOT NULL DEFAULT '',
+    channel_id INTEGER,
+    message_id INTEGER UNIQUE,
+    created_at REAL NOT NULL,
+    UNIQUE (guild_id, member_id)
+)
+"""
+
+# Current schema, one statement per entry
+SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS kv (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    """,
+    PENDING_REQUESTS_TABLE,
+    "CREATE INDEX IF NOT EXISTS pending_by_team ON pending_requests (guild_id, team_number, request_id)",
+    # Per-guild overrides of the channel and role IDs from the environment
+    """
+    CREATE TABLE IF NOT EXISTS guild_settings (
+        guild_id INTEGER PRIMARY KEY,
+        verified_role_id INTEGER,
+        admin_log_channel_id INTEGER,
+        welcome_channel_id INTEGER,
+        updated_at REAL NOT NULL
+    )
+    """,
+    # Members reminded by the reconciliation sweep, so nobody is DMed on every sweep
+    """
+    CREATE TABLE IF NOT EXISTS reconcile_prompts (
+        guild_id INTEGER NOT NULL,
+        member_id INTEGER NOT NULL,
+        prompted_at REAL NOT NULL,
+        PRIMARY KEY (guild_id, member_id)
+    ) WITHOUT ROWID
+    """,
+)
+
+# SQLite limits the number of parameters of a statement; lookups of many IDs are split in chunks
+ID_CHUNK_SIZE = 500
+
+# Upgrades of databases created by older versions; MIGRATIONS[n] moves a database from
+# user_version n to n + 1. Tables and indexes that are only added are left to SCHEMA.
+MIGRATIONS = (
+    # 1: pending requests belong to a guild, a member has one pending request per guild
+    (
+        "ALTER TABLE pending_requests RENAME TO pending_requests_v0",
+        PENDING_REQUESTS_TABLE,
+        "INSERT INTO pending_requests (request_id, member_id, name, team_number, channel_id, message_id, created_at) "
+        "SELECT request_id, member_id, name, team_number, channel_id, message_id, created_at FROM pending_requests_v0",
+        "DROP TABLE pending_requests_v0",
+    ),
+)
+
+
+class BotStore:
+    """
+    Small embedded SQLite database holding the bot state that has to survive restarts.
+    The database runs in WAL mode with autocommit, so every write is durable on its own
+    and reads never block on a writer.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # NORMAL is durable across application crashes in WAL mode, only a power loss can drop the last commits
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._migrate()
+
+    def _migrate(self):
+        """Creates the schema, upgrading a database written by an older version first."""
+        # IMMEDIATE takes the write lock up front: the processes of a cluster start together and only one may migrate
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            existing = self._conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'pending_requests'").fetchone()
+            if existing:
+                for migration in MIGRATIONS[version:]:
+                    for statement in migration:
+                        self._conn.execute(statement)
+            for statement in SCHEMA:
+                self._conn.execute(statement)
+            self._conn.execute(f"PRAGMA user_version = {len(MIGRATIONS)}")
+            self._conn.execute("COMMIT")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+
+    def get_value(self, key: str, default=None):
+        """Returns the JSON-decoded value stored under `key`, or `default`."""
+        row = self._conn.execute("SELECT value FROM kv WHERE key = ?", (key,)).fetchone()
+        return json.loads(row["value"]) if row else default
+
+    def set_value(self, key: str, value) -> None:
+        """Stores a JSON-serializable value under `key`, replacing any previous one."""
+        self._conn.execute(
+            "INSERT INTO kv (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, json.dumps(value)),
+        )
+
+    def delete_value(self, key: str) -> None:
+        self._conn.execute("DELETE FROM kv WHERE key = ?", (key,))
+
+    # --- Pending verification requests ---
+
+    def add_pending(self, guild_id: int, member_id: int, name: str, team_number: str) -> int:
+        """
+        Records a verification request and returns its ID.
+        A member has at most one pending request per guild: submitting again updates it and keeps its ID.
+        """
+        row = self._conn.execute(
+            "INSERT INTO pending_requests (guild_id, member_id, name, team_number, created_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT(guild_id, member_id) DO UPDATE SET name = excluded.name, team_number = excluded.team_number "
+            "RETURNING request_id",
+            (guild_id, member_id, name, team_number, time.time()),
+        ).fetchone()
+        return row["request_id"]
+
+    def set_request_message(self, request_id: int, channel_id: int, message_id: int) -> None:
+        """Remembers the admin channel message showing a request."""
+        self._conn.execute(
+            "UPDATE pending_requests SET channel_id = ?, message_id = ? WHERE request_id = ?",
+            (channel_id, message_id, request_id),
+        )
+
+    def get_pending(self, request_id: int):
+        return self._conn.execute("SELECT * FROM pending_requests WHERE request_id = ?", (request_id,)).fetchone()
+
+    def remove_pending(self, request_id: int) -> bool:
+        """Removes a request once it has been handled. Returns False if it was already gone."""
+        return self._conn.execute("DELETE FROM pending_requests WHERE request_id = ?", (request_id,)).rowcount > 0
+
+    def list_pending(self, after_request_id: int = 0, team_number: str = None, created_before: float = None, limit: int = 100,
+                     guild_id: int = None):
+        """
+        Returns one page of pending requests in ID order, starting after `after_request_id`,
+        optionally only those of a guild, of a team or created before a timestamp.
+        """
+        query = "SELECT * FROM pending_requests WHERE request_id > ?"
+        params = [after_request_id]
+        if guild_id is not None:
+            query += " AND guild_id = ?"
+            params.append(guild_id)
+        if team_number is not None:
+            query += " AND team_number = ?"
+            params.append(team_number)
+        if created_before is not None:
+            query += " AND created_at < ?"
+            params.append(created_before)
+        query += " ORDER BY request_id LIMIT ?"
+        params.append(limit)
+        return self._conn.execute(query, params).fetchall()
+
+    def discard_unsent(self, request_id: int) -> None:
+        """Removes a request whose admin message could never be sent, so it doesn't linger unseen."""
+        self._conn.execute("DELETE FROM pending_requests WHERE request_id = ? AND message_id IS NULL", (request_id,))
+
+    def count_pending(self, guild_id: int = None) -> int:
+        if guild_id is None:
+            return self._conn.execute("SELECT COUNT(*) FROM pending_requests").fetchone()[0]
+        return self._conn.execute("SELECT COUNT(*) FROM pending_requests WHERE guild_id = ?", (guild_id,)).fetchone()[0]
+
+    def adopt_legacy_requests(self, guild_id: int) -> int:
+        """
+        Assigns the requests recorded before pending requests had a guild to `guild_id`.
+        Only meaningful while the bot serves a single guild. Returns the number of requests updated.
+        """
+        return self._conn.execute(
+            "UPDATE OR IGNORE pending_requests SET guild_id = ? WHERE guild_id = 0", (guild_id,)
+        ).rowcount
+
+    def _member_ids_matching(self, query: str, guild_id: int, member_ids: list, *params) -> set:
+        """Runs `query` (with an "IN ({})" placeholder) over chunks of `member_ids`, returns the member IDs it selects."""
+        found = set()
+        for start in range(0, len(member_ids), ID_CHUNK_SIZE):
+            chunk = member_ids[start:start + ID_CHUNK_SIZE]
+            rows = self._conn.execute(query.format(", ".join("?" * len(chunk))), (guild_id, *chunk, *params))
+            found.update(row[0] for row in rows)
+        return found
+
+    def pending_member_ids(self, guild_id: int, member_ids: list) -> set:
+        """Returns those of `member_ids` that have a pending request in the guild."""
+        return self._member_ids_matching(
+            "SELECT member_id FROM pending_requests WHERE guild_id = ? AND member_id IN ({})", guild_id, member_ids
+        )
+
+    # --- Reconciliation reminders ---
+
+    def prompted_member_ids(self, guild_id: int, member_ids: list, since: float) -> set:
+        """Returns those of `member_ids` reminded by the reconciliation sweep since `since`."""
+        return self._member_ids_matching(
+            "SELECT member_id FROM reconcile_prompts WHERE guild_id = ? AND member_id IN ({}) AND prompted_at >= ?",
+            guild_id, member_ids, since,
+        )
+
+    def mark_prompted(self, guild_id: int, member_ids: list) -> None:
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO reconcile_prompts (guild_id, member_id, prompted_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (guild_id, member_id) DO UPDATE SET prompted_at = excluded.prompted_at",
+            [(guild_id, member_id, now) for member_id in member_ids],
+        )
+
+    # --- Guild settings ---
+
+    def get_guild_settings(self, guild_id: int):
+        return self._conn.execute("SELECT * FROM guild_settings WHERE guild_id = ?", (guild_id,)).fetchone()
+
+    def set_guild_settings(self, guild_id: int, verified_role_id: int, admin_log_channel_id: int, welcome_channel_id: int) -> None:
+        self._conn.execute(
+            "INSERT INTO guild_settings (guild_id, verified_role_id, admin_log_channel_id, welcome_channel_id, updated_at) "
+            "VALUES (?, ?, ?, ?, ?) ON CONFLICT(guild_id) DO UPDATE SET verified_role_id = excluded.verified_role_id, "
+            "admin_log_channel_id = excluded.admin_log_channel_id, welcome_channel_id = excluded.welcome_channel_id, "
+            "updated_at = excluded.updated_at",
+            (guild_id, verified_role_id, admin_log_channel_id, welcome_channel_id, time.time()),
+        )
+
+    def close(self) -> None:
+        self._conn.close()
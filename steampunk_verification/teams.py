@@ -0,0 +1,104 @@
+# teams.py
+import bisect
+import csv
+import json
+import re
+
+
+TEAM_PREFIX = re.compile(r"^(team\s*)?#?\s*")
+
+
+def normalize_team(value: str) -> str:
+    """
+    Normalizes a team number as typed by a user, so "Team #01577 " and "1577" match.
+    Non-numeric team names are only trimmed and lowercased.
+    """
+    value = TEAM_PREFIX.sub("", value.strip().lower()).strip()
+    if value.isdigit():
+        value = value.lstrip("0") or "0"
+    return value
+
+
+def load_team_role_map(path: str) -> dict:
+    """
+    Loads a team -> role ID mapping from a file, with normalized team keys.
+    JSON files hold a single object ({"1577": 123456789012345679, ...}); any other file is read
+    as CSV with the team in the first column and the role ID in the second (a header row is skipped).
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            return {normalize_team(str(team)): int(role_id) for team, role_id in json.load(f).items()}
+        team_roles = {}
+        for row in csv.reader(f):
+            if len(row) < 2 or not row[1].strip().isdigit():
+                continue # Header, blank or malformed line
+            team_roles[normalize_team(row[0])] = int(row[1])
+        return team_roles
+
+
+def load_team_directory(path: str) -> dict:
+    """
+    Loads the teams registered for the event as {normalized team number: team name}.
+    JSON files hold a single object ({"1577": "Steampunk Robotics", ...}); any other file is read
+    as CSV with the team in the first column and its name, if any, in the second (a header row
+    starting with "team" is skipped).
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".json"):
+            return {normalize_team(str(team)): str(name or "").strip() for team, name in json.load(f).items()}
+        teams = {}
+        for row in csv.reader(f):
+            if not row or not row[0].strip() or row[0].strip().lower() == "team":
+                continue # Blank line or header
+            teams[normalize_team(row[0])] = row[1].strip() if len(row) > 1 else ""
+        return teams
+
+
+class TeamIndex:
+    """
+    Prefix index over team numbers and names, for autocomplete on every keystroke.
+    Each team is indexed under its normalized number, its full name and every word of its
+    name, in one sorted list: a lookup is a binary search to the first key with the prefix
+    followed by a short scan, so it takes microseconds even with tens of thousands of teams.
+    The index is built once and never modified; build a new one to change the teams.
+    """
+    def __init__(self, teams: dict):
+        self.teams = dict(teams) # Normalized team number -> name
+        entries = set()
+        for team_number, name in self.teams.items():
+            entries.add((team_number, team_number))
+            name = name.lower()
+            if name:
+                entries.add((name, team_number))
+                for word in name.split()[1:]:
+                    entries.add((word, team_number))
+        entries = sorted(entries)
+        self._keys = [key for key, _ in entries]
+        self._team_numbers = [team_number for _, team_number in entries]
+
+    def __len__(self) -> int:
+        return len(self.teams)
+
+    def __contains__(self, team_number: str) -> bool:
+        return team_number in self.teams
+
+    def name(self, team_number: str) -> str:
+        return self.teams.get(team_number, "")
+
+    def search(self, text: str, limit: int = 25) -> list:
+        """
+        Returns up to `limit` normalized team numbers whose number, name or a word of whose name
+        starts with `text`, exact number matches first.
+        """
+        prefix = normalize_team(text) if text.strip() else ""
+        results = [prefix] if prefix in self.teams else []
+        seen = set(results)
+        # Keys are scanned in sorted order, a team indexed under several matching keys is listed once
+        for i in range(bisect.bisect_left(self._keys, prefix), len(self._keys)):
+            if len(results) >= limit or not self._keys[i].startswith(prefix):
+                break
+            team_number = self._team_numbers[i]
+            if team_number not in seen:
+                seen.add(team_number)
+                results.append(team_number)
+        return results
@@ -0,0 +1,76 @@
+# test_logfilters.py
+import logging
+import unittest
+from unittest import mock
+
+from logfilters import DuplicateLogFilter
+
+
+def make_record(msg, *args, level=logging.ERROR, name="bot"):
+    return logging.makeLogRecord({"name": name, "levelno": level, "levelname": logging.getLevelName(level),
+                                  "msg": msg, "args": args or None})
+
+
+class DuplicateLogFilterTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("logfilters.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_repeats_fold_within_the_window_and_flush_after_it(self):
+        log_filter = DuplicateLogFilter(window=60)
+        self.assertTrue(log_filter.filter(make_record("Failed to DM user 1001")))
+        self.now += 10
+        # Digits in the message and lazy arguments don't make a record different
+        self.assertFalse(log_filter.filter(make_record("Failed to DM user 1002")))
+        self.assertFalse(log_filter.filter(make_record("Failed to DM user 1003")))
+        self.assertTrue(log_filter.filter(make_record("Failed to DM member %s", 1004)))
+        self.assertFalse(log_filter.filter(make_record("Failed to DM member %s", 1005)))
+        self.assertEqual(log_filter.flush(), [])
+
+        self.now += 50
+        summaries = log_filter.flush()
+        self.assertEqual([summary.getMessage() for summary in summaries],
+                         ["Failed to DM user 1001 [repeated 2 more times in 60s]"])
+        self.assertTrue(log_filter.filter(summaries[0]))
+        # The window of the second kind started 10 s later
+        self.assertEqual(log_filter.flush(), [])
+        self.now += 10
+        self.assertEqual([summary.getMessage() for summary in log_filter.flush()],
+                         ["Failed to DM member 1004 [repeated 1 more times in 60s]"])
+
+        # The next occurrence opens a new window
+        self.assertTrue(log_filter.filter(make_record("Failed to DM user 1005")))
+
+    def test_record_after_the_window_closes_it(self):
+        log_filter = DuplicateLogFilter(window=60)
+        log_filter.filter(make_record("Rate limited"))
+        log_filter.filter(make_record("Rate limited"))
+        self.now += 61
+        self.assertTrue(log_filter.filter(make_record("Rate limited")))
+        self.assertEqual([summary.getMessage() for summary in log_filter.flush()],
+                         ["Rate limited [repeated 1 more times in 61s]"])
+
+    def test_logger_and_level_are_part_of_the_fingerprint(self):
+        log_filter = DuplicateLogFilter(window=60)
+        self.assertTrue(log_filter.filter(make_record("Timeout")))
+        self.assertTrue(log_filter.filter(make_record("Timeout", level=logging.WARNING)))
+        self.assertTrue(log_filter.filter(make_record("Timeout", name="web_server")))
+        self.now += 60
+        # Nothing was repeated, so there is nothing to summarize
+        self.assertEqual(log_filter.flush(), [])
+
+    def test_evicted_fingerprint_is_summarized_early(self):
+        log_filter = DuplicateLogFilter(window=60, max_entries=2)
+        log_filter.filter(make_record("first"))
+        log_filter.filter(make_record("first"))
+        log_filter.filter(make_record("second"))
+        log_filter.filter(make_record("third"))
+        self.assertEqual([summary.getMessage() for summary in log_filter.flush()],
+                         ["first [repeated 1 more times in 0s]"])
+        self.assertTrue(log_filter.filter(make_record("first")))
+
+
+if __name__ == "__main__":
+    unittest.main()
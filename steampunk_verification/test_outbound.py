@@ -0,0 +1,57 @@
+# test_outbound.py
+import asyncio
+import unittest
+
+from outbound import OutboundScheduler, Priority
+
+
+class OutboundSchedulerTest(unittest.IsolatedAsyncioTestCase):
+    async def test_capped_class_does_not_block_less_urgent_classes(self):
+        scheduler = OutboundScheduler(max_in_flight=8, limits={Priority.ADMIN: 1})
+        release = asyncio.Event()
+        order = []
+
+        async def request(name):
+            order.append(name)
+            await release.wait()
+
+        first = asyncio.create_task(scheduler.run(Priority.ADMIN, request("admin 1")))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(scheduler.run(Priority.ADMIN, request("admin 2")))
+        await asyncio.sleep(0)
+        self.assertEqual(scheduler.waiting(Priority.ADMIN), 1)
+
+        # ADMIN is only held back by its own cap: a DM gets one of the 7 free shared slots right away
+        dm = asyncio.create_task(scheduler.run(Priority.DM, request("dm")))
+        await asyncio.sleep(0)
+        self.assertEqual(order, ["admin 1", "dm"])
+        self.assertEqual(scheduler.in_flight[Priority.DM], 1)
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(first, second, dm), 1)
+        self.assertEqual(order, ["admin 1", "dm", "admin 2"])
+        self.assertEqual(scheduler.waiting(), 0)
+
+    async def test_waits_behind_admissible_more_urgent_waiters(self):
+        scheduler = OutboundScheduler(max_in_flight=1)
+        release = asyncio.Event()
+        order = []
+
+        async def request(name):
+            order.append(name)
+            await release.wait()
+
+        first = asyncio.create_task(scheduler.run(Priority.LOG, request("log")))
+        await asyncio.sleep(0)
+        admin = asyncio.create_task(scheduler.run(Priority.ADMIN, request("admin")))
+        dm = asyncio.create_task(scheduler.run(Priority.DM, request("dm")))
+        await asyncio.sleep(0)
+        self.assertEqual(order, ["log"])
+
+        release.set()
+        await asyncio.wait_for(asyncio.gather(first, admin, dm), 1)
+        self.assertEqual(order, ["log", "admin", "dm"])
+
+
+if __name__ == "__main__":
+    unittest.main()
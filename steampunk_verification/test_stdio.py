@@ -0,0 +1,103 @@
+# test_stdio.py
+import logging
+import unittest
+from unittest import mock
+
+from stdio import StreamToLogger
+
+
+CHAINED_TRACEBACK = """Traceback (most recent call last):
+  File "main.py", line 10, in approve
+    member = guild.get_member(member_id)
+KeyError: 1001
+
+During handling of the above exception, another exception occurred:
+
+Traceback (most recent call last):
+  File "main.py", line 12, in approve
+    raise LookupError("member left")
+LookupError: member left
+"""
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, record):
+        self.records.append(record)
+
+
+class StreamToLoggerTest(unittest.TestCase):
+    def setUp(self):
+        self.logger = logging.getLogger(f"test_stdio.{self.id()}")
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.handler = ListHandler()
+        self.logger.addHandler(self.handler)
+        self.addCleanup(self.logger.removeHandler, self.handler)
+        self.stream = StreamToLogger(self.logger, logging.ERROR, max_delay=1.0)
+
+    def messages(self) -> list:
+        return [record.getMessage() for record in self.handler.records]
+
+    def test_line_arriving_in_pieces_is_one_record(self):
+        for piece in ("Synced ", "12", " commands", "\nReady", "\n"):
+            self.stream.write(piece)
+        self.assertEqual(self.messages(), ["Synced 12 commands", "Ready"])
+        self.assertEqual({record.levelno for record in self.handler.records}, {logging.ERROR})
+
+    def test_chained_traceback_arriving_in_chunks_is_one_record(self):
+        for start in range(0, len(CHAINED_TRACEBACK), 7):
+            self.stream.write(CHAINED_TRACEBACK[start:start + 7])
+        # The exception line may be followed by another chained traceback: still buffered
+        self.assertEqual(self.messages(), [])
+        self.stream.write("Ignoring exception in on_interaction\n")
+        self.assertEqual(self.messages(), [CHAINED_TRACEBACK.rstrip(), "Ignoring exception in on_interaction"])
+
+    def test_flush_emits_pending_text(self):
+        self.stream.write('Traceback (most recent call last):\n  File "main.py", line 1\n')
+        self.stream.write("no newline")
+        self.assertEqual(self.messages(), [])
+        self.stream.flush()
+        self.assertEqual(self.messages(), ['Traceback (most recent call last):\n  File "main.py", line 1', "no newline"])
+        self.stream.flush()
+        self.assertEqual(len(self.handler.records), 2)
+
+    def test_flush_stale_waits_for_max_delay(self):
+        now = [100.0]
+        with mock.patch("stdio.time.monotonic", lambda: now[0]):
+            self.stream.write("partial")
+            now[0] += 0.5
+            self.stream.flush_stale()
+            self.assertEqual(self.messages(), [])
+            now[0] += 0.5
+            self.stream.flush_stale()
+        self.assertEqual(self.messages(), ["partial"])
+
+    def test_long_partial_line_is_emitted_once_over_max_buffer(self):
+        stream = StreamToLogger(self.logger, logging.INFO, max_buffer=10)
+        stream.write("a" * 8)
+        self.assertEqual(self.messages(), [])
+        stream.write("a" * 8)
+        self.assertEqual(self.messages(), ["a" * 16])
+
+    def test_handler_writing_to_the_stream_does_not_recurse(self):
+        stream = self.stream
+
+        class EchoHandler(logging.Handler):
+            def emit(self, record):
+                stream.write(f"echo: {record.getMessage()}\n")
+
+        echo = EchoHandler()
+        self.logger.addHandler(echo)
+        self.addCleanup(self.logger.removeHandler, echo)
+        with mock.patch("stdio.sys.__stderr__") as stderr:
+            stream.write("hello\n")
+        stderr.write.assert_called_once_with("echo: hello\n")
+        self.assertEqual(self.messages(), ["hello"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,89 @@
+# test_storage.py
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from storage import MIGRATIONS, BotStore
+
+
+# pending_requests as written before requests belonged to a guild (user_version 0)
+LEGACY_SCHEMA = """
+CREATE TABLE kv (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE pending_requests (
+    request_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    member_id INTEGER NOT NULL UNIQUE,
+    name TEXT NOT NULL,
+    team_number TEXT NOT NULL DEFAULT '',
+    channel_id INTEGER,
+    message_id INTEGER UNIQUE,
+    created_at REAL NOT NULL
+);
+CREATE INDEX pending_by_team ON pending_requests (team_number, request_id);
+"""
+
+GUILD_ID = 123456789012345678
+
+
+class BotStoreMigrationTest(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "bot.sqlite3")
+        conn = sqlite3.connect(self.path)
+        conn.executescript(LEGACY_SCHEMA)
+        conn.executemany(
+            "INSERT INTO pending_requests (request_id, member_id, name, team_number, channel_id, message_id, created_at) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(1, 1001, "Ada", "1577", 55, 9001, 100.0), (2, 1002, "Grace", "", None, None, 200.0)],
+        )
+        conn.execute("INSERT INTO kv (key, value) VALUES ('welcome_message', '{\"message_id\": 7}')")
+        conn.commit()
+        conn.close()
+
+    def open_store(self) -> BotStore:
+        store = BotStore(self.path)
+        self.addCleanup(store.close)
+        return store
+
+    def user_version(self) -> int:
+        conn = sqlite3.connect(self.path)
+        try:
+            return conn.execute("PRAGMA user_version").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_migration_keeps_requests_without_a_guild(self):
+        store = self.open_store()
+        self.assertEqual(self.user_version(), len(MIGRATIONS))
+        first, second = store.get_pending(1), store.get_pending(2)
+        self.assertEqual((first["guild_id"], first["member_id"], first["name"], first["team_number"]), (0, 1001, "Ada", "1577"))
+        self.assertEqual((first["channel_id"], first["message_id"], first["created_at"]), (55, 9001, 100.0))
+        self.assertEqual((second["guild_id"], second["member_id"], second["message_id"]), (0, 1002, None))
+        self.assertEqual(store.get_value("welcome_message"), {"message_id": 7})
+        # New requests don't reuse the IDs of migrated ones
+        self.assertEqual(store.add_pending(GUILD_ID, 1003, "Linus", ""), 3)
+
+    def test_reopening_a_migrated_database_changes_nothing(self):
+        store = self.open_store()
+        store.close()
+        store = self.open_store()
+        self.assertEqual(self.user_version(), len(MIGRATIONS))
+        self.assertEqual(store.count_pending(), 2)
+        self.assertEqual(store.get_pending(1)["member_id"], 1001)
+
+    def test_adoption_assigns_legacy_requests_to_the_guild(self):
+        store = self.open_store()
+        self.assertEqual(store.adopt_legacy_requests(GUILD_ID), 2)
+        self.assertEqual({request["guild_id"] for request in store.list_pending()}, {GUILD_ID})
+        self.assertEqual(store.count_pending(GUILD_ID), 2)
+        # Resubmitting in the adopting guild updates the adopted request instead of adding one
+        self.assertEqual(store.add_pending(GUILD_ID, 1001, "Ada L.", "1577"), 1)
+        self.assertEqual(store.adopt_legacy_requests(GUILD_ID), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+# test_teams.py
+import json
+import os
+import tempfile
+import unittest
+
+from teams import TeamIndex, load_team_directory, load_team_role_map, normalize_team
+
+
+class NormalizeTeamTest(unittest.TestCase):
+    def test_prefixes_and_leading_zeros_are_dropped(self):
+        for typed in ("1577", "Team #01577", " team 1577 ", "#1577", "TEAM#001577", "01577"):
+            self.assertEqual(normalize_team(typed), "1577", typed)
+
+    def test_zero_and_names(self):
+        self.assertEqual(normalize_team("000"), "0")
+        self.assertEqual(normalize_team("  Steampunk Robotics "), "steampunk robotics")
+        self.assertEqual(normalize_team(""), "")
+
+
+class TeamFilesTest(unittest.TestCase):
+    def write(self, name: str, content: str) -> str:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+        return path
+
+    def test_role_map_keys_are_normalized(self):
+        csv_path = self.write("roles.csv", "team,role_id\nTeam #01577,111\n\nbad,row\n254,222\n")
+        self.assertEqual(load_team_role_map(csv_path), {"1577": 111, "254": 222})
+        json_path = self.write("roles.json", json.dumps({"#0042": "333"}))
+        self.assertEqual(load_team_role_map(json_path), {"42": 333})
+
+    def test_directory_skips_header_and_blank_lines(self):
+        path = self.write("teams.csv", "Team,Name\n01577, Steampunk Robotics \n\n254\n")
+        self.assertEqual(load_team_directory(path), {"1577": "Steampunk Robotics", "254": ""})
+
+
+class TeamIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = TeamIndex({
+            "1577": "Steampunk Robotics",
+            "157": "Robotics Club",
+            "15": "",
+            "254": "The Cheesy Poofs",
+        })
+
+    def test_exact_number_comes_first(self):
+        self.assertEqual(self.index.search("157")[0], "157")
+        self.assertEqual(set(self.index.search("157")), {"157", "1577"})
+        self.assertEqual(self.index.search("Team #0157")[0], "157")
+
+    def test_team_matching_several_keys_is_listed_once(self):
+        # "Robotics Club" is indexed under its full name and under "club"; "Steampunk Robotics" under "robotics"
+        results = self.index.search("robotics")
+        self.assertEqual(sorted(results), ["157", "1577"])
+        self.assertEqual(len(results), len(set(results)))
+
+    def test_words_of_names_and_limit(self):
+        self.assertEqual(self.index.search("poo"), ["254"])
+        self.assertEqual(self.index.search("club"), ["157"])
+        self.assertEqual(len(self.index.search("", limit=2)), 2)
+        self.assertEqual(self.index.search("9999"), [])
+
+    def test_lookups(self):
+        self.assertIn("1577", self.index)
+        self.assertNotIn("01577", self.index)
+        self.assertEqual(self.index.name("254"), "The Cheesy Poofs")
+        self.assertEqual(self.index.name("1"), "")
+        self.assertEqual(len(self.index), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()